@@ -3,35 +3,69 @@ Authentication API Routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import User
 from app.schemas import UserCreate, UserResponse, UserUpdate, Token, LoginRequest, ChangePasswordRequest
-from app.services.auth_service import verify_password, get_password_hash, create_access_token, decode_access_token
+from app.services.auth_service import create_access_token, decode_access_token
+from app.services.password_hashing import password_hasher, login_limiter
+from app.services.dashboard import invalidate_dashboard
+from app.services.sleep_analytics import invalidate_sleep_analytics
+from app.services.reminder_schedule import sync_user_schedule, publish_schedule_change
+from app.services.user_cache import get_cached_user, get_cached_user_async, cache_user, invalidate_user
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def token_subject(token: str) -> str:
+    """The email a valid access token was issued for"""
     payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
+    # Purpose-bound tokens (stream tickets) are not access tokens
+    if payload is None or payload.get("purpose"):
+        raise _credentials_exception()
     
     email: str = payload.get("sub")
     if email is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    return email
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    """Get current authenticated user"""
+    email = token_subject(token)
+    
+    user = get_cached_user(db, email)
+    if user is not None:
+        return user
     
     user = db.query(User).filter(User.email == email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
+    cache_user(email, user)
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    """get_current_user for routers on get_async_db: the lookup shares the route's async session"""
+    email = token_subject(token)
+    
+    user = await get_cached_user_async(db, email)
+    if user is not None:
+        return user
+    
+    user = await db.scalar(select(User).where(User.email == email))
+    if user is None:
+        raise _credentials_exception()
+    
+    cache_user(email, user)
     return user
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -46,8 +80,12 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
                 detail="Email already registered"
             )
         
+        # Hand the pooled connection back while waiting on the hashing pool
+        db.close()
+        
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        async with login_limiter.slot():
+            hashed_password = await password_hasher.hash(user_data.password)
         new_user = User(
             email=user_data.email,
             hashed_password=hashed_password,
@@ -80,15 +118,23 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login and get access token"""
     user = db.query(User).filter(User.email == form_data.username).first()
+    email, hashed_password = (user.email, user.hashed_password) if user else (None, None)
+    # Don't hold a pooled connection while waiting on the hashing pool
+    db.close()
+    
+    password_ok = False
+    if hashed_password:
+        async with login_limiter.slot():
+            password_ok = await password_hasher.verify(form_data.password, hashed_password)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
@@ -114,7 +160,18 @@ async def update_user_profile(
         setattr(current_user, field, value)
         logger.info(f"Set {field} = {value} for user {current_user.id}")
     
+    if "timezone" in update_data:
+        # Reminders fire at local times
+        db.flush()
+        fire_at = sync_user_schedule(db, current_user.id)
+    
     db.commit()
+    invalidate_user(current_user.email)
+    if "timezone" in update_data:
+        publish_schedule_change(current_user.id, fire_at)
+        # The streak and sleep rollups count local days
+        invalidate_dashboard(current_user.id)
+        invalidate_sleep_analytics(current_user.id)
     db.refresh(current_user)
     logger.info(f"User {current_user.id} updated. Country is now: {current_user.country}")
     return current_user
@@ -129,13 +186,6 @@ async def change_password(
     Change the current user's password.
     Requires the current password and a new password, similar to major websites.
     """
-    # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Current password is incorrect"
-        )
-
     # Basic new password validation
     if len(password_data.new_password) < 8:
         raise HTTPException(
@@ -143,8 +193,18 @@ async def change_password(
             detail="New password must be at least 8 characters long"
         )
 
-    # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
+    # One slot for both hashes, so an accepted request isn't shed halfway
+    async with login_limiter.slot():
+        # Verify current password
+        if not await password_hasher.verify(password_data.current_password, current_user.hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Current password is incorrect"
+            )
+
+        # Update password
+        current_user.hashed_password = await password_hasher.hash(password_data.new_password)
     db.commit()
+    invalidate_user(current_user.email)
 
     return {"message": "Password updated successfully"}
@@ -1,68 +1,90 @@
 """
 CBT Tools API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
 from app.models import User, ThoughtRecord
 from app.schemas import ThoughtRecordCreate, ThoughtRecordUpdate, ThoughtRecordResponse
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user_async
+from app.services.activity import record_activity
+from app.services.dashboard import invalidate_dashboard
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
 
 router = APIRouter()
 
+# API field -> ThoughtRecord column, where the names differ
+THOUGHT_RECORD_COLUMNS = {
+    "automatic_thoughts": "automatic_thought",
+    "emotions": "emotion",
+    "emotion_intensity": "intensity",
+    "alternative_thoughts": "alternative_thought",
+    "outcome_rating": "outcome",
+}
+
+def thought_record_columns(fields: dict) -> dict:
+    """ThoughtRecord column values for request fields"""
+    columns = {THOUGHT_RECORD_COLUMNS.get(field, field): value for field, value in fields.items()}
+    if columns.get("outcome") is not None:
+        columns["outcome"] = str(columns["outcome"])  # Free-text column; the API sends a 1-10 rating
+    return columns
+
+async def get_user_thought_record(db: AsyncSession, record_id: int, user_id: int) -> ThoughtRecord:
+    record = await db.scalar(
+        select(ThoughtRecord).where(ThoughtRecord.id == record_id, ThoughtRecord.user_id == user_id)
+    )
+    if not record:
+        raise HTTPException(status_code=404, detail="Thought record not found")
+    return record
+
 @router.post("/thought-records", response_model=ThoughtRecordResponse, status_code=201)
 async def create_thought_record(
     record_data: ThoughtRecordCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new thought record"""
     thought_record = ThoughtRecord(
         user_id=current_user.id,
-        situation=record_data.situation,
-        automatic_thoughts=record_data.automatic_thoughts,
-        emotions=record_data.emotions,
-        emotion_intensity=record_data.emotion_intensity,
-        evidence_for=record_data.evidence_for,
-        evidence_against=record_data.evidence_against,
-        alternative_thoughts=record_data.alternative_thoughts,
-        outcome_rating=record_data.outcome_rating
+        **thought_record_columns(record_data.model_dump())
     )
     
     db.add(thought_record)
-    db.commit()
-    db.refresh(thought_record)
+    await db.run_sync(record_activity, current_user.id, "cbt", current_user.timezone)
+    await db.commit()
+    await db.refresh(thought_record)
+    invalidate_dashboard(current_user.id)
     
     return thought_record
 
 @router.get("/thought-records", response_model=List[ThoughtRecordResponse])
 async def get_thought_records(
-    limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all thought records for current user"""
-    records = db.query(ThoughtRecord).filter(
-        ThoughtRecord.user_id == current_user.id
-    ).order_by(ThoughtRecord.created_at.desc()).limit(limit).all()
+    """Get thought records for current user, newest first"""
+    records = await db.scalars(keyset_page(
+        select(ThoughtRecord).where(ThoughtRecord.user_id == current_user.id),
+        ThoughtRecord.created_at, ThoughtRecord.id, cursor, limit
+    ))
     
+    records, next_cursor = page_rows(records.all(), limit, ThoughtRecord.created_at)
+    set_next_cursor(response, next_cursor)
     return records
 
 @router.get("/thought-records/{record_id}", response_model=ThoughtRecordResponse)
 async def get_thought_record(
     record_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific thought record"""
-    record = db.query(ThoughtRecord).filter(
-        ThoughtRecord.id == record_id,
-        ThoughtRecord.user_id == current_user.id
-    ).first()
-    
-    if not record:
-        raise HTTPException(status_code=404, detail="Thought record not found")
+    record = await get_user_thought_record(db, record_id, current_user.id)
     
     return record
 
@@ -70,57 +92,31 @@ async def get_thought_record(
 async def update_thought_record(
     record_id: int,
     record_data: ThoughtRecordUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a thought record"""
-    record = db.query(ThoughtRecord).filter(
-        ThoughtRecord.id == record_id,
-        ThoughtRecord.user_id == current_user.id
-    ).first()
-    
-    if not record:
-        raise HTTPException(status_code=404, detail="Thought record not found")
+    record = await get_user_thought_record(db, record_id, current_user.id)
     
-    if record_data.situation is not None:
-        record.situation = record_data.situation
-    if record_data.automatic_thoughts is not None:
-        record.automatic_thoughts = record_data.automatic_thoughts
-    if record_data.emotions is not None:
-        record.emotions = record_data.emotions
-    if record_data.emotion_intensity is not None:
-        record.emotion_intensity = record_data.emotion_intensity
-    if record_data.evidence_for is not None:
-        record.evidence_for = record_data.evidence_for
-    if record_data.evidence_against is not None:
-        record.evidence_against = record_data.evidence_against
-    if record_data.alternative_thoughts is not None:
-        record.alternative_thoughts = record_data.alternative_thoughts
-    if record_data.outcome_rating is not None:
-        record.outcome_rating = record_data.outcome_rating
+    for column, value in thought_record_columns(record_data.model_dump(exclude_none=True)).items():
+        setattr(record, column, value)
     
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     
     return record
 
 @router.delete("/thought-records/{record_id}")
 async def delete_thought_record(
     record_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a thought record"""
-    record = db.query(ThoughtRecord).filter(
-        ThoughtRecord.id == record_id,
-        ThoughtRecord.user_id == current_user.id
-    ).first()
-    
-    if not record:
-        raise HTTPException(status_code=404, detail="Thought record not found")
+    record = await get_user_thought_record(db, record_id, current_user.id)
     
-    db.delete(record)
-    db.commit()
+    await db.delete(record)
+    await db.commit()
     
     return {"message": "Thought record deleted successfully"}
 
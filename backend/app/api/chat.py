@@ -1,59 +1,217 @@
 """
 Chat API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from datetime import datetime
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTasks as ResponseBackgroundTasks
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.database import get_db, SessionLocal
 from app.models import User, Session as ChatSession, CrisisAlert
-from app.schemas import ChatRequest, ChatResponse, SessionResponse, SessionSummaryRequest, SessionSummaryResponse
+from app.schemas import (
+    ChatRequest, ChatResponse, SessionResponse, SessionListItem,
+    SessionSearchResult, SessionSummaryRequest, SessionSummaryResponse
+)
 from app.api.auth import get_current_user
 from app.services.groq_service import groq_service
 from app.services.emergency_service import EmergencyService
 from app.services.crisis_resources import get_crisis_resources
+from app.services.context_window import messages_to_fold
+from app.services.activity import record_activity
+from app.services.dashboard import invalidate_dashboard
+from app.services.chat_store import append_turn, load_messages, load_messages_for_sessions
+from app.services import chat_search
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def get_or_create_session(db: Session, current_user: User, session_id: Optional[int]) -> ChatSession:
+    """Load the user's chat session, or start a new one when no id is given"""
+    if session_id:
+        session = db.query(ChatSession).filter(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        ).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session
+    
+    # Create new session
+    session = ChatSession(
+        user_id=current_user.id,
+        message_count=0
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+async def raise_crisis_alert(
+    db: Session,
+    current_user: User,
+    chat_request: ChatRequest,
+    risk_level: str
+) -> Tuple[int, str]:
+    """
+    Record a crisis alert and automatically notify authorities.
+    Returns (crisis_alert_id, emergency_number).
+    """
+    user_country = current_user.country
+    
+    # Get emergency number for user's country
+    resources = get_crisis_resources(user_country or 'US')
+    emergency_number = resources.get('emergency', '911')
+    
+    # Get user location if provided
+    location = None
+    if chat_request.location:
+        location = (chat_request.location.get('lat'), chat_request.location.get('lng'))
+    
+    # Create crisis alert record
+    crisis_alert = CrisisAlert(
+        user_id=current_user.id,
+        risk_level=risk_level,
+        user_message=chat_request.message,
+        location_lat=location[0] if location else None,
+        location_lng=location[1] if location else None,
+        country=user_country,
+        emergency_number=emergency_number,
+        status='pending'
+    )
+    db.add(crisis_alert)
+    db.commit()
+    db.refresh(crisis_alert)
+    crisis_alert_id = crisis_alert.id
+    
+    # AUTOMATICALLY NOTIFY AUTHORITIES (non-blocking)
+    try:
+        notification_result = await EmergencyService.notify_authorities(
+            user_id=current_user.id,
+            user_email=current_user.email,
+            user_name=current_user.full_name,
+            country=user_country or 'US',
+            risk_level=risk_level,
+            user_message=chat_request.message,
+            location=location
+        )
+        
+        # Update alert with notification status
+        crisis_alert.notified_authorities = str(notification_result.get('notified_services', []))
+        crisis_alert.status = 'notified'
+        db.commit()
+        
+        logger.critical(
+            f"✅ Authorities notified for crisis alert {crisis_alert_id}. "
+            f"Status: {notification_result.get('status')}"
+        )
+    except Exception as e:
+        logger.error(f"Failed to notify authorities for alert {crisis_alert_id}: {e}", exc_info=True)
+        # Don't fail the request - user still gets response
+    
+    return crisis_alert_id, emergency_number
+
+async def update_session_sentiment(session_id: int, text: str):
+    """Background task: classify a turn with the LLM and store it on the session"""
+    sentiment = await groq_service.analyze_sentiment(text)
+    db = SessionLocal()
+    try:
+        db.query(ChatSession).filter(ChatSession.id == session_id).update({"sentiment": sentiment})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to update sentiment for session {session_id}: {e}", exc_info=True)
+    finally:
+        db.close()
+
+async def refresh_context_summary(session_id: int):
+    """Background task: fold turns that left the verbatim window into the rolling summary"""
+    db = SessionLocal()
+    try:
+        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+        if not session:
+            return
+        start = session.context_summary_count or 0
+        previous_summary = session.context_summary
+        fold = messages_to_fold(session.message_count or 0, start)
+        messages = load_messages(db, session_id, start_seq=start, end_seq=start + fold) if fold else []
+    finally:
+        db.close()
+    
+    if not fold:
+        return
+    
+    summary = await groq_service.update_context_summary(previous_summary, messages)
+    if not summary:
+        return
+    
+    db = SessionLocal()
+    try:
+        # Only apply if no concurrent refresh moved the window in the meantime
+        db.query(ChatSession).filter(
+            ChatSession.id == session_id,
+            func.coalesce(ChatSession.context_summary_count, 0) == start
+        ).update({
+            "context_summary": summary,
+            "context_summary_count": start + fold
+        }, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to store context summary for session {session_id}: {e}", exc_info=True)
+    finally:
+        db.close()
+
+def context_for(db: Session, session: ChatSession) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Every turn not yet folded into the session summary, plus the summary itself.
+    Turns that left the verbatim window wait here until a full batch is folded;
+    fit_history() trims the list to the token budget.
+    """
+    return load_messages(db, session.id, start_seq=session.context_summary_count or 0), session.context_summary
+
+def session_response(session: ChatSession, messages: List[Dict]) -> SessionResponse:
+    return SessionResponse(
+        id=session.id,
+        user_id=session.user_id,
+        messages=messages,
+        sentiment=session.sentiment,
+        summary=session.summary,
+        created_at=session.created_at,
+        updated_at=session.updated_at
+    )
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("/", response_model=ChatResponse)
 async def chat(
     chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Send a message to MindAlchemy AI guide and get response"""
+    started = time.perf_counter()
     
     # Get or create session
-    if chat_request.session_id:
-        session = db.query(ChatSession).filter(
-            ChatSession.id == chat_request.session_id,
-            ChatSession.user_id == current_user.id
-        ).first()
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-    else:
-        # Create new session
-        session = ChatSession(
-            user_id=current_user.id,
-            messages=[]
-        )
-        db.add(session)
-        db.commit()
-        db.refresh(session)
+    session = get_or_create_session(db, current_user, chat_request.session_id)
     
-    # Get conversation history
-    messages = session.messages or []
+    # Get conversation history not yet covered by the rolling summary
+    messages, context_summary = context_for(db, session)
     
     # Get AI response from Groq with user context including country
     # Refresh user to ensure we have latest country data
     db.refresh(current_user)
     user_country = current_user.country
     
-    # Log for debugging
-    import logging
-    logger = logging.getLogger(__name__)
     logger.info(f"User ID: {current_user.id}, Country: {user_country}")
     
     user_context = {
@@ -64,7 +222,8 @@ async def chat(
     result = await groq_service.chat(
         messages=messages,
         user_message=chat_request.message,
-        user_context=user_context
+        user_context=user_context,
+        context_summary=context_summary
     )
     
     # CRISIS DETECTED - Automatically notify authorities
@@ -72,77 +231,27 @@ async def chat(
     emergency_number = None
     
     if result.get("is_crisis", False):
-        risk_level = result.get("risk_level", "medium")
-        
-        # Get emergency number for user's country
-        resources = get_crisis_resources(user_country or 'US')
-        emergency_number = resources.get('emergency', '911')
-        
-        # Get user location if provided
-        location = None
-        if chat_request.location:
-            location = (chat_request.location.get('lat'), chat_request.location.get('lng'))
-        
-        # Create crisis alert record
-        crisis_alert = CrisisAlert(
-            user_id=current_user.id,
-            risk_level=risk_level,
-            user_message=chat_request.message,
-            location_lat=location[0] if location else None,
-            location_lng=location[1] if location else None,
-            country=user_country,
-            emergency_number=emergency_number,
-            status='pending'
+        crisis_alert_id, emergency_number = await raise_crisis_alert(
+            db, current_user, chat_request, result.get("risk_level", "medium")
         )
-        db.add(crisis_alert)
-        db.commit()
-        db.refresh(crisis_alert)
-        crisis_alert_id = crisis_alert.id
-        
-        # AUTOMATICALLY NOTIFY AUTHORITIES (non-blocking)
-        try:
-            notification_result = await EmergencyService.notify_authorities(
-                user_id=current_user.id,
-                user_email=current_user.email,
-                user_name=current_user.full_name,
-                country=user_country or 'US',
-                risk_level=risk_level,
-                user_message=chat_request.message,
-                location=location
-            )
-            
-            # Update alert with notification status
-            crisis_alert.notified_authorities = str(notification_result.get('notified_services', []))
-            crisis_alert.status = 'notified'
-            db.commit()
-            
-            logger.critical(
-                f"✅ Authorities notified for crisis alert {crisis_alert_id}. "
-                f"Status: {notification_result.get('status')}"
-            )
-        except Exception as e:
-            logger.error(f"Failed to notify authorities for alert {crisis_alert_id}: {e}", exc_info=True)
-            # Don't fail the request - user still gets response
     
     # Add messages to session
-    messages.append({
-        "role": "user",
-        "content": chat_request.message,
-        "timestamp": datetime.utcnow().isoformat()
-    })
-    messages.append({
-        "role": "assistant",
-        "content": result["response"],
-        "timestamp": datetime.utcnow().isoformat()
-    })
-    
-    # Update session
-    session.messages = messages
-    session.sentiment = result.get("sentiment")
-    session.updated_at = datetime.utcnow()
+    append_turn(db, session, chat_request.message, result["response"], result.get("sentiment"))
+    record_activity(db, current_user.id, "chat", current_user.timezone)
     
     db.commit()
     db.refresh(session)
+    invalidate_dashboard(current_user.id)
+    
+    if settings.sentiment_mode == "background" and not result.get("is_crisis") and not result.get("error"):
+        background_tasks.add_task(update_session_sentiment, session.id, chat_request.message)
+    if messages_to_fold(session.message_count or 0, session.context_summary_count or 0):
+        background_tasks.add_task(refresh_context_summary, session.id)
+    
+    logger.info(
+        f"Chat turn completed in {(time.perf_counter() - started) * 1000:.0f}ms "
+        f"(sentiment_mode={settings.sentiment_mode})"
+    )
     
     return ChatResponse(
         response=result["response"],
@@ -155,6 +264,100 @@ async def chat(
         quick_replies=result.get("quick_replies", [])
     )
 
+@router.post("/stream")
+async def chat_stream(
+    chat_request: ChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Send a message and stream the AI guide's response as Server-Sent Events.
+    Emits `token` events while the model generates, then one `done` event with
+    the same metadata as POST /api/chat/. The turn is saved once the stream ends.
+    """
+    session = get_or_create_session(db, current_user, chat_request.session_id)
+    session_id = session.id
+    user_id = current_user.id
+    user_timezone = current_user.timezone
+    messages, context_summary = context_for(db, session)
+    total_messages = (session.message_count or 0) + 2
+    summarized_count = session.context_summary_count or 0
+    
+    db.refresh(current_user)
+    user_context = {
+        "country": current_user.country,
+        "location": chat_request.location
+    }
+    
+    # Crisis detection runs before anything is streamed
+    is_crisis, risk_level = groq_service.detect_crisis(chat_request.message)
+    crisis_alert_id = None
+    emergency_number = None
+    if is_crisis:
+        logger.info(f"Crisis detected. User country from context: {current_user.country}")
+        crisis_alert_id, emergency_number = await raise_crisis_alert(
+            db, current_user, chat_request, risk_level
+        )
+    
+    # Filled by event_stream() once the turn is stored; run after the last event is sent
+    background = ResponseBackgroundTasks()
+    
+    async def event_stream():
+        parts = []
+        try:
+            if is_crisis:
+                parts.append(groq_service.get_crisis_response(current_user.country))
+                yield format_sse("token", {"content": parts[0]})
+            else:
+                async for token in groq_service.stream_chat(
+                    messages, chat_request.message, user_context, context_summary
+                ):
+                    parts.append(token)
+                    yield format_sse("token", {"content": token})
+        except Exception as e:
+            logger.error(f"Groq streaming error: {e}", exc_info=True)
+            yield format_sse("error", {"detail": "I'm having trouble processing that right now. Please try again."})
+            return
+        
+        response_text = "".join(parts)
+        sentiment = "crisis" if is_crisis else await groq_service.get_turn_sentiment(chat_request.message)
+        
+        # Persist with a fresh DB session - the request-scoped one may already be closed
+        stream_db = SessionLocal()
+        saved = False
+        try:
+            stream_session = stream_db.query(ChatSession).filter(ChatSession.id == session_id).first()
+            if stream_session:
+                append_turn(stream_db, stream_session, chat_request.message, response_text, sentiment)
+                record_activity(stream_db, user_id, "chat", user_timezone)
+                stream_db.commit()
+                saved = True
+        finally:
+            stream_db.close()
+        invalidate_dashboard(user_id)
+        
+        if saved:
+            if settings.sentiment_mode == "background" and not is_crisis:
+                background.add_task(update_session_sentiment, session_id, chat_request.message)
+            if messages_to_fold(total_messages, summarized_count):
+                background.add_task(refresh_context_summary, session_id)
+        
+        yield format_sse("done", {
+            "session_id": session_id,
+            "is_crisis": is_crisis,
+            "risk_level": risk_level,
+            "sentiment": sentiment,
+            "emergency_number": emergency_number,
+            "crisis_alert_id": crisis_alert_id
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background
+    )
+
 @router.get("/sessions", response_model=list[SessionResponse])
 async def get_sessions(
     current_user: User = Depends(get_current_user),
@@ -165,15 +368,88 @@ async def get_sessions(
         ChatSession.user_id == current_user.id
     ).order_by(ChatSession.updated_at.desc()).all()
     
+    histories = load_messages_for_sessions(db, [session.id for session in sessions])
+    return [session_response(session, histories[session.id]) for session in sessions]
+
+@router.get("/sessions/list", response_model=List[SessionListItem])
+async def list_sessions(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(30, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """List chat sessions, most recently active first, without message bodies"""
+    query = db.query(ChatSession).options(
+        load_only(
+            ChatSession.id,
+            ChatSession.title,
+            ChatSession.sentiment,
+            ChatSession.message_count,
+            ChatSession.created_at,
+            ChatSession.updated_at
+        )
+    ).filter(ChatSession.user_id == current_user.id)
+    
+    sessions = keyset_page(query, ChatSession.updated_at, ChatSession.id, cursor, limit).all()
+    
+    sessions, next_cursor = page_rows(sessions, limit, ChatSession.updated_at)
+    set_next_cursor(response, next_cursor)
     return sessions
 
+@router.get("/sessions/search", response_model=list[SessionSearchResult])
+async def search_sessions(
+    query: str,
+    limit: int = Query(20, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over chat messages, returning ranked sessions with highlighted snippets"""
+    if not query or len(query.strip()) < 2:
+        raise HTTPException(status_code=400, detail="Search query must be at least 2 characters")
+    
+    hits = chat_search.search_sessions(db, current_user.id, query, limit=limit)
+    if not hits:
+        return []
+    
+    sessions = db.query(ChatSession).options(
+        load_only(
+            ChatSession.id,
+            ChatSession.title,
+            ChatSession.sentiment,
+            ChatSession.summary,
+            ChatSession.message_count,
+            ChatSession.created_at,
+            ChatSession.updated_at
+        )
+    ).filter(ChatSession.id.in_([hit["session_id"] for hit in hits])).all()
+    by_id = {session.id: session for session in sessions}
+    
+    results = []
+    for hit in hits:
+        session = by_id.get(hit["session_id"])
+        if not session:
+            continue
+        item = SessionListItem.model_validate(session)
+        results.append(SessionSearchResult(
+            **item.model_dump(),
+            summary=session.summary,
+            snippet=hit["snippet"],
+            score=hit["score"],
+            matches=hit["matches"]
+        ))
+    return results
+
 @router.get("/sessions/{session_id}", response_model=SessionResponse)
 async def get_session(
     session_id: int,
+    response: Response,
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor header of the previous page (a message seq)"),
+    limit: int = Query(200, ge=1, le=1000),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get a specific chat session"""
+    """Get a specific chat session with a page of its messages, oldest first"""
     session = db.query(ChatSession).filter(
         ChatSession.id == session_id,
         ChatSession.user_id == current_user.id
@@ -182,7 +458,13 @@ async def get_session(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return session
+    start_seq = cursor + 1 if cursor is not None else 0
+    messages = load_messages(db, session.id, start_seq=start_seq, limit=limit)
+    
+    if messages and messages[-1]["seq"] < (session.message_count or 0) - 1:
+        set_next_cursor(response, str(messages[-1]["seq"]))
+    
+    return session_response(session, messages)
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(
@@ -201,6 +483,7 @@ async def delete_session(
     
     db.delete(session)
     db.commit()
+    invalidate_dashboard(current_user.id)
     
     return {"message": "Session deleted successfully"}
 
@@ -221,7 +504,7 @@ async def generate_session_summary(
     
     # Generate summary if not already exists
     if not session.summary:
-        summary = await groq_service.generate_session_summary(session.messages or [])
+        summary = await groq_service.generate_session_summary(load_messages(db, session.id, limit=200))
         session.summary = summary
         db.commit()
         db.refresh(session)
@@ -229,34 +512,3 @@ async def generate_session_summary(
         summary = session.summary
     
     return SessionSummaryResponse(session_id=session_id, summary=summary)
-
-@router.get("/sessions/search")
-async def search_sessions(
-    query: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Search chat sessions by message content"""
-    if not query or len(query.strip()) < 2:
-        raise HTTPException(status_code=400, detail="Search query must be at least 2 characters")
-    
-    query_lower = query.lower().strip()
-    sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).all()
-    
-    matching_sessions = []
-    for session in sessions:
-        messages = session.messages or []
-        # Search in all messages
-        for msg in messages:
-            content = msg.get('content', '').lower()
-            if query_lower in content:
-                matching_sessions.append(session)
-                break  # Only add session once
-    
-    # Sort by most recent
-    matching_sessions.sort(key=lambda s: s.updated_at or s.created_at, reverse=True)
-    
-    return matching_sessions
-
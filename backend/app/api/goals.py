@@ -1,22 +1,30 @@
 """
 Goals API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User, Goal
 from app.schemas import GoalCreate, GoalUpdate, GoalResponse
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user_async
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
 
 router = APIRouter()
 
+async def get_user_goal(db: AsyncSession, goal_id: int, user_id: int) -> Goal:
+    goal = await db.scalar(select(Goal).where(Goal.id == goal_id, Goal.user_id == user_id))
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return goal
+
 @router.post("/", response_model=GoalResponse, status_code=201)
 async def create_goal(
     goal_data: GoalCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new goal"""
     goal = Goal(
@@ -30,40 +38,40 @@ async def create_goal(
     )
     
     db.add(goal)
-    db.commit()
-    db.refresh(goal)
+    await db.commit()
+    await db.refresh(goal)
     
     return goal
 
 @router.get("/", response_model=List[GoalResponse])
 async def get_goals(
+    response: Response,
     status: str = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all goals for current user"""
-    query = db.query(Goal).filter(Goal.user_id == current_user.id)
+    """Get goals for current user, newest first"""
+    query = select(Goal).where(Goal.user_id == current_user.id)
     
     if status:
-        query = query.filter(Goal.status == status)
+        query = query.where(Goal.status == status)
     
-    goals = query.order_by(Goal.created_at.desc()).all()
+    goals = await db.scalars(keyset_page(query, Goal.created_at, Goal.id, cursor, limit))
+    
+    goals, next_cursor = page_rows(goals.all(), limit, Goal.created_at)
+    set_next_cursor(response, next_cursor)
     return goals
 
 @router.get("/{goal_id}", response_model=GoalResponse)
 async def get_goal(
     goal_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific goal"""
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id,
-        Goal.user_id == current_user.id
-    ).first()
-    
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    goal = await get_user_goal(db, goal_id, current_user.id)
     
     return goal
 
@@ -71,17 +79,11 @@ async def get_goal(
 async def update_goal(
     goal_id: int,
     goal_data: GoalUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a goal"""
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id,
-        Goal.user_id == current_user.id
-    ).first()
-    
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    goal = await get_user_goal(db, goal_id, current_user.id)
     
     if goal_data.title is not None:
         goal.title = goal_data.title
@@ -96,28 +98,22 @@ async def update_goal(
     if goal_data.status is not None:
         goal.status = goal_data.status
     
-    db.commit()
-    db.refresh(goal)
+    await db.commit()
+    await db.refresh(goal)
     
     return goal
 
 @router.delete("/{goal_id}")
 async def delete_goal(
     goal_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a goal"""
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id,
-        Goal.user_id == current_user.id
-    ).first()
-    
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    goal = await get_user_goal(db, goal_id, current_user.id)
     
-    db.delete(goal)
-    db.commit()
+    await db.delete(goal)
+    await db.commit()
     
     return {"message": "Goal deleted successfully"}
 
@@ -1,13 +1,18 @@
 """
 Journal API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import date
+from typing import List, Optional
 from app.database import get_db
 from app.models import User, JournalEntry
-from app.schemas import JournalEntryCreate, JournalEntryUpdate, JournalEntryResponse
+from app.schemas import JournalEntryCreate, JournalEntryUpdate, JournalEntryResponse, JournalTagCount
 from app.api.auth import get_current_user
+from app.services.activity import record_activity
+from app.services.dashboard import invalidate_dashboard
+from app.services.journal_search import search_entries, sync_tags, tag_counts
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
 
 router = APIRouter()
 
@@ -24,26 +29,65 @@ async def create_journal_entry(
         content=entry_data.content,
         tags=entry_data.tags or []
     )
+    sync_tags(journal_entry)
     
     db.add(journal_entry)
+    record_activity(db, current_user.id, "journal", current_user.timezone)
     db.commit()
     db.refresh(journal_entry)
+    invalidate_dashboard(current_user.id)
     
     return journal_entry
 
 @router.get("/", response_model=List[JournalEntryResponse])
 async def get_journal_entries(
-    limit: int = 50,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all journal entries for current user"""
-    entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id
-    ).order_by(JournalEntry.created_at.desc()).limit(limit).all()
+    """Get journal entries for current user, newest first"""
+    entries = keyset_page(
+        db.query(JournalEntry).filter(JournalEntry.user_id == current_user.id),
+        JournalEntry.created_at, JournalEntry.id, cursor, limit
+    ).all()
+    
+    entries, next_cursor = page_rows(entries, limit, JournalEntry.created_at)
+    set_next_cursor(response, next_cursor)
+    return entries
+
+@router.get("/search", response_model=List[JournalEntryResponse])
+async def search_journal_entries(
+    response: Response,
+    q: Optional[str] = Query(None, description="Words to find in title or content"),
+    tags: Optional[List[str]] = Query(None, description="Only entries with all of these tags"),
+    start_date: Optional[date] = Query(None, description="Created on or after this day"),
+    end_date: Optional[date] = Query(None, description="Created on or before this day"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Search journal entries by text, tags and date range, newest first"""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date")
+    
+    entries = search_entries(db, current_user.id, query=q, tags=tags, start_date=start_date, end_date=end_date)
+    entries = keyset_page(entries, JournalEntry.created_at, JournalEntry.id, cursor, limit).all()
     
+    entries, next_cursor = page_rows(entries, limit, JournalEntry.created_at)
+    set_next_cursor(response, next_cursor)
     return entries
 
+@router.get("/tags", response_model=List[JournalTagCount])
+async def get_journal_tags(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tags used across the user's journal, with how many entries carry each"""
+    return [JournalTagCount(tag=tag, count=count) for tag, count in tag_counts(db, current_user.id)]
+
 @router.get("/{entry_id}", response_model=JournalEntryResponse)
 async def get_journal_entry(
     entry_id: int,
@@ -83,9 +127,11 @@ async def update_journal_entry(
         entry.content = entry_data.content
     if entry_data.tags is not None:
         entry.tags = entry_data.tags
+        sync_tags(entry)
     
     db.commit()
     db.refresh(entry)
+    invalidate_dashboard(current_user.id)
     
     return entry
 
@@ -106,6 +152,7 @@ async def delete_journal_entry(
     
     db.delete(entry)
     db.commit()
+    invalidate_dashboard(current_user.id)
     
     return {"message": "Journal entry deleted successfully"}
 
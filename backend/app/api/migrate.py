@@ -8,6 +8,7 @@ from app.models import (
     User, Session, MoodLog, JournalEntry, ThoughtRecord,
     Goal, SleepLog, CrisisAlert, NotificationPreferences, Notification
 )
+from app.services import chat_search, journal_search
 import os
 
 router = APIRouter()
@@ -25,6 +26,8 @@ async def init_database():
     try:
         # Create all tables
         Base.metadata.create_all(bind=engine)
+        chat_search.ensure_search_index(engine)
+        journal_search.ensure_search_index(engine)
         return {
             "success": True,
             "message": "Database initialized successfully!",
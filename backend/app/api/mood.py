@@ -1,81 +1,97 @@
 """
 Mood Tracking API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.database import get_async_db
 from app.models import User, MoodLog
-from app.schemas import MoodLogCreate, MoodLogResponse, MoodStatsResponse
-from app.api.auth import get_current_user
+from app.schemas import MoodLogCreate, MoodLogResponse, MoodStatsResponse, MoodTrendsResponse
+from app.api.auth import get_current_user_async
+from app.services.activity import record_activity
+from app.services.dashboard import invalidate_dashboard
+from app.services import mood_trends
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
+from app.services.reminder_schedule import user_zone
+from app.services.sleep_analytics import invalidate_sleep_analytics
 
 router = APIRouter()
 
 @router.post("/", response_model=MoodLogResponse, status_code=201)
 async def log_mood(
     mood_data: MoodLogCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Log a mood entry"""
     mood_log = MoodLog(
         user_id=current_user.id,
         mood_type=mood_data.mood_type,
-        mood_value=mood_data.mood_value,
-        intensity=mood_data.intensity,
-        trigger=mood_data.trigger,
+        intensity=mood_data.intensity if mood_data.intensity is not None else mood_data.mood_value,
         notes=mood_data.notes
     )
     
     db.add(mood_log)
-    db.commit()
-    db.refresh(mood_log)
+    await db.run_sync(record_activity, current_user.id, "mood", current_user.timezone)
+    await db.commit()
+    await db.refresh(mood_log)
+    invalidate_dashboard(current_user.id)
+    invalidate_sleep_analytics(current_user.id)
     
     return mood_log
 
 @router.get("/", response_model=List[MoodLogResponse])
 async def get_mood_logs(
-    limit: int = 30,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(30, ge=1, le=100),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get mood logs for current user"""
-    mood_logs = db.query(MoodLog).filter(
-        MoodLog.user_id == current_user.id
-    ).order_by(MoodLog.created_at.desc()).limit(limit).all()
+    """Get mood logs for current user, newest first"""
+    mood_logs = await db.scalars(keyset_page(
+        select(MoodLog).where(MoodLog.user_id == current_user.id),
+        MoodLog.created_at, MoodLog.id, cursor, limit
+    ))
     
+    mood_logs, next_cursor = page_rows(mood_logs.all(), limit, MoodLog.created_at)
+    set_next_cursor(response, next_cursor)
     return mood_logs
 
 @router.get("/stats", response_model=MoodStatsResponse)
 async def get_mood_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get mood statistics for current user"""
     # Total logs
-    total_logs = db.query(func.count(MoodLog.id)).filter(
-        MoodLog.user_id == current_user.id
-    ).scalar() or 0
+    total_logs = await db.scalar(
+        select(func.count(MoodLog.id)).where(MoodLog.user_id == current_user.id)
+    ) or 0
     
     # Average mood value
-    avg_mood = db.query(func.avg(MoodLog.mood_value)).filter(
-        MoodLog.user_id == current_user.id
-    ).scalar() or 0.0
+    avg_mood = await db.scalar(
+        select(func.avg(MoodLog.intensity)).where(MoodLog.user_id == current_user.id)
+    ) or 0.0
     
     # Mood distribution
-    mood_dist = db.query(
-        MoodLog.mood_type,
-        func.count(MoodLog.id)
-    ).filter(
-        MoodLog.user_id == current_user.id
-    ).group_by(MoodLog.mood_type).all()
+    mood_dist = await db.execute(
+        select(MoodLog.mood_type, func.count(MoodLog.id))
+        .where(MoodLog.user_id == current_user.id)
+        .group_by(MoodLog.mood_type)
+    )
     
     mood_distribution = {mood_type: count for mood_type, count in mood_dist}
     
-    # Recent trend (simplified - compare last 7 days vs previous 7 days)
-    # This is a simplified version - can be enhanced
-    recent_trend = "stable"
+    # Recent trend: last 7 local days vs the 7 before (a day of slack covers any timezone)
+    now = datetime.utcnow()
+    recent = await db.execute(mood_trends.series_query(current_user.id, since=now - timedelta(days=15)))
+    epoch, values = mood_trends.to_arrays(recent.all())
+    recent_trend = mood_trends.trend_label(
+        mood_trends.week_over_week(epoch, values, user_zone(current_user.timezone), now)
+    )
     
     return MoodStatsResponse(
         total_logs=total_logs,
@@ -84,17 +100,29 @@ async def get_mood_stats(
         recent_trend=recent_trend
     )
 
+@router.get("/trends", response_model=MoodTrendsResponse)
+async def get_mood_trends(
+    days: int = Query(mood_trends.TREND_DAYS, ge=7, le=365, description="Days in the daily series and the slope"),
+    weeks: int = Query(mood_trends.TREND_WEEKS, ge=2, le=104),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Rolling means, week-over-week changes, weekday/hour profiles and trend slope of the user's mood"""
+    rows = await db.execute(mood_trends.series_query(current_user.id))
+    epoch, values = mood_trends.to_arrays(rows.all())
+    trends = mood_trends.compute_trends(epoch, values, user_zone(current_user.timezone), days=days, weeks=weeks)
+    return MoodTrendsResponse(**trends, recent_trend=mood_trends.trend_label(trends["week_over_week"]))
+
 @router.get("/{mood_id}", response_model=MoodLogResponse)
 async def get_mood_log(
     mood_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific mood log"""
-    mood_log = db.query(MoodLog).filter(
-        MoodLog.id == mood_id,
-        MoodLog.user_id == current_user.id
-    ).first()
+    mood_log = await db.scalar(
+        select(MoodLog).where(MoodLog.id == mood_id, MoodLog.user_id == current_user.id)
+    )
     
     if not mood_log:
         raise HTTPException(status_code=404, detail="Mood log not found")
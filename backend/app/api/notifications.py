@@ -1,17 +1,34 @@
 """
 Notifications API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.security.utils import get_authorization_scheme_param
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import List
-from app.database import get_db
+from typing import Callable, List, Optional
+from app.config import settings
+from app.database import get_db, SessionLocal
 from app.models import User, NotificationPreferences, Notification
 from app.schemas import NotificationPreferencesUpdate, NotificationPreferencesResponse, NotificationResponse
 from app.api.auth import get_current_user
+from app.services.notification_counters import adjust_unread, unread_count
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
+from app.services.auth_service import create_stream_ticket, decode_stream_ticket
+from app.services.notification_stream import HEARTBEAT, StreamLimitReached, notification_hub, notification_payload
+from app.services.reminder_schedule import sync_user_schedule, publish_schedule_change
+import json
 
 router = APIRouter()
 
+STREAM_RETRY_MS = 5000  # Reconnect delay suggested to EventSource clients
+STREAM_REPLAY_LIMIT = 50  # Notifications newer than Last-Event-ID sent on reconnect
+
+def format_notification_event(payload: dict) -> str:
+    """Encode one notification as a Server-Sent Event"""
+    event_id = f"id: {payload['id']}\n" if payload.get("id") is not None else ""
+    return f"{event_id}event: notification\ndata: {json.dumps(payload)}\n\n"
+
 @router.get("/preferences", response_model=NotificationPreferencesResponse)
 async def get_notification_preferences(
     current_user: User = Depends(get_current_user),
@@ -41,7 +58,10 @@ async def get_notification_preferences(
             email_notifications_enabled='false'
         )
         db.add(prefs)
+        db.flush()
+        fire_at = sync_user_schedule(db, current_user.id)
         db.commit()
+        publish_schedule_change(current_user.id, fire_at)
         db.refresh(prefs)
     
     return prefs
@@ -68,19 +88,24 @@ async def update_notification_preferences(
         setattr(prefs, field, value)
     
     prefs.updated_at = datetime.utcnow()
+    db.flush()
+    fire_at = sync_user_schedule(db, current_user.id)
     db.commit()
+    publish_schedule_change(current_user.id, fire_at)
     db.refresh(prefs)
     
     return prefs
 
 @router.get("/", response_model=List[NotificationResponse])
 async def get_notifications(
-    limit: int = 50,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=100),
     unread_only: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's notifications"""
+    """Get user's notifications, newest first"""
     query = db.query(Notification).filter(
         Notification.user_id == current_user.id
     )
@@ -88,9 +113,113 @@ async def get_notifications(
     if unread_only:
         query = query.filter(Notification.read == 'false')
     
-    notifications = query.order_by(Notification.sent_at.desc()).limit(limit).all()
+    notifications = keyset_page(query, Notification.sent_at, Notification.id, cursor, limit).all()
+    
+    notifications, next_cursor = page_rows(notifications, limit, Notification.sent_at)
+    set_next_cursor(response, next_cursor)
     return notifications
 
+@router.post("/stream-ticket")
+async def create_notification_stream_ticket(current_user: User = Depends(get_current_user)):
+    """
+    Ticket for opening GET /stream from an EventSource, which can't send an
+    Authorization header. It is only valid for the stream and expires after
+    NOTIFICATION_STREAM_TICKET_SECONDS, so it is harmless once it reaches logs.
+    """
+    return {
+        "ticket": create_stream_ticket(current_user.id),
+        "expires_in": settings.notification_stream_ticket_seconds
+    }
+
+class NotificationStreamResponse(StreamingResponse):
+    """Releases the stream's hub slot however the response ends - even if the body never starts"""
+
+    def __init__(self, content, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    ticket: Optional[str] = Query(None, description="From POST /stream-ticket, for clients that can't set headers"),
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Push the user's new notifications as Server-Sent Events instead of polling:
+    one `notification` event per row (data as in GET /, id = notification id),
+    and a comment line every NOTIFICATION_STREAM_HEARTBEAT_SECONDS while idle.
+    Authenticate with the Authorization header, or - since EventSource can't
+    set headers - with ?ticket= from POST /stream-ticket. Access tokens are
+    never accepted in the URL.
+    On reconnect, notifications newer than Last-Event-ID are sent first.
+    """
+    if ticket:
+        user_id = decode_stream_ticket(ticket)
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired stream ticket")
+    else:
+        scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+        if not token or scheme.lower() != "bearer":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        # The stream must not hold a pooled connection for its whole life
+        db = SessionLocal()
+        try:
+            user_id = get_current_user(token, db).id
+        finally:
+            db.close()
+    
+    # Registered before the response starts, so a full worker answers 503 rather than a broken 200
+    try:
+        queue = notification_hub.connect(user_id)
+    except StreamLimitReached:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open notification streams, try again shortly",
+            headers={"Retry-After": str(STREAM_RETRY_MS // 1000)},
+        )
+    
+    async def event_stream():
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        
+        # Registered before looking back, so nothing committed in between is missed
+        last_sent = last_event_id or 0
+        if last_event_id is not None:
+            replay_db = SessionLocal()
+            try:
+                missed = replay_db.query(Notification).filter(
+                    Notification.user_id == user_id,
+                    Notification.id > last_event_id
+                ).order_by(Notification.id).limit(STREAM_REPLAY_LIMIT).all()
+            finally:
+                replay_db.close()
+            for notification in missed:
+                last_sent = notification.id
+                yield format_notification_event(notification_payload(notification))
+        
+        while True:
+            item = await queue.get()
+            if item is HEARTBEAT:
+                yield ": heartbeat\n\n"
+            elif item.get("id") is None or item["id"] > last_sent:
+                yield format_notification_event(item)
+    
+    return NotificationStreamResponse(
+        event_stream(),
+        on_close=lambda: notification_hub.disconnect(user_id, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.put("/{notification_id}/read")
 async def mark_notification_read(
     notification_id: int,
@@ -98,16 +227,23 @@ async def mark_notification_read(
     db: Session = Depends(get_db)
 ):
     """Mark a notification as read"""
-    notification = db.query(Notification).filter(
+    # Conditional on it still being unread, so concurrent requests decrement the counter once
+    updated = db.query(Notification).filter(
         Notification.id == notification_id,
-        Notification.user_id == current_user.id
-    ).first()
+        Notification.user_id == current_user.id,
+        Notification.read == 'false'
+    ).update({
+        'read': 'true',
+        'read_at': datetime.utcnow()
+    }, synchronize_session=False)
     
-    if not notification:
+    if not updated and not db.query(Notification.id).filter(
+        Notification.id == notification_id,
+        Notification.user_id == current_user.id
+    ).first():
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.read = 'true'
-    notification.read_at = datetime.utcnow()
+    adjust_unread(db, {current_user.id: -updated})
     db.commit()
     
     return {"message": "Notification marked as read"}
@@ -118,13 +254,14 @@ async def mark_all_notifications_read(
     db: Session = Depends(get_db)
 ):
     """Mark all notifications as read"""
-    db.query(Notification).filter(
+    updated = db.query(Notification).filter(
         Notification.user_id == current_user.id,
         Notification.read == 'false'
     ).update({
         'read': 'true',
         'read_at': datetime.utcnow()
     })
+    adjust_unread(db, {current_user.id: -updated})
     db.commit()
     
     return {"message": "All notifications marked as read"}
@@ -136,14 +273,17 @@ async def delete_notification(
     db: Session = Depends(get_db)
 ):
     """Delete a notification"""
+    # Locked so a concurrent mark-read can't change its read state under us
     notification = db.query(Notification).filter(
         Notification.id == notification_id,
         Notification.user_id == current_user.id
-    ).first()
+    ).with_for_update().first()
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    if notification.read == 'false':
+        adjust_unread(db, {current_user.id: -1})
     db.delete(notification)
     db.commit()
     
@@ -155,12 +295,7 @@ async def get_unread_count(
     db: Session = Depends(get_db)
 ):
     """Get count of unread notifications"""
-    count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.read == 'false'
-    ).count()
-    
-    return {"count": count}
+    return {"count": unread_count(db, current_user.id)}
 
 @router.post("/check-and-send")
 async def check_and_send_notifications(
@@ -173,11 +308,11 @@ async def check_and_send_notifications(
     from app.services.notification_service import notification_service
     
     try:
-        count = notification_service.check_and_send_notifications(db)
+        result = notification_service.check_and_send_notifications(db)
         return {
             "status": "success",
-            "notifications_sent": count,
-            "message": f"Sent {count} notifications"
+            **result,
+            "message": f"Sent {result['notifications_sent']} notifications"
         }
     except Exception as e:
         import logging
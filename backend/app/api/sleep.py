@@ -1,78 +1,112 @@
 """
 Sleep Tracking API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from app.database import get_db
 from app.models import User, SleepLog
-from app.schemas import SleepLogCreate, SleepLogResponse
+from app.schemas import SleepLogCreate, SleepLogResponse, SleepStatsResponse, SleepAnalyticsResponse
 from app.api.auth import get_current_user
+from app.services.activity import record_activity
+from app.services.dashboard import invalidate_dashboard
+from app.services.pagination import keyset_page, page_rows, set_next_cursor
+from app.services.reminder_schedule import user_zone
+from app.services.sleep_analytics import MAX_MONTHS, MAX_WEEKS, get_sleep_analytics, invalidate_sleep_analytics
 
 router = APIRouter()
 
+def to_utc(value: Optional[datetime], zone) -> Optional[datetime]:
+    """Naive UTC; a naive input (datetime-local form field) is the user's wall clock"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=zone)
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 @router.post("/", response_model=SleepLogResponse, status_code=201)
 async def log_sleep(
     sleep_data: SleepLogCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Log a sleep entry"""
+    """Log a sleep entry; without a bedtime, the night is taken to end at the wake time (or now)"""
+    zone = user_zone(current_user.timezone)
+    wake_time = to_utc(sleep_data.wake_time, zone)
+    sleep_time = to_utc(sleep_data.bedtime, zone)
+    if sleep_time is None:
+        sleep_time = (wake_time or datetime.utcnow()) - timedelta(hours=sleep_data.sleep_hours)
+    
     sleep_log = SleepLog(
         user_id=current_user.id,
-        sleep_hours=sleep_data.sleep_hours,
-        sleep_quality=sleep_data.sleep_quality,
-        bedtime=sleep_data.bedtime,
-        wake_time=sleep_data.wake_time,
+        sleep_time=sleep_time,
+        wake_time=wake_time,
+        duration_hours=sleep_data.sleep_hours,
+        quality=sleep_data.sleep_quality,
         notes=sleep_data.notes
     )
     
     db.add(sleep_log)
+    record_activity(db, current_user.id, "sleep", current_user.timezone)
     db.commit()
     db.refresh(sleep_log)
+    invalidate_dashboard(current_user.id)
+    invalidate_sleep_analytics(current_user.id)
     
     return sleep_log
 
 @router.get("/", response_model=List[SleepLogResponse])
 async def get_sleep_logs(
-    limit: int = 30,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    limit: int = Query(30, ge=1, le=100),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get sleep logs for current user"""
-    sleep_logs = db.query(SleepLog).filter(
-        SleepLog.user_id == current_user.id
-    ).order_by(SleepLog.created_at.desc()).limit(limit).all()
+    """Get sleep logs for current user, newest first"""
+    sleep_logs = keyset_page(
+        db.query(SleepLog).filter(SleepLog.user_id == current_user.id),
+        SleepLog.created_at, SleepLog.id, cursor, limit
+    ).all()
     
+    sleep_logs, next_cursor = page_rows(sleep_logs, limit, SleepLog.created_at)
+    set_next_cursor(response, next_cursor)
     return sleep_logs
 
-@router.get("/stats")
+@router.get("/stats", response_model=SleepStatsResponse)
 async def get_sleep_stats(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get sleep statistics for current user"""
-    # Total logs
-    total_logs = db.query(func.count(SleepLog.id)).filter(
-        SleepLog.user_id == current_user.id
-    ).scalar() or 0
+    total_logs, avg_hours, avg_quality = db.query(
+        func.count(SleepLog.id),
+        func.avg(SleepLog.duration_hours),
+        func.avg(SleepLog.quality)
+    ).filter(SleepLog.user_id == current_user.id).one()
     
-    # Average sleep hours
-    avg_hours = db.query(func.avg(SleepLog.sleep_hours)).filter(
-        SleepLog.user_id == current_user.id
-    ).scalar() or 0.0
-    
-    # Average sleep quality
-    avg_quality = db.query(func.avg(SleepLog.sleep_quality)).filter(
-        SleepLog.user_id == current_user.id
-    ).scalar() or 0.0
-    
-    return {
-        "total_logs": total_logs,
-        "average_hours": round(float(avg_hours), 2),
-        "average_quality": round(float(avg_quality), 2)
-    }
+    return SleepStatsResponse(
+        total_logs=total_logs or 0,
+        average_hours=round(float(avg_hours or 0.0), 2),
+        average_quality=round(float(avg_quality or 0.0), 2)
+    )
+
+@router.get("/analytics", response_model=SleepAnalyticsResponse)
+async def get_sleep_analytics_report(
+    weeks: int = Query(12, ge=1, le=MAX_WEEKS),
+    months: int = Query(6, ge=1, le=MAX_MONTHS),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Weekly/monthly rollups, bedtime consistency and correlation with next-day mood"""
+    analytics = get_sleep_analytics(db, current_user)
+    return SleepAnalyticsResponse(**{
+        **analytics,
+        "weekly": analytics["weekly"][-weeks:],
+        "monthly": analytics["monthly"][-months:],
+    })
 
 @router.get("/{log_id}", response_model=SleepLogResponse)
 async def get_sleep_log(
@@ -3,12 +3,14 @@ User API Routes
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from datetime import datetime, timedelta
 from app.database import get_db
 from app.models import User, Session as ChatSession, MoodLog, JournalEntry, ThoughtRecord, Goal, SleepLog, Notification, CrisisAlert
 from app.schemas import DashboardResponse
 from app.api.auth import get_current_user
+from app.services import dashboard
+from app.services.chat_store import load_messages_for_sessions
+from app.services.user_cache import invalidate_user
 import json
 
 router = APIRouter()
@@ -19,71 +21,7 @@ async def get_dashboard(
     db: Session = Depends(get_db)
 ):
     """Get dashboard data for current user"""
-    
-    # Total sessions
-    total_sessions = db.query(func.count(ChatSession.id)).filter(
-        ChatSession.user_id == current_user.id
-    ).scalar() or 0
-    
-    # Total mood logs
-    total_mood_logs = db.query(func.count(MoodLog.id)).filter(
-        MoodLog.user_id == current_user.id
-    ).scalar() or 0
-    
-    # Total journal entries
-    total_journal_entries = db.query(func.count(JournalEntry.id)).filter(
-        JournalEntry.user_id == current_user.id
-    ).scalar() or 0
-    
-    # Current streak (simplified - days with at least one activity)
-    # This can be enhanced with more sophisticated streak calculation
-    current_streak = 0
-    
-    # Recent mood
-    recent_mood = db.query(MoodLog).filter(
-        MoodLog.user_id == current_user.id
-    ).order_by(MoodLog.created_at.desc()).first()
-    recent_mood_type = recent_mood.mood_type if recent_mood else None
-    
-    # Recent activity (last 5 activities)
-    recent_activity = []
-    
-    # Get recent sessions
-    recent_sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).order_by(ChatSession.updated_at.desc()).limit(3).all()
-    
-    for session in recent_sessions:
-        recent_activity.append({
-            "type": "chat",
-            "title": "Chat Session",
-            "timestamp": session.updated_at.isoformat() if session.updated_at else session.created_at.isoformat()
-        })
-    
-    # Get recent journal entries
-    recent_journals = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id
-    ).order_by(JournalEntry.updated_at.desc()).limit(2).all()
-    
-    for journal in recent_journals:
-        recent_activity.append({
-            "type": "journal",
-            "title": journal.title or "Journal Entry",
-            "timestamp": journal.updated_at.isoformat() if journal.updated_at else journal.created_at.isoformat()
-        })
-    
-    # Sort by timestamp
-    recent_activity.sort(key=lambda x: x["timestamp"], reverse=True)
-    recent_activity = recent_activity[:5]
-    
-    return DashboardResponse(
-        total_sessions=total_sessions,
-        total_mood_logs=total_mood_logs,
-        total_journal_entries=total_journal_entries,
-        current_streak=current_streak,
-        recent_mood=recent_mood_type,
-        recent_activity=recent_activity
-    )
+    return DashboardResponse(**dashboard.get_dashboard(db, current_user))
 
 @router.get("/export")
 async def export_user_data(
@@ -119,10 +57,11 @@ async def export_user_data(
         
         # Sessions
         sessions = db.query(ChatSession).filter(ChatSession.user_id == current_user.id).all()
+        histories = load_messages_for_sessions(db, [session.id for session in sessions])
         for session in sessions:
             user_data["sessions"].append({
                 "id": session.id,
-                "messages": session.messages,
+                "messages": histories[session.id],
                 "sentiment": session.sentiment,
                 "created_at": session.created_at.isoformat() if session.created_at else None,
                 "updated_at": session.updated_at.isoformat() if session.updated_at else None
@@ -243,6 +182,7 @@ async def delete_account(
     """
     try:
         user_id = current_user.id
+        email = current_user.email
         
         # Delete all user data (cascade should handle most, but being explicit)
         # The cascade relationships should handle deletion, but we'll be explicit for safety
@@ -250,6 +190,8 @@ async def delete_account(
         # Delete user (this will cascade delete all related records)
         db.delete(current_user)
         db.commit()
+        # Tokens for the deleted account must stop resolving in every worker
+        invalidate_user(email)
         
         return {
             "message": "Account and all associated data have been permanently deleted",
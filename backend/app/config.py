@@ -2,16 +2,72 @@
 Application Configuration
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     # Groq API
     groq_api_key: str = "your_groq_api_key_here"
     groq_model: str = "llama-3.1-8b-instant"  # Updated: llama-3.1-70b-versatile was decommissioned
+    groq_base_url: Optional[str] = None  # Override API host (e.g. local stub server for load tests)
+    
+    # Groq HTTP client - one pooled connection set shared by all requests in a worker
+    groq_connect_timeout: float = 5.0  # Seconds to establish a connection
+    groq_read_timeout: float = 60.0  # Seconds to wait for a completion
+    groq_max_connections: int = 500  # Max concurrent connections to the API
+    groq_max_keepalive_connections: int = 100  # Idle connections kept open for reuse
+    groq_http2: bool = True  # Use HTTP/2 when the h2 package is installed
+    
+    # Sentiment for chat turns:
+    # 'lexicon' - local classifier, no extra latency
+    # 'background' - LLM call after the response is sent, fills Session.sentiment later
+    # 'inline' - LLM call before responding (legacy, adds a full round-trip)
+    sentiment_mode: Literal["lexicon", "background", "inline"] = "lexicon"
+    
+    # Chat context window - older turns are folded into a rolling summary
+    context_keep_turns: int = 6  # Latest user/assistant exchanges never folded into the summary
+    context_token_budget: int = 3000  # Hard cap on prompt tokens (local estimate)
+    context_summary_batch_turns: int = 4  # Exchanges to accumulate before re-summarizing
     
     # Database - Supports SQLite (local) and PostgreSQL (Vercel)
     database_url: str = "sqlite:///./ai_therapist.db"
     
+    # Authenticated user cache (per worker) - skips the users lookup on most requests
+    user_cache_size: int = 10000  # Max cached users; least recently used are evicted
+    user_cache_ttl_seconds: float = 60.0  # Upper bound on staleness if an invalidation is missed
+    
+    # Dashboard cache (per worker) - invalidated by the activity write paths
+    dashboard_cache_size: int = 10000  # Max cached dashboards; least recently used are evicted
+    dashboard_cache_ttl_seconds: float = 300.0  # Also bounds how late the streak notices a new local day
+    
+    # Sleep analytics cache (per worker) - invalidated by the sleep and mood write paths
+    sleep_analytics_cache_size: int = 10000
+    sleep_analytics_cache_ttl_seconds: float = 3600.0  # Also bounds how late rollups roll over to a new week/month
+    
+    # Cross-worker events (cache invalidation); e.g. redis://localhost:6379/0
+    # Needs the redis package. Unset = events stay within each worker process.
+    pubsub_url: Optional[str] = None
+    pubsub_socket_timeout_seconds: float = 2.0  # Bounds each Redis call on the relay threads
+    pubsub_relay_queue_size: int = 10000  # Events waiting to be relayed; beyond that they're dropped (peers fall back on TTLs)
+    
+    # Password hashing - bcrypt runs on a thread pool so it doesn't block the event loop
+    password_hash_workers: int = 2  # Hashing threads per worker; 0 = hash inline (legacy)
+    login_max_concurrency: int = 8  # Logins/registrations/password changes hashing at once
+    login_max_waiting: int = 32  # Further requests allowed to queue; beyond that get 503
+    login_wait_timeout_seconds: float = 5.0  # Max time a queued request waits before 503
+    
+    # Reminder scheduler - sends notifications when each user's reminders come due
+    # Enable to run it inside every API worker (safe: reminders are claimed atomically),
+    # or leave off and run `python notification_scheduler.py --worker` as its own process
+    reminder_scheduler_enabled: bool = False
+    reminder_scheduler_horizon_seconds: float = 300.0  # How far ahead fire times are loaded into memory
+    reminder_catchup_grace_minutes: int = 120  # Missed reminders older than this are skipped, not sent late
+    
+    # Notification push - GET /api/notifications/stream (Server-Sent Events), fed through the event broker
+    notification_stream_max_connections: int = 10000  # Open streams per worker; beyond that get 503 (mind `ulimit -n`)
+    notification_stream_heartbeat_seconds: float = 20.0  # Idle streams get a comment this often so proxies keep them open
+    notification_stream_queue_size: int = 100  # Undelivered events held per stream; a client that falls further behind loses pushes
+    notification_stream_ticket_seconds: int = 60  # Lifetime of the ?ticket= an EventSource opens the stream with
+    
     # JWT
     secret_key: str = "your_secret_key_change_in_production_12345678901234567890"
     algorithm: str = "HS256"
@@ -2,10 +2,14 @@
 Database Configuration and Session Management
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 import os
+import shlex
+import ssl
 
 # Support both SQLite (local) and PostgreSQL (Vercel)
 database_url = settings.database_url
@@ -38,6 +42,86 @@ else:
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine - same database through an asyncio driver (aiosqlite / asyncpg),
+# so queries in async routes don't block the event loop. Routers move onto
+# get_async_db one at a time; the sync engine above keeps serving the rest.
+
+# URL parameters asyncpg.connect() accepts as they are. The dialect passes every
+# query parameter to it as a keyword, so libpq-only ones (channel_binding,
+# gssencmode, keepalives, ...) must not reach it.
+ASYNCPG_QUERY_PARAMS = {
+    "prepared_statement_cache_size", "statement_cache_size", "command_timeout",
+    "target_session_attrs", "krbsrvname", "passfile",
+}
+
+def _server_settings(options: str) -> dict:
+    """libpq's options parameter ("-c key=value ..." / "--key=value") as asyncpg server_settings"""
+    values, args = {}, shlex.split(options)
+    for i, arg in enumerate(args):
+        if arg == "-c" and i + 1 < len(args):
+            arg = args[i + 1]
+        elif arg.startswith("-c"):
+            arg = arg[2:]
+        elif arg.startswith("--"):
+            arg = arg[2:]
+        else:
+            continue
+        key, sep, value = arg.partition("=")
+        if sep:
+            values[key.replace("-", "_")] = value
+    return values
+
+def _ssl_arg(mode: str, query: dict):
+    """asyncpg's ssl argument for libpq's sslmode and certificate files"""
+    rootcert, cert, key = query.get("sslrootcert"), query.get("sslcert"), query.get("sslkey")
+    if not (rootcert or cert):
+        return mode  # asyncpg takes the sslmode names as they are
+    context = ssl.create_default_context(cafile=rootcert)
+    if cert:
+        context.load_cert_chain(cert, key)
+    context.check_hostname = mode == "verify-full"
+    if mode not in ("verify-ca", "verify-full"):
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+def to_async_url(url: str):
+    """Map a sync database URL onto its asyncio driver"""
+    url = make_url(url)
+    connect_args = {}
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+        connect_args["check_same_thread"] = False
+    else:
+        url = url.set(drivername="postgresql+asyncpg")
+        query = dict(url.query)
+        sslmode = query.get("sslmode")
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = _ssl_arg(sslmode, query)
+        if query.get("connect_timeout"):
+            connect_args["timeout"] = float(query["connect_timeout"])
+        server_settings = _server_settings(query["options"]) if query.get("options") else {}
+        if query.get("application_name"):
+            server_settings["application_name"] = query["application_name"]
+        if server_settings:
+            connect_args["server_settings"] = server_settings
+        url = url.set(query={key: value for key, value in query.items() if key in ASYNCPG_QUERY_PARAMS})
+    return url, connect_args
+
+async_database_url, async_connect_args = to_async_url(database_url)
+
+if "sqlite" in database_url:
+    async_engine = create_async_engine(async_database_url, connect_args=async_connect_args)
+else:
+    async_engine = create_async_engine(
+        async_database_url,
+        connect_args=async_connect_args,
+        pool_pre_ping=True,
+        pool_recycle=300,
+    )
+
+# expire_on_commit=False: attributes can't lazy-load after commit in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -49,3 +133,7 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -36,6 +36,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor of the next page on the list endpoints
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Import routers
@@ -55,6 +57,33 @@ app.include_router(notifications.router, prefix="/api/notifications", tags=["Not
 app.include_router(insights.router, prefix="/api/insights", tags=["AI Insights"])
 app.include_router(migrate.router, prefix="/api/migrate", tags=["Migration"])
 
+@app.on_event("startup")
+async def start_reminder_scheduler():
+    if settings.reminder_scheduler_enabled:
+        from app.services.reminder_scheduler import reminder_scheduler
+        reminder_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_reminder_scheduler():
+    if settings.reminder_scheduler_enabled:
+        from app.services.reminder_scheduler import reminder_scheduler
+        await reminder_scheduler.stop()
+
+@app.on_event("shutdown")
+async def close_groq_client():
+    from app.services.groq_service import groq_service
+    await groq_service.aclose()
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    from app.services.password_hashing import password_hasher
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    from app.database import async_engine
+    await async_engine.dispose()
+
 @app.get("/")
 async def root():
     return {
@@ -65,7 +94,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    from app.services.password_hashing import password_hasher, login_limiter
+    from app.services.notification_stream import notification_hub
+    return {
+        "status": "healthy",
+        "password_hashing": {**password_hasher.stats(), "login_limiter": login_limiter.stats()},
+        "notification_stream": notification_hub.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,8 +1,9 @@
 """
 Database Models
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, ForeignKey, JSON, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -32,20 +33,54 @@ class User(Base):
     crisis_alerts = relationship("CrisisAlert", back_populates="user", cascade="all, delete-orphan")
     notification_preferences = relationship("NotificationPreferences", back_populates="user", uselist=False, cascade="all, delete-orphan")
     notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
+    reminder_schedules = relationship("ReminderSchedule", back_populates="user", cascade="all, delete-orphan")
+    notification_counter = relationship("NotificationCounter", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    daily_activity = relationship("DailyActivity", back_populates="user", cascade="all, delete-orphan")
+    streak = relationship("UserStreak", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    insight = relationship("UserInsight", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
 class Session(Base):
     __tablename__ = "sessions"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    messages = Column(JSON, default=list)  # Store conversation messages
+    title = Column(String, nullable=True)  # Preview of the first user message, for session lists
+    messages = deferred(Column(JSON, default=list))  # Legacy conversation JSON - history now lives in chat_messages
+    message_count = Column(Integer, default=0)  # Number of chat_messages rows; next seq to assign
     sentiment = Column(String, nullable=True)  # Overall sentiment
     summary = Column(Text, nullable=True)  # AI-generated session summary
+    context_summary = Column(Text, nullable=True)  # Rolling summary of turns no longer sent verbatim
+    context_summary_count = Column(Integer, default=0)  # Number of messages folded into context_summary
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set client-side so every row has a comparable value for keyset pagination
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_sessions_user_id_updated_at", "user_id", "updated_at"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="sessions")
+    chat_messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan", order_by="ChatMessage.seq")
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    # Copy of the session's owner, so Postgres search can filter by user inside its GIN index
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    seq = Column(Integer, nullable=False)  # Position within the session, starting at 0
+    role = Column(String, nullable=False)  # 'user', 'assistant'
+    content = Column(Text, nullable=False)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    session = relationship("Session", back_populates="chat_messages")
+    
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_seq", "session_id", "seq", unique=True),
+    )
 
 class CrisisAlert(Base):
     __tablename__ = "crisis_alerts"
@@ -61,9 +96,17 @@ class CrisisAlert(Base):
     notified_authorities = Column(String, nullable=True)  # JSON string of notified services
     status = Column(String, default='pending')  # 'pending', 'notified', 'resolved'
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Backfill alerts only: the screened row ('chat' message, 'journal' entry, 'thought_record'), so a rerun never alerts it twice
+    source = Column(String, nullable=True)
+    source_id = Column(Integer, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="crisis_alerts")
+    
+    __table_args__ = (
+        Index("ix_crisis_alerts_user_id_created_at", "user_id", "created_at"),
+        Index("ix_crisis_alerts_source_source_id", "source", "source_id", unique=True),
+    )
 
 class MoodLog(Base):
     __tablename__ = "mood_logs"
@@ -77,6 +120,10 @@ class MoodLog(Base):
     
     # Relationships
     user = relationship("User", back_populates="mood_logs")
+    
+    __table_args__ = (
+        Index("ix_mood_logs_user_id_created_at", "user_id", "created_at"),
+    )
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
@@ -93,6 +140,27 @@ class JournalEntry(Base):
     
     # Relationships
     user = relationship("User", back_populates="journal_entries")
+    tag_index = relationship("JournalTag", back_populates="entry", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_journal_entries_user_id_created_at", "user_id", "created_at"),
+    )
+
+class JournalTag(Base):
+    """Normalized copy of JournalEntry.tags, one row per tag, for indexed tag filtering"""
+    __tablename__ = "journal_tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tag = Column(String, nullable=False)  # Lowercased, whitespace-collapsed
+    
+    # Relationships
+    entry = relationship("JournalEntry", back_populates="tag_index")
+    
+    __table_args__ = (
+        Index("ix_journal_tags_user_id_tag_entry_id", "user_id", "tag", "entry_id", unique=True),
+    )
 
 class ThoughtRecord(Base):
     __tablename__ = "thought_records"
@@ -111,6 +179,10 @@ class ThoughtRecord(Base):
     
     # Relationships
     user = relationship("User", back_populates="thought_records")
+    
+    __table_args__ = (
+        Index("ix_thought_records_user_id_created_at", "user_id", "created_at"),
+    )
 
 class Goal(Base):
     __tablename__ = "goals"
@@ -128,6 +200,10 @@ class Goal(Base):
     
     # Relationships
     user = relationship("User", back_populates="goals")
+    
+    __table_args__ = (
+        Index("ix_goals_user_id_created_at", "user_id", "created_at"),
+    )
 
 class SleepLog(Base):
     __tablename__ = "sleep_logs"
@@ -143,6 +219,10 @@ class SleepLog(Base):
     
     # Relationships
     user = relationship("User", back_populates="sleep_logs")
+    
+    __table_args__ = (
+        Index("ix_sleep_logs_user_id_created_at", "user_id", "created_at"),
+    )
 
 class NotificationPreferences(Base):
     __tablename__ = "notification_preferences"
@@ -188,6 +268,85 @@ class Notification(Base):
     read = Column(String, default='false')  # 'true', 'false'
     sent_at = Column(DateTime(timezone=True), server_default=func.now())
     read_at = Column(DateTime(timezone=True), nullable=True)
+    # Scheduled reminders only: '<type>:<user_id>:<local YYYY-MM-DDTHH:MM>', so one occurrence is stored once
+    dedupe_key = Column(String, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="notifications")
+    
+    __table_args__ = (
+        # Newest-first inbox, and the unread-only list / unread count
+        Index("ix_notifications_user_id_sent_at", "user_id", "sent_at"),
+        Index("ix_notifications_user_id_read_sent_at", "user_id", "read", "sent_at"),
+        Index("ix_notifications_dedupe_key", "dedupe_key", unique=True),
+    )
+
+class DailyActivity(Base):
+    """What a user logged on one of their local calendar days - one row per active day"""
+    __tablename__ = "daily_activity"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    local_date = Column(Date, primary_key=True)  # In the user's timezone at the time of the activity
+    mood_logs = Column(Integer, nullable=False, default=0)
+    journal_entries = Column(Integer, nullable=False, default=0)
+    chat_turns = Column(Integer, nullable=False, default=0)
+    sleep_logs = Column(Integer, nullable=False, default=0)
+    thought_records = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    user = relationship("User", back_populates="daily_activity")
+
+class UserStreak(Base):
+    """Activity streak per user, advanced by every write that records activity"""
+    __tablename__ = "user_streaks"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    current_streak = Column(Integer, nullable=False, default=0)  # Consecutive active days ending on last_active_date
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_active_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="streak")
+
+class UserInsight(Base):
+    """Latest AI insights per user, with the fingerprint of the data they were generated from"""
+    __tablename__ = "user_insights"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    fingerprint = Column(String, nullable=True)  # sha256 of the prompt inputs; NULL until first generated
+    insights = Column(JSON, nullable=True)
+    generated_at = Column(DateTime(timezone=True), nullable=True)
+    refresh_started_at = Column(DateTime(timezone=True), nullable=True)  # Set while a background refresh is claimed
+    
+    # Relationships
+    user = relationship("User", back_populates="insight")
+
+class NotificationCounter(Base):
+    """Unread notification count per user, kept in step with notifications in the same transaction"""
+    __tablename__ = "notification_counters"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="notification_counter")
+
+class ReminderSchedule(Base):
+    """Next fire time of one enabled reminder for one user, derived from NotificationPreferences and User.timezone"""
+    __tablename__ = "reminder_schedules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # 'daily_checkin', 'mood_reminder', 'meditation', 'goal', 'motivational'
+    next_fire_at = Column(DateTime, nullable=False)  # UTC, naive
+    last_fired_at = Column(DateTime, nullable=True)  # UTC occurrence last handled (sent or skipped)
+    
+    # Relationships
+    user = relationship("User", back_populates="reminder_schedules")
+    
+    __table_args__ = (
+        Index("ix_reminder_schedules_user_id_kind", "user_id", "kind", unique=True),
+        Index("ix_reminder_schedules_next_fire_at", "next_fire_at"),
+    )
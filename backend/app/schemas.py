@@ -1,9 +1,9 @@
 """
 Pydantic Schemas for Request/Response Validation
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import date, datetime
 
 # User Schemas
 class UserBase(BaseModel):
@@ -133,6 +133,23 @@ class SessionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SessionListItem(BaseModel):
+    id: int
+    title: Optional[str] = None
+    sentiment: Optional[str] = None
+    message_count: Optional[int] = 0
+    created_at: datetime
+    updated_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+class SessionSearchResult(SessionListItem):
+    summary: Optional[str] = None
+    snippet: str  # Best-matching message, matched terms wrapped in <mark>
+    score: float  # Relevance, higher is better
+    matches: int  # Matching messages among the top-ranked hits
+
 class SessionSummaryRequest(BaseModel):
     session_id: int
 
@@ -194,18 +211,16 @@ class NotificationResponse(BaseModel):
 # Mood Schemas
 class MoodLogCreate(BaseModel):
     mood_type: str
-    mood_value: int
-    intensity: Optional[float] = None
-    trigger: Optional[str] = None
+    intensity: Optional[int] = Field(None, ge=1, le=10)
+    mood_value: Optional[int] = Field(None, ge=1, le=10)  # Older clients send the intensity under this name
     notes: Optional[str] = None
 
 class MoodLogResponse(BaseModel):
     id: int
     user_id: int
     mood_type: str
-    mood_value: int
-    intensity: Optional[float]
-    trigger: Optional[str]
+    intensity: Optional[int]
+    mood_value: Optional[int] = Field(None, validation_alias="intensity")  # Same as intensity, for older clients
     notes: Optional[str]
     created_at: datetime
     
@@ -269,6 +284,41 @@ class MoodStatsResponse(BaseModel):
     mood_distribution: Dict[str, int]
     recent_trend: str  # "improving", "declining", "stable"
 
+class MoodTrendDay(BaseModel):
+    date: date
+    average: Optional[float]  # None on days without logs
+    logs: int
+    rolling_7d: Optional[float]
+    rolling_30d: Optional[float]
+
+class MoodTrendWeek(BaseModel):
+    week_start: date  # Monday
+    average: Optional[float]
+    logs: int
+    delta: Optional[float]  # Change from the week before
+
+class MoodWeekdayProfile(BaseModel):
+    day: str
+    average: Optional[float]
+    logs: int
+
+class MoodHourProfile(BaseModel):
+    hour: int  # Local hour, 0-23
+    average: Optional[float]
+    logs: int
+
+class MoodTrendsResponse(BaseModel):
+    total_logs: int
+    rolling_7d: Optional[float]
+    rolling_30d: Optional[float]
+    week_over_week: Optional[float]
+    slope_per_week: Optional[float]  # Intensity points per week over the daily series
+    recent_trend: str  # "improving", "declining", "stable"
+    daily: List[MoodTrendDay]
+    weekly: List[MoodTrendWeek]
+    day_of_week: List[MoodWeekdayProfile]  # Monday first
+    hour_of_day: List[MoodHourProfile]
+
 # Journal Schemas
 class JournalEntryCreate(BaseModel):
     title: Optional[str] = None
@@ -292,6 +342,10 @@ class JournalEntryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class JournalTagCount(BaseModel):
+    tag: str
+    count: int
+
 # Notification Schemas
 class NotificationPreferencesUpdate(BaseModel):
     daily_checkin_enabled: Optional[str] = None
@@ -349,6 +403,7 @@ class DashboardResponse(BaseModel):
     total_mood_logs: int
     total_journal_entries: int
     current_streak: int
+    longest_streak: int = 0
     recent_mood: Optional[str]
     recent_activity: List[Dict]
 
@@ -377,15 +432,23 @@ class ThoughtRecordResponse(BaseModel):
     id: int
     user_id: int
     situation: Optional[str]
-    automatic_thoughts: Optional[str]
-    emotions: Optional[str]
-    emotion_intensity: Optional[int]
+    automatic_thoughts: Optional[str] = Field(validation_alias="automatic_thought")
+    emotions: Optional[str] = Field(validation_alias="emotion")
+    emotion_intensity: Optional[int] = Field(validation_alias="intensity")
     evidence_for: Optional[str]
     evidence_against: Optional[str]
-    alternative_thoughts: Optional[str]
-    outcome_rating: Optional[int]
+    alternative_thoughts: Optional[str] = Field(validation_alias="alternative_thought")
+    outcome_rating: Optional[int] = Field(validation_alias="outcome")
     created_at: datetime
-    updated_at: Optional[datetime]
+    updated_at: Optional[datetime] = None
+    
+    @field_validator("outcome_rating", mode="before")
+    @classmethod
+    def rating_or_none(cls, value):
+        # The outcome column is free text; only a number is a rating
+        if isinstance(value, str):
+            return int(value) if value.strip().isdigit() else None
+        return value
     
     class Config:
         from_attributes = True
@@ -526,16 +589,16 @@ class NotificationResponse(BaseModel):
 class SleepLogCreate(BaseModel):
     sleep_hours: float
     sleep_quality: int
-    bedtime: Optional[datetime] = None
+    bedtime: Optional[datetime] = None  # Without an offset, read as the user's local time
     wake_time: Optional[datetime] = None
     notes: Optional[str] = None
 
 class SleepLogResponse(BaseModel):
     id: int
     user_id: int
-    sleep_hours: float
-    sleep_quality: int
-    bedtime: Optional[datetime]
+    sleep_hours: Optional[float] = Field(validation_alias="duration_hours")
+    sleep_quality: Optional[int] = Field(validation_alias="quality")
+    bedtime: Optional[datetime] = Field(validation_alias="sleep_time")
     wake_time: Optional[datetime]
     notes: Optional[str]
     created_at: datetime
@@ -543,6 +606,33 @@ class SleepLogResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SleepStatsResponse(BaseModel):
+    total_logs: int
+    average_hours: float
+    average_quality: float
+
+class SleepRollup(BaseModel):
+    period_start: date  # Monday of the week, or first of the month
+    nights: int
+    average_hours: Optional[float]
+    average_quality: Optional[float]
+    bedtime_std_minutes: Optional[float]
+
+class SleepMoodCorrelation(BaseModel):
+    pairs: int  # Nights with a mood logged on the day they ended
+    duration: Optional[float]  # Pearson r against that day's mean mood intensity
+    quality: Optional[float]
+
+class SleepAnalyticsResponse(BaseModel):
+    total_nights: int
+    average_hours: Optional[float]
+    average_quality: Optional[float]
+    average_bedtime: Optional[str]  # Local "HH:MM"
+    bedtime_std_minutes: Optional[float]  # Consistency: lower is steadier
+    weekly: List[SleepRollup]
+    monthly: List[SleepRollup]
+    mood_correlation: SleepMoodCorrelation
+
 # Notification Schemas
 class NotificationPreferencesUpdate(BaseModel):
     daily_checkin_enabled: Optional[str] = None
@@ -0,0 +1,193 @@
+"""
+Daily Activity
+Every write that counts as engaging with the app - a mood log, journal
+entry, chat turn, sleep log or thought record - calls record_activity() in
+its own transaction. That bumps the user's daily_activity row for the local
+day and advances their user_streaks row, so the streak is read with a
+primary key lookup instead of scanning history. backfill_activity()
+rebuilds both tables from history, a batch of users at a time.
+Activity is a record of what happened on a day: deleting the entry later
+doesn't undo it (a backfill, which recounts what still exists, does).
+"""
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import (
+    ChatMessage, DailyActivity, JournalEntry, MoodLog, Session as ChatSession,
+    SleepLog, ThoughtRecord, User, UserStreak
+)
+from app.services.reminder_schedule import user_zone
+
+logger = logging.getLogger(__name__)
+
+# Activity kind -> DailyActivity counter column
+ACTIVITY_COLUMNS = {
+    "mood": "mood_logs",
+    "journal": "journal_entries",
+    "chat": "chat_turns",
+    "sleep": "sleep_logs",
+    "cbt": "thought_records",
+}
+
+BACKFILL_BATCH_SIZE = 500
+
+UTC = timezone.utc
+
+def local_date(instant: datetime, zone) -> date:
+    """The user's calendar date at a naive-UTC or aware instant"""
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=UTC)
+    return instant.astimezone(zone).date()
+
+def _dialect_insert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def _ensure_streak_rows(db: Session, user_ids: Iterable[int]):
+    rows = [{"user_id": user_id, "current_streak": 0, "longest_streak": 0} for user_id in sorted(user_ids)]
+    if rows:
+        statement = _dialect_insert(db)(UserStreak).on_conflict_do_nothing(index_elements=[UserStreak.user_id])
+        db.connection().execute(statement, rows)
+
+def _lock_streak(db: Session, user_id: int) -> UserStreak:
+    # Taken before touching daily_activity, in the same order as the backfill, so the two never deadlock
+    query = db.query(UserStreak).filter(UserStreak.user_id == user_id).with_for_update()
+    streak = query.first()
+    if streak is None:
+        _ensure_streak_rows(db, [user_id])
+        streak = query.populate_existing().first()
+    return streak
+
+def advance_streak(streak: UserStreak, day: date):
+    """Count `day` as active: extend the streak if it follows the last active day, else restart it"""
+    last = streak.last_active_date
+    if last is not None and day <= last:
+        return  # Already counted (or a late write for an earlier day)
+    streak.current_streak = (streak.current_streak or 0) + 1 if last == day - timedelta(days=1) else 1
+    streak.longest_streak = max(streak.longest_streak or 0, streak.current_streak)
+    streak.last_active_date = day
+
+def record_activity(
+    db: Session,
+    user_id: int,
+    kind: str,
+    timezone_name: Optional[str] = None,
+    at: Optional[datetime] = None
+):
+    """
+    Count one activity of `kind` (a key of ACTIVITY_COLUMNS) for the user's
+    local day at `at` (default now) and advance their streak. Adds to the
+    caller's transaction; the caller commits. From an AsyncSession, use
+    `await db.run_sync(record_activity, ...)`.
+    """
+    day = local_date(at or datetime.utcnow(), user_zone(timezone_name))
+    column = ACTIVITY_COLUMNS[kind]
+    streak = _lock_streak(db, user_id)
+
+    statement = _dialect_insert(db)(DailyActivity).values(user_id=user_id, local_date=day, **{column: 1})
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[DailyActivity.user_id, DailyActivity.local_date],
+        set_={column: getattr(DailyActivity, column) + 1}
+    ))
+    advance_streak(streak, day)
+
+def visible_streak(current_streak: Optional[int], last_active_date: Optional[date], today: date) -> int:
+    """
+    The streak as of today: still running if the user was active today or
+    yesterday (they may not have logged anything yet today), otherwise broken
+    """
+    if last_active_date is None or last_active_date < today - timedelta(days=1):
+        return 0
+    return current_streak or 0
+
+def streak_runs(days: Iterable[date]) -> Tuple[int, int]:
+    """(run of consecutive days ending at the last one, longest run) over sorted distinct days"""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+def _history(db: Session, user_ids: list):
+    """(kind, user_id, timestamp) of every activity of these users still on record"""
+    sources = {
+        "mood": db.query(MoodLog.user_id, MoodLog.created_at).filter(MoodLog.user_id.in_(user_ids)),
+        "journal": db.query(JournalEntry.user_id, JournalEntry.created_at).filter(JournalEntry.user_id.in_(user_ids)),
+        "chat": db.query(ChatSession.user_id, ChatMessage.timestamp).join(
+            ChatSession, ChatSession.id == ChatMessage.session_id
+        ).filter(ChatSession.user_id.in_(user_ids), ChatMessage.role == 'user'),
+        "sleep": db.query(SleepLog.user_id, SleepLog.created_at).filter(SleepLog.user_id.in_(user_ids)),
+        "cbt": db.query(ThoughtRecord.user_id, ThoughtRecord.created_at).filter(ThoughtRecord.user_id.in_(user_ids)),
+    }
+    for kind, query in sources.items():
+        for user_id, at in query:
+            if at is not None:
+                yield kind, user_id, at
+
+def backfill_activity(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> dict:
+    """
+    Rebuild daily_activity and user_streaks from the activity tables, one
+    transaction per batch of users. The batch's streak rows are locked first,
+    so writes racing the rebuild wait for it and then apply on top. Safe to
+    re-run.
+    """
+    started = time.perf_counter()
+    last_user_id = 0
+    users = 0
+    active_days = 0
+
+    while True:
+        batch = db.query(User.id, User.timezone).filter(User.id > last_user_id).order_by(User.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_user_id = batch[-1].id
+        user_ids = [row.id for row in batch]
+        zones = {row.id: user_zone(row.timezone) for row in batch}
+
+        _ensure_streak_rows(db, user_ids)
+        db.query(UserStreak.user_id).filter(UserStreak.user_id.in_(user_ids)).order_by(UserStreak.user_id).with_for_update().all()
+
+        counts: Dict[Tuple[int, date], Counter] = defaultdict(Counter)
+        for kind, user_id, at in _history(db, user_ids):
+            counts[(user_id, local_date(at, zones[user_id]))][ACTIVITY_COLUMNS[kind]] += 1
+
+        db.query(DailyActivity).filter(DailyActivity.user_id.in_(user_ids)).delete(synchronize_session=False)
+        if counts:
+            db.connection().execute(DailyActivity.__table__.insert(), [
+                {"user_id": user_id, "local_date": day, **{column: counter[column] for column in ACTIVITY_COLUMNS.values()}}
+                for (user_id, day), counter in sorted(counts.items())
+            ])
+
+        days_by_user = defaultdict(list)
+        for user_id, day in sorted(counts):
+            days_by_user[user_id].append(day)
+        streaks = []
+        for user_id in user_ids:
+            days = days_by_user.get(user_id, [])
+            current, longest = streak_runs(days)
+            streaks.append({
+                "user_id": user_id,
+                "current_streak": current,
+                "longest_streak": longest,
+                "last_active_date": days[-1] if days else None,
+            })
+        db.execute(update(UserStreak), streaks)
+        db.commit()
+
+        users += len(user_ids)
+        active_days += len(counts)
+        logger.info(f"Rebuilt activity for {users} users")
+
+    return {
+        "users": users,
+        "active_days": active_days,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -68,3 +68,23 @@ def decode_access_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+
+# Tickets authorize opening the notification stream and nothing else. EventSource
+# can't send headers, so the credential ends up in the URL - and in access logs.
+STREAM_TICKET_PURPOSE = "notification-stream"
+
+def create_stream_ticket(user_id: int) -> str:
+    """Short-lived JWT that only opens the user's notification stream"""
+    expire = datetime.utcnow() + timedelta(seconds=settings.notification_stream_ticket_seconds)
+    to_encode = {"sub": str(user_id), "purpose": STREAM_TICKET_PURPOSE, "exp": expire}
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+
+def decode_stream_ticket(ticket: str) -> Optional[int]:
+    """User id a valid stream ticket was issued for"""
+    payload = decode_access_token(ticket)
+    if payload is None or payload.get("purpose") != STREAM_TICKET_PURPOSE:
+        return None
+    try:
+        return int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,183 @@
+"""
+Chat History Search
+Full-text index over chat_messages. On SQLite it is an FTS5 table kept in
+step with chat_messages by triggers; on PostgreSQL it is a generated tsvector
+column in a composite (user_id, search_vector) GIN index (btree_gin), so a
+search only visits the searching user's postings. Either way every appended
+message is indexed in the same transaction that stores it, and searches
+never read message bodies that don't match.
+"""
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services import fulltext
+
+FTS_TABLE = "chat_messages_fts"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+CANDIDATE_MESSAGES = 200  # Most recent matching messages scored and grouped into sessions
+
+_SQLITE_DDL = [
+    # owner holds fulltext.owner_token(user_id)
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, owner, session_id UNINDEXED, tokenize = 'porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, content, owner, session_id)
+        SELECT new.id, new.content, 'u' || s.user_id, new.session_id FROM sessions s WHERE s.id = new.session_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update AFTER UPDATE OF content ON chat_messages BEGIN
+        UPDATE {FTS_TABLE} SET content = new.content WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS user_id INTEGER REFERENCES users (id)",
+    """ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED""",
+    """CREATE INDEX IF NOT EXISTS ix_chat_messages_user_id_search_vector
+        ON chat_messages USING GIN (user_id, search_vector)""",
+    # Superseded by the composite index above
+    "DROP INDEX IF EXISTS ix_chat_messages_search_vector",
+]
+
+def ensure_search_index(bind) -> bool:
+    """Create the chat search index if missing; True when it still needs rebuild_search_index()"""
+    return fulltext.ensure_index(bind, FTS_TABLE, _SQLITE_DDL, _POSTGRES_DDL)
+
+def rebuild_search_index(bind) -> int:
+    """Reindex every stored message (SQLite only); returns the number of rows indexed"""
+    return fulltext.rebuild_sqlite_index(bind, FTS_TABLE, f"""
+        INSERT INTO {FTS_TABLE} (rowid, content, owner, session_id)
+        SELECT m.id, m.content, 'u' || s.user_id, m.session_id
+        FROM chat_messages m JOIN sessions s ON s.id = m.session_id
+    """)
+
+def backfill_message_owners(bind, batch_size: int = 5000) -> int:
+    """
+    Copy each session's user_id onto its chat_messages rows that predate the
+    column, in batches by message id. Postgres search can't see a message
+    until its row has an owner. Returns the number of rows updated.
+    """
+    updated = 0
+    with bind.connect() as conn:
+        last_id = 0
+        max_id = conn.execute(text("SELECT max(id) FROM chat_messages")).scalar() or 0
+        while last_id < max_id:
+            updated += conn.execute(text("""
+                UPDATE chat_messages SET user_id = (
+                    SELECT s.user_id FROM sessions s WHERE s.id = chat_messages.session_id
+                )
+                WHERE id > :start AND id <= :end AND user_id IS NULL
+            """), {"start": last_id, "end": last_id + batch_size}).rowcount
+            conn.commit()
+            last_id += batch_size
+    return updated
+
+def search_sessions(db: Session, user_id: int, query: str, limit: int = 20) -> List[Dict]:
+    """
+    Rank the user's sessions for a query. All terms must match; the last one
+    is treated as a prefix so results update while the user is typing.
+    Returns [{"session_id", "score", "snippet", "matches"}], best first,
+    where snippet is the session's best-matching message with terms wrapped
+    in <mark>.
+    
+    Relevance is computed over the CANDIDATE_MESSAGES most recent matches,
+    which the index can return without visiting older hits - so a term that
+    occurs in half of someone's history costs the same as a rare one.
+    """
+    terms = fulltext.query_terms(query)
+    if not terms:
+        return []
+
+    search = _PostgresSearch(db, user_id, terms) if db.bind.dialect.name == "postgresql" else _SqliteSearch(db, user_id, terms)
+
+    sessions: Dict[int, Dict] = {}
+    for message_id, session_id, score in search.candidates(CANDIDATE_MESSAGES):
+        hit = sessions.get(session_id)
+        if hit is None:
+            sessions[session_id] = {"session_id": session_id, "score": score, "message_id": message_id, "matches": 1}
+            continue
+        hit["matches"] += 1
+        if score > hit["score"]:
+            hit["score"], hit["message_id"] = score, message_id
+
+    # Candidates arrive newest first and the sort is stable, so ties go to recent sessions
+    ranked = sorted(sessions.values(), key=lambda hit: hit["score"], reverse=True)[:limit]
+    snippets = search.snippets([hit["message_id"] for hit in ranked]) if ranked else {}
+    return [
+        {
+            "session_id": hit["session_id"],
+            "score": hit["score"],
+            "snippet": snippets.get(hit["message_id"], ""),
+            "matches": hit["matches"],
+        }
+        for hit in ranked
+    ]
+
+class _SqliteSearch:
+    """
+    FTS5 search. bm25() would have to count the owner token's documents on
+    every query, so a candidate's score is instead the number of matched terms
+    in its best 16-token snippet window - which also rewards terms that occur
+    close together.
+    """
+
+    def __init__(self, db: Session, user_id: int, terms: List[str]):
+        self.db = db
+        self.match = fulltext.sqlite_match(terms, ["content"], user_id)
+        self._snippets: Dict[int, str] = {}
+
+    def candidates(self, limit: int) -> List[tuple]:
+        rows = self.db.execute(text(f"""
+            SELECT rowid, session_id, snippet({FTS_TABLE}, 0, :start, :end, '…', 16)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH :match
+            ORDER BY rowid DESC
+            LIMIT :limit
+        """), {"match": self.match, "start": HIGHLIGHT_START, "end": HIGHLIGHT_END, "limit": limit}).all()
+        self._snippets = {message_id: snippet for message_id, _, snippet in rows}
+        return [(message_id, session_id, float(snippet.count(HIGHLIGHT_START))) for message_id, session_id, snippet in rows]
+
+    def snippets(self, message_ids: List[int]) -> Dict[int, str]:
+        return {message_id: self._snippets[message_id] for message_id in message_ids}
+
+class _PostgresSearch:
+    """tsvector search; ts_rank is only evaluated for the candidate rows"""
+
+    HEADLINE_OPTIONS = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8, MaxFragments=1"
+
+    def __init__(self, db: Session, user_id: int, terms: List[str]):
+        self.db = db
+        self.user_id = user_id
+        self.tsquery = fulltext.postgres_tsquery(terms)
+
+    def candidates(self, limit: int) -> List[tuple]:
+        # Both conditions are answered by ix_chat_messages_user_id_search_vector, so
+        # other users' matches are never read. MATERIALIZED keeps the planner from
+        # walking every user's messages backwards by id to satisfy ORDER BY ... LIMIT.
+        return self.db.execute(text("""
+            WITH matches AS MATERIALIZED (
+                SELECT id, session_id, search_vector
+                FROM chat_messages
+                WHERE user_id = :user_id AND search_vector @@ to_tsquery('english', :tsquery)
+            )
+            SELECT id, session_id, ts_rank(search_vector, to_tsquery('english', :tsquery)) AS score
+            FROM matches
+            ORDER BY id DESC
+            LIMIT :limit
+        """), {"tsquery": self.tsquery, "user_id": self.user_id, "limit": limit}).all()
+
+    def snippets(self, message_ids: List[int]) -> Dict[int, str]:
+        rows = self.db.execute(text("""
+            SELECT id, ts_headline('english', content, to_tsquery('english', :tsquery), :options)
+            FROM chat_messages
+            WHERE id = ANY(:ids)
+        """), {"tsquery": self.tsquery, "options": self.HEADLINE_OPTIONS, "ids": list(message_ids)}).all()
+        return dict(rows)
@@ -0,0 +1,97 @@
+"""
+Chat Message Store
+Chat history lives in the chat_messages table, one row per message, ordered
+by a per-session sequence number. Appending a turn is a counter bump plus a
+two-row insert; reads fetch only the slice they need.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.models import ChatMessage, Session as ChatSession
+
+TITLE_MAX_LENGTH = 80
+
+def append_turn(
+    db: Session,
+    session: ChatSession,
+    user_message: str,
+    assistant_message: str,
+    sentiment: Optional[str] = None
+) -> int:
+    """
+    Append a user/assistant exchange to the session (caller commits).
+    Sequence numbers are reserved with an atomic counter update, which holds
+    the session row lock until commit, so concurrent turns never collide.
+    Returns the seq of the user message.
+    """
+    now = datetime.utcnow()
+    values = {
+        "message_count": func.coalesce(ChatSession.message_count, 0) + 2,
+        "updated_at": now,
+        # Only the first turn names the session
+        "title": func.coalesce(ChatSession.title, make_title(user_message)),
+    }
+    if sentiment is not None:
+        values["sentiment"] = sentiment
+    db.execute(
+        update(ChatSession).where(ChatSession.id == session.id).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+    message_count, user_id = db.query(ChatSession.message_count, ChatSession.user_id).filter(ChatSession.id == session.id).one()
+    db.expire(session)
+
+    first_seq = message_count - 2
+    db.add_all([
+        ChatMessage(session_id=session.id, user_id=user_id, seq=first_seq, role="user", content=user_message, timestamp=now),
+        ChatMessage(session_id=session.id, user_id=user_id, seq=first_seq + 1, role="assistant", content=assistant_message, timestamp=now),
+    ])
+    return first_seq
+
+def make_title(message: str) -> str:
+    """Single-line preview of a message, used as the session title"""
+    title = " ".join(message.split())
+    if len(title) > TITLE_MAX_LENGTH:
+        title = title[:TITLE_MAX_LENGTH - 1].rstrip() + "…"
+    return title or "New conversation"
+
+def load_messages(
+    db: Session,
+    session_id: int,
+    start_seq: int = 0,
+    end_seq: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """Messages with start_seq <= seq < end_seq, oldest first, as role/content/timestamp dicts"""
+    query = db.query(ChatMessage).filter(
+        ChatMessage.session_id == session_id,
+        ChatMessage.seq >= start_seq
+    )
+    if end_seq is not None:
+        query = query.filter(ChatMessage.seq < end_seq)
+    query = query.order_by(ChatMessage.seq)
+    if limit is not None:
+        query = query.limit(limit)
+    return [message_to_dict(message) for message in query.all()]
+
+def load_messages_for_sessions(db: Session, session_ids: List[int]) -> Dict[int, List[Dict]]:
+    """Full histories for several sessions in one query"""
+    histories: Dict[int, List[Dict]] = {session_id: [] for session_id in session_ids}
+    if not session_ids:
+        return histories
+    messages = db.query(ChatMessage).filter(
+        ChatMessage.session_id.in_(session_ids)
+    ).order_by(ChatMessage.session_id, ChatMessage.seq).all()
+    for message in messages:
+        histories[message.session_id].append(message_to_dict(message))
+    return histories
+
+def message_to_dict(message: ChatMessage) -> Dict:
+    return {
+        "seq": message.seq,
+        "role": message.role,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat() if message.timestamp else None
+    }
@@ -0,0 +1,79 @@
+"""
+Conversation Context Window
+Keeps the prompt sent for each chat turn bounded: turns are folded into a
+rolling summary stored on the session once they leave the last few, every
+turn not yet folded is sent verbatim, and the whole prompt is held under a
+token budget estimated locally. A message is always either in the summary or
+eligible to be sent as it is; only the token budget can leave one out.
+"""
+import re
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+SUMMARY_PREFIX = "Summary of the earlier conversation with this user (older messages are not shown):\n"
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Cheap local token estimate. Takes the larger of a word/punctuation count
+    and chars/4, which tracks BPE tokenizers closely enough for budgeting.
+    """
+    if not text:
+        return 0
+    return max(len(_TOKEN_RE.findall(text)), len(text) // 4) + 4  # + per-message overhead
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text from the front so it fits max_tokens (keeps the most recent part)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, (max_tokens - 4) * 4)
+    return "…" + text[-max_chars:] if max_chars else ""
+
+def fit_history(
+    messages: List[Dict[str, str]],
+    context_summary: Optional[str],
+    reserved_tokens: int,
+    token_budget: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """
+    Select the history to send after the system prompt.
+    messages are all the turns not yet folded into context_summary, oldest
+    first - including those that have left the last context_keep_turns but
+    wait for a full batch before being folded.
+    reserved_tokens covers the system prompt and the new user message.
+    Returns an optional summary message followed by the newest turns that fit.
+    """
+    token_budget = token_budget if token_budget is not None else settings.context_token_budget
+    remaining = token_budget - reserved_tokens
+
+    history: List[Dict[str, str]] = []
+    if context_summary:
+        # The summary may use at most half of what's left; recent turns matter more
+        summary = truncate_to_tokens(SUMMARY_PREFIX + context_summary, max(remaining // 2, 0))
+        if summary:
+            history.append({"role": "system", "content": summary})
+            remaining -= estimate_tokens(summary)
+
+    recent: List[Dict[str, str]] = []
+    for message in reversed(messages):
+        cost = estimate_tokens(message["content"])
+        if cost > remaining:
+            break
+        recent.append(message)
+        remaining -= cost
+
+    return history + list(reversed(recent))
+
+def messages_to_fold(total_messages: int, summarized_count: int) -> int:
+    """
+    How many messages past summarized_count should be folded into the summary now.
+    Folding waits until a full batch has aged out of the verbatim window, so the
+    summary LLM call runs once every few turns rather than on every turn.
+    """
+    keep_messages = settings.context_keep_turns * 2
+    aged_out = total_messages - keep_messages - summarized_count
+    if aged_out < settings.context_summary_batch_turns * 2:
+        return 0
+    return aged_out
@@ -0,0 +1,171 @@
+"""
+Crisis Language Detector
+Keyword patterns are compiled once at import time. Exact phrases are found
+with a single regex pass per risk level; typo-tolerant matching scores all
+distinct words/phrases of a message against the keywords in one batched
+rapidfuzz call instead of one Python-level fuzz.ratio call per pair.
+"""
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+logger = logging.getLogger(__name__)
+
+CRISIS_KEYWORDS_HIGH = [
+    "suicide", "kill myself", "end my life", "hurt myself",
+    "want to die", "no point living", "self harm", "cutting",
+    "overdose", "jump off", "hang myself",
+    "end it all", "not worth living", "better off dead"
+]
+
+CRISIS_KEYWORDS_MEDIUM = [
+    "want to die", "no point", "can't go on", "give up",
+    "hopeless", "nothing matters", "life is pointless"
+]
+
+WORD_THRESHOLD = 80  # Similarity needed for a single word to match a single-word keyword
+PHRASE_THRESHOLD = 75  # Slightly lower threshold for 1-3 word phrases vs multi-word keywords
+MAX_PHRASE_WORDS = 3
+
+def _compile_alternation(keywords: Sequence[str]) -> re.Pattern:
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+class CrisisDetector:
+    """Precompiled matcher returning (is_crisis, risk_level) for a message"""
+
+    def __init__(self, keywords_high: Sequence[str], keywords_medium: Sequence[str]):
+        self.keywords_high = list(keywords_high)
+        self.keywords_medium = list(keywords_medium)
+        self._high_pattern = _compile_alternation(self.keywords_high)
+        self._medium_pattern = _compile_alternation(self.keywords_medium)
+
+        # Fuzzy targets: single words are only checked against high-risk keywords,
+        # phrases against every multi-word keyword (high first, so overlaps rank high)
+        self._single_keywords = [k for k in self.keywords_high if len(k.split()) == 1]
+        self._phrase_keywords = [k for k in self.keywords_high + self.keywords_medium if len(k.split()) > 1]
+        self._phrase_risk = ["high" if k in self.keywords_high else "medium" for k in self._phrase_keywords]
+
+    def detect(self, message: str) -> Tuple[bool, str]:
+        message_lower = message.lower()
+
+        # First: Exact match (fastest, most reliable)
+        if self._high_pattern.search(message_lower):
+            return True, "high"
+        if self._medium_pattern.search(message_lower):
+            return True, "medium"
+
+        # Second: Fuzzy matching for typos (catches misspellings)
+        words = message_lower.split()
+        if not words:
+            return False, "none"
+
+        if self._single_keywords:
+            match = self._first_fuzzy_match(_unique(words), self._single_keywords, WORD_THRESHOLD)
+            if match:
+                word, keyword, similarity = match
+                logger.info(f"Fuzzy match detected: '{word}' matches '{keyword}' (similarity: {similarity}%)")
+                return True, "high"
+
+        if self._phrase_keywords:
+            match = self._first_fuzzy_match(_unique(_phrases(words)), self._phrase_keywords, PHRASE_THRESHOLD)
+            if match:
+                phrase, keyword, similarity = match
+                logger.info(f"Fuzzy phrase match: '{phrase}' matches '{keyword}' (similarity: {similarity}%)")
+                return True, self._phrase_risk[self._phrase_keywords.index(keyword)]
+
+        return False, "none"
+
+    def detect_many(self, messages: Sequence[str]) -> List[Tuple[bool, str]]:
+        """
+        Screen a batch of messages; results are in input order and identical
+        to calling detect() on each. Words and phrases are deduplicated across
+        the whole batch so each fuzzy stage is a single cdist call.
+        """
+        results: List[Optional[Tuple[bool, str]]] = [None] * len(messages)
+        pending: Dict[int, List[str]] = {}
+
+        for idx, message in enumerate(messages):
+            message_lower = (message or "").lower()
+            if self._high_pattern.search(message_lower):
+                results[idx] = (True, "high")
+            elif self._medium_pattern.search(message_lower):
+                results[idx] = (True, "medium")
+            else:
+                words = message_lower.split()
+                if words:
+                    pending[idx] = words
+                else:
+                    results[idx] = (False, "none")
+
+        if pending and self._single_keywords:
+            word_hits = self._batch_hits(
+                _unique([w for words in pending.values() for w in words]),
+                self._single_keywords,
+                WORD_THRESHOLD
+            )
+            for idx in list(pending):
+                if any(word_hits[w] >= 0 for w in pending[idx]):
+                    results[idx] = (True, "high")
+                    del pending[idx]
+
+        if pending and self._phrase_keywords:
+            phrases_by_idx = {idx: _phrases(words) for idx, words in pending.items()}
+            phrase_hits = self._batch_hits(
+                _unique([p for phrases in phrases_by_idx.values() for p in phrases]),
+                self._phrase_keywords,
+                PHRASE_THRESHOLD
+            )
+            for idx, phrases in phrases_by_idx.items():
+                col = next((phrase_hits[p] for p in phrases if phrase_hits[p] >= 0), -1)
+                if col >= 0:
+                    results[idx] = (True, self._phrase_risk[col])
+                    del pending[idx]
+
+        for idx in pending:
+            results[idx] = (False, "none")
+        return results
+
+    @staticmethod
+    def _batch_hits(candidates: List[str], keywords: List[str], threshold: int) -> Dict[str, int]:
+        """Map each candidate to the index of the first keyword it matches, or -1"""
+        scores = process.cdist(candidates, keywords, scorer=fuzz.ratio, score_cutoff=threshold)
+        hits = scores >= threshold
+        first = np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
+        return dict(zip(candidates, first.tolist()))
+
+    @staticmethod
+    def _first_fuzzy_match(
+        candidates: List[str],
+        keywords: List[str],
+        threshold: int
+    ) -> Optional[Tuple[str, str, float]]:
+        """
+        Return (candidate, keyword, similarity) for the first candidate that
+        reaches the threshold against any keyword, preferring earlier keywords.
+        Candidates must be in message order so the result matches a sequential scan.
+        """
+        scores = process.cdist(candidates, keywords, scorer=fuzz.ratio, score_cutoff=threshold)
+        hits = scores >= threshold
+        if not hits.any():
+            return None
+        row = int(hits.any(axis=1).argmax())
+        col = int(hits[row].argmax())
+        return candidates[row], keywords[col], float(scores[row, col])
+
+def _phrases(words: List[str]) -> List[str]:
+    """All 1-3 word windows, in the order a left-to-right scan visits them"""
+    return [
+        " ".join(words[i:j])
+        for i in range(len(words))
+        for j in range(i + 1, min(i + MAX_PHRASE_WORDS + 1, len(words) + 1))
+    ]
+
+def _unique(items: List[str]) -> List[str]:
+    """Drop repeats while keeping first-occurrence order"""
+    return list(dict.fromkeys(items))
+
+# Built once at import time and shared by every request
+crisis_detector = CrisisDetector(CRISIS_KEYWORDS_HIGH, CRISIS_KEYWORDS_MEDIUM)
@@ -0,0 +1,201 @@
+"""
+Batch Crisis Screening
+Rescans stored user text (chat messages, journal entries, thought records)
+for crisis language, e.g. after the keyword list changes. Rows are streamed
+from the DB in chunks, scored in a process pool and flagged rows are written
+to crisis_alerts in bulk.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import ChatMessage, CrisisAlert, JournalEntry, Session as ChatSession, ThoughtRecord
+from app.services.crisis_detector import crisis_detector
+
+logger = logging.getLogger(__name__)
+
+SCREENING_SOURCES = ("chat", "journal", "thought_record")
+BACKFILL_STATUS = "backfill"
+
+# (source, row_id, user_id, text)
+ScreeningItem = Tuple[str, int, int, str]
+
+@dataclass
+class ScreeningStats:
+    texts: int = 0
+    flagged: int = 0
+    alerts_written: int = 0
+    elapsed_seconds: float = 0.0
+    by_source: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def texts_per_second(self) -> float:
+        return self.texts / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+def _detect_chunk(texts: List[str]) -> List[Tuple[bool, str]]:
+    # Runs in worker processes - the detector is rebuilt once per process on import
+    return crisis_detector.detect_many(texts)
+
+def screen_texts(
+    texts: Iterable[str],
+    workers: Optional[int] = None,
+    chunk_size: int = 1000
+) -> Iterator[Tuple[bool, str]]:
+    """
+    Screen any number of texts and yield (is_crisis, risk_level) in input order.
+    workers=0 screens in-process; otherwise a process pool of that size
+    (default: CPU count) works on chunks of chunk_size texts.
+    """
+    for _, results in _screen_chunks(_chunked(texts, chunk_size), workers):
+        yield from results
+
+def iter_screening_items(
+    db: Session,
+    sources: Sequence[str] = SCREENING_SOURCES,
+    chunk_size: int = 1000
+) -> Iterator[List[ScreeningItem]]:
+    """Stream user-authored text from the DB in chunks, without loading whole tables"""
+    def rows():
+        if "chat" in sources:
+            for row_id, user_id, content in _iter_chat_messages(db, chunk_size):
+                if content:
+                    yield ("chat", row_id, user_id, content)
+        if "journal" in sources:
+            for row_id, user_id, content in _iter_by_id(db, JournalEntry, JournalEntry.content, chunk_size):
+                if content:
+                    yield ("journal", row_id, user_id, content)
+        if "thought_record" in sources:
+            for row_id, user_id, thought in _iter_by_id(db, ThoughtRecord, ThoughtRecord.automatic_thought, chunk_size):
+                if thought:
+                    yield ("thought_record", row_id, user_id, thought)
+
+    return _chunked(rows(), chunk_size)
+
+def _iter_by_id(db: Session, model, column, chunk_size: int) -> Iterator[tuple]:
+    """
+    Keyset scan over (id, user_id, column). Each chunk is its own short query,
+    so no cursor stays open while alerts are committed between chunks.
+    """
+    last_id = 0
+    while True:
+        rows = db.query(model.id, model.user_id, column).filter(
+            model.id > last_id
+        ).order_by(model.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+def _iter_chat_messages(db: Session, chunk_size: int) -> Iterator[tuple]:
+    """Keyset scan over user-authored chat messages as (id, user_id, content)"""
+    last_id = 0
+    while True:
+        rows = db.query(ChatMessage.id, ChatSession.user_id, ChatMessage.content).join(
+            ChatSession, ChatSession.id == ChatMessage.session_id
+        ).filter(
+            ChatMessage.id > last_id,
+            ChatMessage.role == "user"
+        ).order_by(ChatMessage.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+def screen_database(
+    db: Session,
+    sources: Sequence[str] = SCREENING_SOURCES,
+    workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+    progress: Optional[Callable[[ScreeningStats], None]] = None
+) -> ScreeningStats:
+    """
+    Rescan stored text and bulk-insert a CrisisAlert (status 'backfill') for
+    every flagged text. Each alert records its source row and the insert skips
+    rows already alerted (unique on source, source_id), so the job can be rerun
+    whenever the keyword list changes.
+    """
+    stats = ScreeningStats(by_source={source: 0 for source in sources})
+    started = time.perf_counter()
+
+    chunks = iter_screening_items(db, sources, chunk_size)
+    for items, results in _screen_chunks(chunks, workers, key=lambda item: item[3]):
+        alerts = []
+        for (source, row_id, user_id, text), (is_crisis, risk_level) in zip(items, results):
+            stats.texts += 1
+            if not is_crisis:
+                continue
+            stats.flagged += 1
+            stats.by_source[source] += 1
+            alerts.append({
+                "user_id": user_id,
+                "risk_level": risk_level,
+                "user_message": text,
+                "status": BACKFILL_STATUS,
+                "source": source,
+                "source_id": row_id,
+            })
+
+        if alerts and not dry_run:
+            stats.alerts_written += _insert_new_alerts(db, alerts)
+            db.commit()
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        if progress:
+            progress(stats)
+
+    stats.elapsed_seconds = time.perf_counter() - started
+    logger.info(
+        f"Crisis screening finished: {stats.texts} texts, {stats.flagged} flagged, "
+        f"{stats.alerts_written} alerts written ({stats.texts_per_second:.0f} texts/s)"
+    )
+    return stats
+
+def _screen_chunks(chunks: Iterable[list], workers: Optional[int], key: Callable = lambda text: text):
+    """Yield (chunk, results) pairs in order, keeping a bounded number of chunks in flight"""
+    if workers == 0:
+        for chunk in chunks:
+            yield chunk, crisis_detector.detect_many([key(item) for item in chunk])
+        return
+
+    max_workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        max_in_flight = max_workers * 2
+        in_flight = []
+        for chunk in chunks:
+            in_flight.append((chunk, executor.submit(_detect_chunk, [key(item) for item in chunk])))
+            if len(in_flight) >= max_in_flight:
+                done_chunk, future = in_flight.pop(0)
+                yield done_chunk, future.result()
+        for done_chunk, future in in_flight:
+            yield done_chunk, future.result()
+
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _insert_new_alerts(db: Session, alerts: List[dict]) -> int:
+    """Insert alerts whose source row has none yet; returns how many were written"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        db.execute(insert(CrisisAlert), alerts)
+        return len(alerts)
+
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = dialect_insert(CrisisAlert).on_conflict_do_nothing(
+        index_elements=[CrisisAlert.source, CrisisAlert.source_id]
+    ).returning(CrisisAlert.id)
+    return len(db.connection().execute(statement, alerts).all())
@@ -0,0 +1,100 @@
+"""
+Dashboard
+GET /api/user/dashboard is the most requested page after chat. It is built
+from one row of per-user aggregates (the counts and latest mood as scalar
+subqueries, next to the user_streaks row kept by app.services.activity) and
+one UNION ALL of the most recent sessions and journal entries, then cached
+per user. The mood, journal, chat, sleep and thought record write paths call
+invalidate_dashboard() after committing; the event broker carries the
+invalidation to every other worker.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import JournalEntry, MoodLog, Session as ChatSession, User, UserStreak
+from app.services.activity import local_date, visible_streak
+from app.services.cache import TTLCache
+from app.services.pubsub import broker
+from app.services.reminder_schedule import user_zone
+
+INVALIDATION_CHANNEL = "dashboard-invalidate"
+
+RECENT_SESSIONS = 3
+RECENT_JOURNALS = 2
+RECENT_ACTIVITY = 5
+
+dashboard_cache = TTLCache(maxsize=settings.dashboard_cache_size, ttl=settings.dashboard_cache_ttl_seconds)
+
+def totals(db: Session, user_id: int):
+    """Counts, the latest mood and the stored streak, in one statement"""
+    def count(column, user_column):
+        return select(func.count(column)).where(user_column == user_id).scalar_subquery()
+
+    def streak(column):
+        return select(column).where(UserStreak.user_id == user_id).scalar_subquery()
+
+    return db.execute(select(
+        count(ChatSession.id, ChatSession.user_id).label("total_sessions"),
+        count(MoodLog.id, MoodLog.user_id).label("total_mood_logs"),
+        count(JournalEntry.id, JournalEntry.user_id).label("total_journal_entries"),
+        select(MoodLog.mood_type).where(MoodLog.user_id == user_id).order_by(
+            MoodLog.created_at.desc(), MoodLog.id.desc()
+        ).limit(1).scalar_subquery().label("recent_mood"),
+        streak(UserStreak.current_streak).label("current_streak"),
+        streak(UserStreak.longest_streak).label("longest_streak"),
+        streak(UserStreak.last_active_date).label("last_active_date")
+    )).one()
+
+def recent_activity(db: Session, user_id: int) -> list:
+    """Latest chat sessions and journal entries, newest first, in one UNION ALL"""
+    journal_touched = func.coalesce(JournalEntry.updated_at, JournalEntry.created_at)
+    sessions = select(
+        literal("chat").label("type"),
+        literal("Chat Session").label("title"),
+        func.coalesce(ChatSession.updated_at, ChatSession.created_at).label("timestamp")
+    ).where(ChatSession.user_id == user_id).order_by(ChatSession.updated_at.desc()).limit(RECENT_SESSIONS).subquery()
+    journals = select(
+        literal("journal").label("type"),
+        func.coalesce(JournalEntry.title, "Journal Entry").label("title"),
+        journal_touched.label("timestamp")
+    ).where(JournalEntry.user_id == user_id).order_by(journal_touched.desc()).limit(RECENT_JOURNALS).subquery()
+
+    rows = db.execute(union_all(select(sessions), select(journals))).all()
+    rows = sorted((row for row in rows if row.timestamp is not None), key=lambda row: row.timestamp, reverse=True)
+    return [
+        {"type": row.type, "title": row.title, "timestamp": row.timestamp.isoformat()}
+        for row in rows[:RECENT_ACTIVITY]
+    ]
+
+def build_dashboard(db: Session, user: User) -> dict:
+    row = totals(db, user.id)
+    today = local_date(datetime.utcnow(), user_zone(user.timezone))
+    return {
+        "total_sessions": row.total_sessions or 0,
+        "total_mood_logs": row.total_mood_logs or 0,
+        "total_journal_entries": row.total_journal_entries or 0,
+        "current_streak": visible_streak(row.current_streak, row.last_active_date, today),
+        "longest_streak": row.longest_streak or 0,
+        "recent_mood": row.recent_mood,
+        "recent_activity": recent_activity(db, user.id),
+    }
+
+def get_dashboard(db: Session, user: User) -> dict:
+    dashboard = dashboard_cache.get(user.id)
+    if dashboard is None:
+        dashboard = build_dashboard(db, user)
+        dashboard_cache.set(user.id, dashboard)
+    return dashboard
+
+def invalidate_dashboard(user_id: int):
+    dashboard_cache.delete(user_id)
+    broker.publish(INVALIDATION_CHANNEL, {"user_id": user_id})
+
+def _on_invalidate(message: dict):
+    if message.get("user_id") is not None:
+        dashboard_cache.delete(message["user_id"])
+
+broker.subscribe(INVALIDATION_CHANNEL, _on_invalidate)
@@ -0,0 +1,68 @@
+"""
+Full-Text Index Helpers
+Shared plumbing for the per-feature search indexes (chat history, journal):
+FTS5 tables on SQLite and tsvector columns with GIN indexes on PostgreSQL.
+User input is reduced to plain word terms before it reaches either query
+syntax, so no operator or quote in a search box can break a query.
+"""
+import logging
+import re
+from typing import List, Sequence
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+")
+
+def query_terms(query: str) -> List[str]:
+    return _TERM_RE.findall((query or "").lower())[:MAX_QUERY_TERMS]
+
+def sqlite_match(terms: List[str], columns: Sequence[str], user_id: int) -> str:
+    """
+    FTS5 MATCH expression: every term must occur in one of columns, the last
+    term as a prefix, and the row's owner column must hold the user's token.
+    """
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += "*"
+    return f'owner : "{owner_token(user_id)}" AND {{{" ".join(columns)}}} : ({" ".join(phrases)})'
+
+def postgres_tsquery(terms: List[str]) -> str:
+    """to_tsquery() input: every term must match, the last one as a prefix"""
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+def owner_token(user_id: int) -> str:
+    # Indexed next to the text so per-user filtering happens inside the FTS index
+    return f"u{user_id}"
+
+def ensure_index(bind, fts_table: str, sqlite_ddl: Sequence[str], postgres_ddl: Sequence[str]) -> bool:
+    """
+    Run the DDL for the bound database. Returns True when the SQLite FTS
+    table was just created and still needs a backfill; Postgres generated
+    columns fill themselves.
+    """
+    with bind.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": fts_table}
+            ).first() is not None
+            for statement in sqlite_ddl:
+                conn.execute(text(statement))
+            return not exists
+        if conn.dialect.name == "postgresql":
+            for statement in postgres_ddl:
+                conn.execute(text(statement))
+            return False
+    logger.warning(f"Full-text index {fts_table} is not supported on {bind.dialect.name}")
+    return False
+
+def rebuild_sqlite_index(bind, fts_table: str, populate_sql: str) -> int:
+    """Empty an FTS5 table and refill it with populate_sql; returns rows indexed"""
+    if bind.dialect.name != "sqlite":
+        return 0
+    with bind.begin() as conn:
+        conn.execute(text(f"DELETE FROM {fts_table}"))
+        return conn.execute(text(populate_sql)).rowcount
@@ -3,10 +3,10 @@ Groq API Service for MindAlchemy
 """
 import os
 import logging
+import importlib.util
 
 # CRITICAL: Patch httpx BEFORE importing Groq to fix proxies error
 import httpx
-from rapidfuzz import fuzz, process
 
 # Store original __init__ methods
 _original_httpx_client_init = httpx.Client.__init__
@@ -27,18 +27,42 @@ httpx.Client.__init__ = _patched_httpx_client_init
 httpx.AsyncClient.__init__ = _patched_async_client_init
 
 # NOW import Groq - it will use the patched httpx
-from groq import Groq
+from groq import AsyncGroq
 
 from app.config import settings
 from app.services.crisis_resources import get_crisis_resources, get_available_countries
-from typing import List, Dict, Optional, Tuple
+from app.services.sentiment import analyze_sentiment_local
+from app.services.crisis_detector import crisis_detector
+from app.services.context_window import estimate_tokens, fit_history
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+def get_request_timeout() -> httpx.Timeout:
+    """Connect/read timeouts applied to every Groq request"""
+    return httpx.Timeout(settings.groq_read_timeout, connect=settings.groq_connect_timeout)
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Build the shared async HTTP client used for all Groq calls.
+    A single pooled client keeps connections alive between requests so
+    concurrent chats reuse sockets instead of opening one per call.
+    """
+    http2 = settings.groq_http2 and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.groq_max_connections,
+            max_keepalive_connections=settings.groq_max_keepalive_connections,
+        ),
+        timeout=get_request_timeout(),
+    )
+
 class GroqService:
     def __init__(self):
         # Only initialize Groq client if API key is provided
         self.client = None
+        self.http_client = None
         if settings.groq_api_key and settings.groq_api_key != "your_groq_api_key_here":
             # Remove ALL proxy environment variables - this is critical
             proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 
@@ -50,7 +74,13 @@ class GroqService:
             
             try:
                 # Initialize Groq - httpx is already patched above
-                self.client = Groq(api_key=settings.groq_api_key)
+                self.http_client = create_http_client()
+                self.client = AsyncGroq(
+                    api_key=settings.groq_api_key,
+                    base_url=settings.groq_base_url,
+                    http_client=self.http_client,
+                    timeout=get_request_timeout(),
+                )
                 logger.info("Groq client initialized successfully")
             except Exception as e:
                 # Log but don't fail - app continues without AI chat
@@ -61,6 +91,7 @@ class GroqService:
                 else:
                     logger.warning(f"Groq client initialization failed: {e}")
                 self.client = None
+                self.http_client = None
             finally:
                 # Always restore proxy env vars
                 for var, value in saved_proxies.items():
@@ -109,57 +140,7 @@ Important: You are a support tool, not a replacement for professional therapy. F
         Detect if user is in crisis - returns (is_crisis, risk_level)
         Uses fuzzy matching to catch typos and misspellings
         """
-        crisis_keywords_high = [
-            "suicide", "kill myself", "end my life", "hurt myself",
-            "want to die", "no point living", "self harm", "cutting",
-            "overdose", "jump off", "hang myself",
-            "end it all", "not worth living", "better off dead"
-        ]
-        
-        crisis_keywords_medium = [
-            "want to die", "no point", "can't go on", "give up",
-            "hopeless", "nothing matters", "life is pointless"
-        ]
-        
-        message_lower = message.lower()
-        
-        # First: Exact match (fastest, most reliable)
-        for keyword in crisis_keywords_high:
-            if keyword in message_lower:
-                return True, "high"
-        
-        for keyword in crisis_keywords_medium:
-            if keyword in message_lower:
-                return True, "medium"
-        
-        # Second: Fuzzy matching for typos (catches misspellings)
-        # Split message into words and check each word/phrase against keywords
-        words = message_lower.split()
-        
-        # Check individual words with fuzzy matching (80% similarity threshold)
-        for word in words:
-            # Check against high-risk keywords
-            for keyword in crisis_keywords_high:
-                # For single-word keywords, use word similarity
-                if len(keyword.split()) == 1:
-                    similarity = fuzz.ratio(word, keyword)
-                    if similarity >= 80:  # 80% similarity threshold
-                        logger.info(f"Fuzzy match detected: '{word}' matches '{keyword}' (similarity: {similarity}%)")
-                        return True, "high"
-        
-        # Check phrases (2-3 word combinations) against multi-word keywords
-        for i in range(len(words)):
-            for j in range(i + 1, min(i + 4, len(words) + 1)):  # Check 2-3 word phrases
-                phrase = " ".join(words[i:j])
-                for keyword in crisis_keywords_high + crisis_keywords_medium:
-                    if len(keyword.split()) > 1:  # Multi-word keyword
-                        similarity = fuzz.ratio(phrase, keyword)
-                        if similarity >= 75:  # Slightly lower threshold for phrases
-                            logger.info(f"Fuzzy phrase match: '{phrase}' matches '{keyword}' (similarity: {similarity}%)")
-                            risk_level = "high" if keyword in crisis_keywords_high else "medium"
-                            return True, risk_level
-        
-        return False, "none"
+        return crisis_detector.detect(message)
 
     def get_crisis_response(self, country_code: Optional[str] = None) -> str:
         """Get crisis intervention response with country-specific resources"""
@@ -215,11 +196,41 @@ Important: You are a support tool, not a replacement for professional therapy. F
         
         return response
 
+    def build_conversation(
+        self,
+        messages: List[Dict[str, str]],
+        user_message: str,
+        user_context: Optional[Dict] = None,
+        context_summary: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build the message list sent to the model for a chat turn.
+        messages are the turns not covered by context_summary; only the newest
+        ones that fit the context token budget are sent.
+        """
+        # Build conversation - clean messages to only include role and content (Groq API doesn't accept timestamp)
+        system_prompt = self.get_therapeutic_prompt(user_context)
+        
+        # Clean messages: only keep 'role' and 'content' fields (remove 'timestamp' and any other fields)
+        cleaned_messages = [
+            {"role": msg.get("role"), "content": msg.get("content")}
+            for msg in messages
+            if msg.get("role") and msg.get("content")
+        ]
+        
+        reserved_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_message)
+        history = fit_history(cleaned_messages, context_summary, reserved_tokens)
+        
+        return [
+            {"role": "system", "content": system_prompt}
+        ] + history + [{"role": "user", "content": user_message}]
+
     async def chat(
         self,
         messages: List[Dict[str, str]],
         user_message: str,
-        user_context: Optional[Dict] = None
+        user_context: Optional[Dict] = None,
+        context_summary: Optional[str] = None
     ) -> Dict:
         """Send message to AI therapist and get response"""
         
@@ -247,23 +258,11 @@ Important: You are a support tool, not a replacement for professional therapy. F
                 "sentiment": "neutral"
             }
         
-        # Build conversation - clean messages to only include role and content (Groq API doesn't accept timestamp)
-        system_prompt = self.get_therapeutic_prompt(user_context)
-        
-        # Clean messages: only keep 'role' and 'content' fields (remove 'timestamp' and any other fields)
-        cleaned_messages = [
-            {"role": msg.get("role"), "content": msg.get("content")}
-            for msg in messages
-            if msg.get("role") and msg.get("content")
-        ]
-        
-        conversation = [
-            {"role": "system", "content": system_prompt}
-        ] + cleaned_messages + [{"role": "user", "content": user_message}]
+        conversation = self.build_conversation(messages, user_message, user_context, context_summary)
         
         try:
             logger.info(f"Sending message to Groq API with model: {self.model}")
-            chat_completion = self.client.chat.completions.create(
+            chat_completion = await self.client.chat.completions.create(
                 messages=conversation,
                 model=self.model,
                 temperature=0.7,  # Balanced creativity
@@ -278,7 +277,7 @@ Important: You are a support tool, not a replacement for professional therapy. F
                 "response": ai_response,
                 "is_crisis": False,
                 "risk_level": "none",
-                "sentiment": await self.analyze_sentiment(user_message)
+                "sentiment": await self.get_turn_sentiment(user_message)
             }
             
         except Exception as e:
@@ -311,6 +310,52 @@ Important: You are a support tool, not a replacement for professional therapy. F
                     "is_crisis": False
                 }
 
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        user_message: str,
+        user_context: Optional[Dict] = None,
+        context_summary: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the AI guide's response token by token.
+        Crisis detection is the caller's job - it must run before the stream starts.
+        API errors are raised so the caller can report them on the open stream.
+        """
+        if not self.client:
+            logger.warning("Groq client not initialized - API key missing or invalid")
+            yield "AI service is not configured. Please set GROQ_API_KEY in environment variables. Check your backend/.env file."
+            return
+        
+        conversation = self.build_conversation(messages, user_message, user_context, context_summary)
+        
+        logger.info(f"Streaming message from Groq API with model: {self.model}")
+        stream = await self.client.chat.completions.create(
+            messages=conversation,
+            model=self.model,
+            temperature=0.7,
+            max_tokens=500,
+            top_p=0.9,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+
+    async def get_turn_sentiment(self, text: str) -> Optional[str]:
+        """
+        Sentiment for a chat turn according to settings.sentiment_mode.
+        Returns None in 'background' mode - the caller schedules the LLM call.
+        """
+        if settings.sentiment_mode == "inline":
+            return await self.analyze_sentiment(text)
+        if settings.sentiment_mode == "background":
+            return None
+        return analyze_sentiment_local(text)
+
     async def analyze_sentiment(self, text: str) -> str:
         """Simple sentiment analysis using Groq"""
         if not self.client:
@@ -322,7 +367,7 @@ Important: You are a support tool, not a replacement for professional therapy. F
             
             Text: {text}"""
             
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 messages=[{"role": "user", "content": sentiment_prompt}],
                 model="llama-3.1-8b-instant",  # Use faster model for sentiment
                 temperature=0.3,
@@ -363,7 +408,7 @@ Important: You are a support tool, not a replacement for professional therapy. F
             
             Summary:"""
             
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 messages=[{"role": "user", "content": summary_prompt}],
                 model=self.model,
                 temperature=0.5,
@@ -375,6 +420,54 @@ Important: You are a support tool, not a replacement for professional therapy. F
             logger.error(f"Failed to generate session summary: {e}", exc_info=True)
             return "Summary generation failed. Please try again later."
 
+    async def update_context_summary(
+        self,
+        previous_summary: Optional[str],
+        messages: List[Dict[str, str]]
+    ) -> Optional[str]:
+        """
+        Fold older turns into the rolling conversation summary.
+        Returns None if the summary could not be updated.
+        """
+        if not self.client or not messages:
+            return None
+        
+        conversation_text = "\n".join(
+            f"{msg.get('role', 'unknown')}: {msg.get('content', '')}"
+            for msg in messages
+            if msg.get('content')
+        )
+        
+        summary_prompt = f"""You maintain a running summary of a supportive therapy-style conversation.
+            Update the existing summary with the new messages. Keep facts the guide needs to stay consistent:
+            the user's situation, feelings, concerns, goals, and coping strategies already suggested.
+            Write at most 150 words in third person.
+            
+            Existing summary:
+            {previous_summary or "(none yet)"}
+            
+            New messages:
+            {conversation_text}
+            
+            Updated summary:"""
+        
+        try:
+            completion = await self.client.chat.completions.create(
+                messages=[{"role": "user", "content": summary_prompt}],
+                model=self.model,
+                temperature=0.3,
+                max_tokens=250,
+            )
+            return completion.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Failed to update context summary: {e}", exc_info=True)
+            return None
+
+    async def aclose(self):
+        """Close pooled HTTP connections (called on app shutdown)"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+
 # Create singleton instance
 groq_service = GroqService()
 
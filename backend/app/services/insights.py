@@ -0,0 +1,245 @@
+"""
+AI Insights
+GET /api/insights/patterns serves insights stored in user_insights instead
+of calling the LLM on every view. Each request gathers only what the prompt
+uses - counts, the latest moods and journal previews, never session message
+JSON - and fingerprints it. Stored insights with the same fingerprint are
+returned as they are. Otherwise the request claims a background refresh (one
+per user at a time, across workers) and answers with
+generate_basic_insights() until the new insights are stored.
+"""
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import JournalEntry, MoodLog, Session as ChatSession, UserInsight
+from app.services.groq_service import groq_service
+from app.services.pagination import timestamp_param
+
+logger = logging.getLogger(__name__)
+
+INSIGHT_WINDOW_DAYS = 30
+PROMPT_MOODS = 20
+PROMPT_JOURNALS = 10
+REFRESH_TIMEOUT_SECONDS = 120  # A claimed refresh that hasn't landed by then (e.g. the LLM call failed) is retried
+
+UNCONFIGURED_INSIGHTS = {
+    "patterns": [],
+    "positive_trends": ["Continue tracking your mood and journal entries for better insights"],
+    "concerns": [],
+    "recommendations": ["AI insights unavailable - service not configured"],
+    "overall_assessment": "Keep up the great work tracking your mental health journey!"
+}
+
+def gather_inputs(db: Session, user_id: int, now: Optional[datetime] = None) -> Dict:
+    """Everything the insights are generated from, for the last INSIGHT_WINDOW_DAYS days"""
+    since = timestamp_param((now or datetime.utcnow()) - timedelta(days=INSIGHT_WINDOW_DAYS))
+    in_window = {
+        "mood": (MoodLog.user_id == user_id, MoodLog.created_at >= since),
+        "journal": (JournalEntry.user_id == user_id, JournalEntry.created_at >= since),
+        "session": (ChatSession.user_id == user_id, ChatSession.created_at >= since),
+    }
+    counts = db.execute(select(
+        select(func.count(MoodLog.id)).where(*in_window["mood"]).scalar_subquery().label("moods"),
+        select(func.avg(MoodLog.intensity)).where(*in_window["mood"]).scalar_subquery().label("average_intensity"),
+        select(func.count(JournalEntry.id)).where(*in_window["journal"]).scalar_subquery().label("journals"),
+        select(func.count(ChatSession.id)).where(*in_window["session"]).scalar_subquery().label("sessions")
+    )).one()
+
+    moods = db.query(MoodLog.created_at, MoodLog.mood_type, MoodLog.intensity, MoodLog.notes).filter(
+        *in_window["mood"]
+    ).order_by(MoodLog.created_at.desc(), MoodLog.id.desc()).limit(PROMPT_MOODS).all()
+    journals = db.query(JournalEntry.created_at, JournalEntry.journal_type, JournalEntry.content).filter(
+        *in_window["journal"]
+    ).order_by(JournalEntry.created_at.desc(), JournalEntry.id.desc()).limit(PROMPT_JOURNALS).all()
+
+    return {
+        "mood_count": counts.moods or 0,
+        "average_intensity": round(float(counts.average_intensity), 2) if counts.average_intensity is not None else None,
+        "moods": [
+            {
+                "date": mood.created_at.isoformat() if mood.created_at else None,
+                "mood": mood.mood_type,
+                "intensity": mood.intensity,
+                "notes": mood.notes[:100] if mood.notes else ""  # First 100 chars
+            }
+            for mood in moods
+        ],
+        "journal_count": counts.journals or 0,
+        "journals": [
+            {
+                "date": entry.created_at.isoformat() if entry.created_at else None,
+                "type": entry.journal_type or "general",
+                # Strip HTML tags for summary, first 200 chars
+                "content_preview": (entry.content or "").replace('<p>', '').replace('</p>', '').replace('<br>', ' ')[:200]
+            }
+            for entry in journals
+        ],
+        "session_count": counts.sessions or 0,
+    }
+
+def fingerprint(inputs: Dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def build_prompt(inputs: Dict) -> str:
+    return f"""Analyze this user's mental health data and provide insights about patterns, trends, and recommendations.
+
+MOOD DATA (last 30 days, {inputs["mood_count"]} entries):
+{str(inputs["moods"])[:2000]}
+
+JOURNAL ENTRIES (last 30 days, {inputs["journal_count"]} entries):
+{str(inputs["journals"])[:1500]}
+
+CHAT SESSIONS: {inputs["session_count"]} sessions in last 30 days
+
+Please provide:
+1. Key patterns you notice (e.g., "Your mood tends to be lower on Mondays")
+2. Positive trends (e.g., "You've been logging more consistently")
+3. Areas of concern (e.g., "Anxiety levels have increased")
+4. Personalized recommendations (e.g., "Try journaling more about gratitude")
+5. Overall assessment (2-3 sentences)
+
+Format your response as a JSON object with these keys:
+- patterns: array of pattern strings
+- positive_trends: array of positive trend strings
+- concerns: array of concern strings
+- recommendations: array of recommendation strings
+- overall_assessment: string
+
+Keep each insight concise (1-2 sentences max). Be supportive and constructive."""
+
+async def generate_ai_insights(inputs: Dict) -> Optional[Dict]:
+    """One LLM analysis of the inputs; None if the call fails"""
+    try:
+        completion = await groq_service.client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": "You are a mental health data analyst. Provide insights in JSON format only."},
+                {"role": "user", "content": build_prompt(inputs)}
+            ],
+            model=groq_service.model,
+            temperature=0.5,
+            max_tokens=800,
+        )
+        ai_response = completion.choices[0].message.content
+
+        # Extract JSON from response (handle markdown code blocks)
+        json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        # Fallback: parse as text
+        return {
+            "patterns": [],
+            "positive_trends": [],
+            "concerns": [],
+            "recommendations": [],
+            "overall_assessment": ai_response[:500]
+        }
+    except Exception as e:
+        logger.error(f"Failed to generate AI insights: {e}", exc_info=True)
+        return None
+
+def generate_basic_insights(inputs: Dict) -> Dict:
+    """Generate basic insights without AI"""
+    insights = {
+        "patterns": [],
+        "positive_trends": [],
+        "concerns": [],
+        "recommendations": [],
+        "overall_assessment": ""
+    }
+
+    mood_count = inputs["mood_count"]
+    if mood_count > 0:
+        avg_intensity = inputs["average_intensity"]
+        if avg_intensity is not None:
+            if avg_intensity < 5:
+                insights["concerns"].append("Your average mood intensity is below 5/10. Consider reaching out for support.")
+            elif avg_intensity > 7:
+                insights["positive_trends"].append("Your average mood intensity is above 7/10 - great to see!")
+
+        # Check consistency
+        if mood_count >= 20:
+            insights["positive_trends"].append("You've been consistently tracking your mood - excellent habit!")
+        elif mood_count < 10:
+            insights["recommendations"].append("Try logging your mood more frequently to get better insights.")
+
+    if inputs["journal_count"] > 0:
+        insights["positive_trends"].append(f"You've written {inputs['journal_count']} journal entries - keep it up!")
+
+    if inputs["session_count"] > 0:
+        insights["positive_trends"].append(f"You've had {inputs['session_count']} chat sessions - great engagement!")
+
+    insights["overall_assessment"] = "Continue tracking your mental health journey. Every entry helps build a clearer picture of your patterns and progress."
+
+    return insights
+
+def claim_refresh(db: Session, user_id: int, now: Optional[datetime] = None) -> bool:
+    """
+    Mark a refresh of the user's insights as started, unless one already is
+    and hasn't timed out. Adds to the caller's transaction; only the caller
+    that gets True should run refresh_insights().
+    """
+    now = now or datetime.utcnow()
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    db.execute(dialect_insert(UserInsight).values(user_id=user_id).on_conflict_do_nothing(index_elements=[UserInsight.user_id]))
+    claimed = db.query(UserInsight).filter(
+        UserInsight.user_id == user_id,
+        or_(
+            UserInsight.refresh_started_at.is_(None),
+            UserInsight.refresh_started_at < now - timedelta(seconds=REFRESH_TIMEOUT_SECONDS)
+        )
+    ).update({"refresh_started_at": now}, synchronize_session=False)
+    return bool(claimed)
+
+def get_insights(db: Session, user_id: int) -> Tuple[Dict, bool]:
+    """
+    (insights, refresh): stored insights if they were generated from the
+    current data, else basic insights - with refresh True when this call
+    claimed the background refresh. The caller commits.
+    """
+    if not groq_service.client:
+        return dict(UNCONFIGURED_INSIGHTS, status="ready"), False
+
+    inputs = gather_inputs(db, user_id)
+    if not (inputs["mood_count"] or inputs["journal_count"] or inputs["session_count"]):
+        return dict(generate_basic_insights(inputs), status="ready"), False  # Nothing for the LLM to analyze
+
+    stored = db.query(UserInsight.fingerprint, UserInsight.insights).filter(UserInsight.user_id == user_id).first()
+    if stored and stored.insights is not None and stored.fingerprint == fingerprint(inputs):
+        return dict(stored.insights, status="ready"), False
+    return dict(generate_basic_insights(inputs), status="refreshing"), claim_refresh(db, user_id)
+
+async def refresh_insights(user_id: int):
+    """Background task: regenerate the user's insights from their current data and store them"""
+    db = SessionLocal()
+    try:
+        inputs = gather_inputs(db, user_id)
+    finally:
+        db.close()
+
+    insights = await generate_ai_insights(inputs)
+    if insights is None:
+        return  # The claim lapses after REFRESH_TIMEOUT_SECONDS and a later view retries
+
+    db = SessionLocal()
+    try:
+        db.query(UserInsight).filter(UserInsight.user_id == user_id).update({
+            "fingerprint": fingerprint(inputs),
+            "insights": insights,
+            "generated_at": datetime.utcnow(),
+            "refresh_started_at": None
+        }, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to store insights for user {user_id}: {e}", exc_info=True)
+    finally:
+        db.close()
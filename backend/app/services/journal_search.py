@@ -0,0 +1,130 @@
+"""
+Journal Search
+Filtered journal lookups served from indexes:
+- words in title/content: an FTS5 table kept in step by triggers on SQLite,
+  a weighted tsvector column with a GIN index on PostgreSQL
+- tags: the normalized journal_tags table, rewritten by sync_tags() whenever
+  an entry's tags change
+- date ranges: the (user_id, created_at) index on journal_entries
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Integer, column, func, select, text
+from sqlalchemy.orm import Query, Session
+
+from app.models import JournalEntry, JournalTag
+from app.services import fulltext
+from app.services.pagination import timestamp_param
+
+FTS_TABLE = "journal_entries_fts"
+MAX_TAG_LENGTH = 50
+
+_SQLITE_DDL = [
+    # owner holds fulltext.owner_token(user_id)
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, owner, tokenize = 'porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, content, owner)
+        VALUES (new.id, coalesce(new.title, ''), new.content, 'u' || new.user_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS journal_entries_fts_update AFTER UPDATE OF title, content ON journal_entries BEGIN
+        UPDATE {FTS_TABLE} SET title = coalesce(new.title, ''), content = new.content WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS journal_entries_fts_delete AFTER DELETE ON journal_entries BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+]
+
+_POSTGRES_DDL = [
+    """ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_journal_entries_search_vector ON journal_entries USING GIN (search_vector)",
+]
+
+def ensure_search_index(bind) -> bool:
+    """Create the journal text index if missing; True when it still needs rebuild_search_index()"""
+    return fulltext.ensure_index(bind, FTS_TABLE, _SQLITE_DDL, _POSTGRES_DDL)
+
+def rebuild_search_index(bind) -> int:
+    """Reindex every journal entry (SQLite only); returns the number of rows indexed"""
+    return fulltext.rebuild_sqlite_index(bind, FTS_TABLE, f"""
+        INSERT INTO {FTS_TABLE} (rowid, title, content, owner)
+        SELECT id, coalesce(title, ''), content, 'u' || user_id FROM journal_entries
+    """)
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(str(tag).lower().split())[:MAX_TAG_LENGTH]
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Normalized, de-duplicated tags in their original order"""
+    return list(dict.fromkeys(t for t in (normalize_tag(tag) for tag in tags or []) if t))
+
+def sync_tags(entry: JournalEntry):
+    """
+    Bring entry.tag_index in line with entry.tags (flushed with the entry).
+    Rows for tags that are kept are reused, so the unique index never sees a
+    delete and re-insert of the same tag in one flush.
+    """
+    existing = {row.tag: row for row in entry.tag_index}
+    entry.tag_index = [
+        existing.get(tag) or JournalTag(user_id=entry.user_id, tag=tag)
+        for tag in normalize_tags(entry.tags)
+    ]
+
+def search_entries(
+    db: Session,
+    user_id: int,
+    query: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Query:
+    """
+    The user's journal entries matching every given filter: all words of
+    query (the last as a prefix) in title or content, all of tags, and
+    created between start_date and end_date inclusive. Returns an unordered
+    query for the caller to sort and paginate.
+    """
+    entries = db.query(JournalEntry).filter(JournalEntry.user_id == user_id)
+
+    terms = fulltext.query_terms(query)
+    if terms:
+        if db.bind.dialect.name == "postgresql":
+            entries = entries.filter(
+                text("journal_entries.search_vector @@ to_tsquery('english', :tsquery)").bindparams(
+                    tsquery=fulltext.postgres_tsquery(terms)
+                )
+            )
+        else:
+            matches = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(
+                match=fulltext.sqlite_match(terms, ["title", "content"], user_id)
+            ).columns(column("rowid", Integer))
+            entries = entries.filter(JournalEntry.id.in_(matches))
+
+    wanted_tags = normalize_tags(tags)
+    if wanted_tags:
+        tagged = select(JournalTag.entry_id).where(
+            JournalTag.user_id == user_id,
+            JournalTag.tag.in_(wanted_tags)
+        ).group_by(JournalTag.entry_id).having(func.count(JournalTag.id) == len(wanted_tags))
+        entries = entries.filter(JournalEntry.id.in_(tagged))
+
+    if start_date:
+        entries = entries.filter(JournalEntry.created_at >= timestamp_param(datetime.combine(start_date, time.min)))
+    if end_date:
+        entries = entries.filter(
+            JournalEntry.created_at < timestamp_param(datetime.combine(end_date + timedelta(days=1), time.min))
+        )
+
+    return entries
+
+def tag_counts(db: Session, user_id: int) -> List[tuple]:
+    """(tag, entry count) for every tag the user has used, most used first"""
+    return db.query(JournalTag.tag, func.count(JournalTag.id)).filter(
+        JournalTag.user_id == user_id
+    ).group_by(JournalTag.tag).order_by(func.count(JournalTag.id).desc(), JournalTag.tag).all()
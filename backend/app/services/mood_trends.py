@@ -0,0 +1,212 @@
+"""
+Mood Trends
+Trend analytics over a user's mood history, where the mood value is
+MoodLog.intensity (1-10). The history is read as two columns - timestamps and
+values - and everything is computed on NumPy arrays: each log is placed in
+its local day, week, weekday and hour once, per-day sums come from a single
+bincount, and the rolling means, week-over-week deltas, profiles and slope
+are all derived from those with cumulative sums instead of Python loops.
+"""
+from datetime import date, datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models import MoodLog
+from app.services.pagination import timestamp_param
+
+SECONDS_PER_DAY = 86400
+OFFSET_SAMPLE_SECONDS = 7 * 86400
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+TREND_DAYS = 90  # Days of history in the daily series and the trend slope
+TREND_WEEKS = 12
+TREND_THRESHOLD = 0.5  # Change in the 7-day mean (intensity points) that counts as improving/declining
+
+def series_query(user_id: int, since: Optional[datetime] = None):
+    """(created_at, intensity) of the user's mood logs that have a value"""
+    query = select(MoodLog.created_at, MoodLog.intensity).where(
+        MoodLog.user_id == user_id,
+        MoodLog.intensity.isnot(None)
+    )
+    if since is not None:
+        query = query.where(MoodLog.created_at >= timestamp_param(since))
+    return query
+
+def epoch_seconds(instant: datetime) -> int:
+    """Whole UTC epoch seconds; naive datetimes are UTC. Plain arithmetic - far cheaper than timestamp()"""
+    seconds = (
+        (instant.toordinal() - EPOCH_ORDINAL) * SECONDS_PER_DAY
+        + instant.hour * 3600 + instant.minute * 60 + instant.second
+    )
+    offset = instant.utcoffset()
+    return seconds - int(offset.total_seconds()) if offset else seconds
+
+def to_arrays(rows: Iterable[Tuple[datetime, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Columns of series_query() rows: (UTC epoch seconds, values)"""
+    rows = [row for row in rows if row[0] is not None]
+    epoch = np.fromiter((epoch_seconds(at) for at, _ in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((value for _, value in rows), dtype=np.float64, count=len(rows))
+    return epoch, values
+
+def _utc_offset(instant: int, zone) -> int:
+    return int(datetime.fromtimestamp(instant, zone).utcoffset().total_seconds())
+
+def local_seconds(epoch: np.ndarray, zone) -> np.ndarray:
+    """
+    Epoch seconds shifted to the zone's wall clock. The UTC offset is sampled
+    weekly across the series and every change is bisected to the second, so
+    a decade of history costs a few hundred zone lookups instead of one per
+    log (no zone changes its offset twice within a week).
+    """
+    if not len(epoch):
+        return epoch
+    first, last = int(epoch.min()), int(epoch.max())
+    samples = list(range(first, last, OFFSET_SAMPLE_SECONDS)) + [last]
+    sampled = [_utc_offset(instant, zone) for instant in samples]
+    changes, offsets = [first], [sampled[0]]
+    for i in range(1, len(samples)):
+        if sampled[i] == sampled[i - 1]:
+            continue
+        before, after = samples[i - 1], samples[i]
+        while after - before > 1:
+            middle = (before + after) // 2
+            if _utc_offset(middle, zone) == sampled[i - 1]:
+                before = middle
+            else:
+                after = middle
+        changes.append(after)
+        offsets.append(sampled[i])
+    index = np.searchsorted(np.array(changes, dtype=np.int64), epoch, side="right") - 1
+    return epoch + np.array(offsets, dtype=np.int64)[index]
+
+def local_day(instant: datetime, zone) -> int:
+    return int(local_seconds(np.array([epoch_seconds(instant)], dtype=np.int64), zone)[0] // SECONDS_PER_DAY)
+
+def day_date(day: int) -> date:
+    return date.fromordinal(EPOCH_ORDINAL + int(day))
+
+def _mean(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    return np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+
+def _trailing(cumulative: np.ndarray, width: int) -> np.ndarray:
+    """Sums over the trailing `width` entries, from a cumulative sum"""
+    shifted = np.zeros_like(cumulative)
+    shifted[width:] = cumulative[:-width]
+    return cumulative - shifted
+
+def _value(x) -> Optional[float]:
+    return None if x is None or np.isnan(x) else round(float(x), 2)
+
+def _profile(keys: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    counts = np.bincount(keys, minlength=size)
+    return _mean(np.bincount(keys, weights=values, minlength=size), counts), counts
+
+def _slope(days: np.ndarray, means: np.ndarray) -> Optional[float]:
+    """Least-squares slope of daily means, in intensity points per day"""
+    if len(days) < 2:
+        return None
+    x = days - days.mean()
+    spread = x @ x
+    return float(x @ (means - means.mean()) / spread) if spread else None
+
+def trend_label(delta: Optional[float]) -> str:
+    if delta is None or abs(delta) < TREND_THRESHOLD:
+        return "stable"
+    return "improving" if delta > 0 else "declining"
+
+def week_over_week(epoch: np.ndarray, values: np.ndarray, zone, now: Optional[datetime] = None) -> Optional[float]:
+    """Mean of the last 7 local days minus the mean of the 7 before (None without logs in both)"""
+    today = local_day(now or datetime.utcnow(), zone)
+    offset = today - local_seconds(epoch, zone) // SECONDS_PER_DAY
+    keep = (offset >= 0) & (offset < 14)
+    sums = np.bincount(offset[keep] // 7, weights=values[keep], minlength=2)
+    counts = np.bincount(offset[keep] // 7, minlength=2)
+    if not counts.all():
+        return None
+    return float(sums[0] / counts[0] - sums[1] / counts[1])
+
+def compute_trends(
+    epoch: np.ndarray,
+    values: np.ndarray,
+    zone,
+    now: Optional[datetime] = None,
+    days: int = TREND_DAYS,
+    weeks: int = TREND_WEEKS
+) -> dict:
+    """
+    Trend report for one user's mood series (see to_arrays), with days and
+    weeks in the user's timezone:
+    - rolling_7d / rolling_30d: trailing means as of today
+    - week_over_week: rolling_7d minus the same mean a week earlier
+    - daily: the last `days` days with each day's mean and both rolling means
+    - weekly: the last `weeks` Monday-based weeks with the change from the week before
+    - day_of_week / hour_of_day: mean over the whole history per weekday and local hour
+    - slope_per_week: least-squares slope of the daily means over the last `days` days
+    Logs dated after today are ignored.
+    """
+    today = local_day(now or datetime.utcnow(), zone)
+    local = local_seconds(epoch, zone)
+    day = local // SECONDS_PER_DAY
+    keep = day <= today
+    local, day, values = local[keep], day[keep], values[keep]
+
+    # Per-day sums from the first needed day through today; everything else is built on these
+    start = min(int(day.min()) if len(day) else today, today - days - 30)
+    start -= (start + 3) % 7  # Back to a Monday (1970-01-01 was a Thursday), so weeks align
+    span = today - start + 1
+    day_sums = np.bincount(day - start, weights=values, minlength=span)
+    day_counts = np.bincount(day - start, minlength=span)
+    day_means = _mean(day_sums, day_counts)
+
+    cumulative_sums, cumulative_counts = np.cumsum(day_sums), np.cumsum(day_counts)
+    rolling_7 = _mean(_trailing(cumulative_sums, 7), _trailing(cumulative_counts, 7))
+    rolling_30 = _mean(_trailing(cumulative_sums, 30), _trailing(cumulative_counts, 30))
+
+    week_bounds = np.arange(0, span, 7)
+    week_sums, week_counts = np.add.reduceat(day_sums, week_bounds), np.add.reduceat(day_counts, week_bounds)
+    week_means = _mean(week_sums, week_counts)
+    week_deltas = np.concatenate(([np.nan], np.diff(week_means)))
+
+    weekday_means, weekday_counts = _profile((day + 3) % 7, values, 7)
+    hour_means, hour_counts = _profile((local % SECONDS_PER_DAY) // 3600, values, 24)
+
+    window = slice(span - days, span)
+    active = np.flatnonzero(day_counts[window])
+    slope = _slope(active.astype(np.float64), day_means[window][active])
+
+    daily_days = np.arange(today - days + 1, today + 1)
+    week_starts = start + 7 * np.arange(len(week_means))
+    return {
+        "total_logs": int(len(values)),
+        "rolling_7d": _value(rolling_7[-1]),
+        "rolling_30d": _value(rolling_30[-1]),
+        "week_over_week": _value(rolling_7[-1] - rolling_7[-8]),
+        "slope_per_week": _value(slope * 7) if slope is not None else None,
+        "daily": [
+            {
+                "date": day_date(d),
+                "average": _value(mean),
+                "logs": int(count),
+                "rolling_7d": _value(mean_7),
+                "rolling_30d": _value(mean_30),
+            }
+            for d, mean, count, mean_7, mean_30 in zip(
+                daily_days, day_means[window], day_counts[window], rolling_7[window], rolling_30[window]
+            )
+        ],
+        "weekly": [
+            {"week_start": day_date(d), "average": _value(mean), "logs": int(count), "delta": _value(delta)}
+            for d, mean, count, delta in list(zip(week_starts, week_means, week_counts, week_deltas))[-weeks:]
+        ],
+        "day_of_week": [
+            {"day": name, "average": _value(mean), "logs": int(count)}
+            for name, mean, count in zip(WEEKDAYS, weekday_means, weekday_counts)
+        ],
+        "hour_of_day": [
+            {"hour": hour, "average": _value(mean), "logs": int(count)}
+            for hour, (mean, count) in enumerate(zip(hour_means, hour_counts))
+        ],
+    }
@@ -0,0 +1,122 @@
+"""
+Unread Notification Counters
+GET /api/notifications/unread-count reads one notification_counters row
+instead of counting a user's unread notifications on every poll. Every write
+that changes the unread set - new notifications, marking read, deleting -
+calls adjust_unread() in its own transaction, so the counter commits or rolls
+back together with the change. repair_counters() recounts from the
+notifications table in bulk and reports (and by default fixes) any drift.
+"""
+import logging
+import time
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Notification, NotificationCounter, User
+
+logger = logging.getLogger(__name__)
+
+REPAIR_BATCH_SIZE = 1000
+
+def _upsert(db: Session, rows: List[dict], increment: bool):
+    """Insert counter rows, or add to (increment) / overwrite the existing ones"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = dialect_insert(NotificationCounter)
+        unread = NotificationCounter.unread + statement.excluded.unread if increment else statement.excluded.unread
+        statement = statement.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={"unread": unread, "updated_at": func.now()}
+        )
+        db.connection().execute(statement, rows)
+        return
+
+    for row in rows:
+        unread = NotificationCounter.unread + row["unread"] if increment else row["unread"]
+        updated = db.query(NotificationCounter).filter(
+            NotificationCounter.user_id == row["user_id"]
+        ).update({"unread": unread}, synchronize_session=False)
+        if not updated:
+            db.add(NotificationCounter(**row))
+            db.flush()
+
+def adjust_unread(db: Session, deltas: Dict[int, int]):
+    """
+    Add each user's delta to their unread count (caller commits). Counter rows
+    are created on first use, and updated in user_id order so concurrent
+    bulk writers lock them in the same order.
+    """
+    rows = [{"user_id": user_id, "unread": delta} for user_id, delta in sorted(deltas.items()) if delta]
+    if rows:
+        _upsert(db, rows, increment=True)
+
+def unread_count(db: Session, user_id: int) -> int:
+    """The user's unread notification count - a primary key lookup"""
+    unread = db.query(NotificationCounter.unread).filter(NotificationCounter.user_id == user_id).scalar()
+    # No row yet means no notifications yet
+    return max(unread or 0, 0)
+
+def repair_counters(db: Session, fix: bool = True, batch_size: int = REPAIR_BATCH_SIZE) -> dict:
+    """
+    Recount unread notifications for every user, batch by batch, and compare
+    them with the stored counters. With `fix`, drifted counters are
+    overwritten with the recount. On Postgres the batch's counter rows are
+    locked before counting, so writes racing the repair wait for it rather
+    than being overwritten. Returns a drift report.
+    """
+    started = time.perf_counter()
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    users_checked = 0
+    drifted: Dict[int, int] = {}
+    last_user_id = 0
+
+    while True:
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(
+            User.id > last_user_id
+        ).order_by(User.id).limit(batch_size)]
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        stored_query = db.query(NotificationCounter.user_id, NotificationCounter.unread).filter(
+            NotificationCounter.user_id.in_(user_ids)
+        )
+        if is_postgres and fix:
+            stored_query = stored_query.with_for_update()
+        stored = dict(stored_query.all())
+        actual = dict(db.query(Notification.user_id, func.count(Notification.id)).filter(
+            Notification.user_id.in_(user_ids),
+            Notification.read == 'false'
+        ).group_by(Notification.user_id).all())
+
+        batch_drift = {
+            user_id: actual.get(user_id, 0) - stored.get(user_id, 0)
+            for user_id in user_ids
+            if actual.get(user_id, 0) != stored.get(user_id, 0)
+        }
+        if fix and batch_drift:
+            _upsert(db, [{"user_id": user_id, "unread": actual.get(user_id, 0)} for user_id in sorted(batch_drift)], increment=False)
+        db.commit()
+
+        drifted.update(batch_drift)
+        users_checked += len(user_ids)
+
+    report = {
+        "users_checked": users_checked,
+        "users_drifted": len(drifted),
+        "total_drift": sum(abs(delta) for delta in drifted.values()),
+        "max_drift": max((abs(delta) for delta in drifted.values()), default=0),
+        "sample": sorted(drifted.items())[:20],  # (user_id, recount - stored)
+        "fixed": fix,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    if drifted:
+        logger.warning(
+            f"Unread counters drifted for {len(drifted)} of {users_checked} users "
+            f"(total {report['total_drift']}){' - repaired' if fix else ''}"
+        )
+    return report
@@ -2,14 +2,29 @@
 Notification Service - Handles scheduling and sending notifications
 """
 import logging
-from datetime import datetime, time as dt_time
-from typing import List, Optional
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, bindparam, delete, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app.models import User, NotificationPreferences, Notification, MoodLog, Goal
-from app.database import get_db
+from app.config import settings
+from app.models import NotificationPreferences, Notification, MoodLog, Goal, ReminderSchedule, User
+from app.services.notification_counters import adjust_unread
+from app.services.notification_stream import publish_notifications
+from app.services.pagination import timestamp_param
+from app.services.reminder_schedule import SCHEDULE_FIELDS, dedupe_key, latest_due, local_day_bounds, next_fire_for, user_zone
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 5000  # Due reminders claimed and inserted per transaction
+
+def to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class NotificationService:
     """Service for creating and managing notifications"""
     
@@ -30,173 +45,269 @@ class NotificationService:
             read='false'
         )
         db.add(notification)
+        adjust_unread(db, {user_id: 1})
         db.commit()
         db.refresh(notification)
+        publish_notifications([notification])
         return notification
     
     @staticmethod
-    def should_send_daily_checkin(db: Session, user: User) -> bool:
-        """Check if daily check-in notification should be sent"""
-        prefs = db.query(NotificationPreferences).filter(
-            NotificationPreferences.user_id == user.id
-        ).first()
-        
-        if not prefs or prefs.daily_checkin_enabled != 'true':
-            return False
+    def get_motivational_message() -> tuple[str, str]:
+        """Get a random motivational message"""
+        messages = [
+            ("You're doing great! 🌟", "Take a moment to appreciate how far you've come. Every step forward matters."),
+            ("Keep going! 💪", "Progress isn't always linear, but you're moving in the right direction."),
+            ("You've got this! ✨", "Remember: small steps lead to big changes. You're stronger than you think."),
+            ("Be kind to yourself today 💙", "Self-compassion is a superpower. You deserve your own kindness."),
+            ("Celebrate your wins! 🎉", "No matter how small, every achievement is worth celebrating."),
+            ("You're not alone 🤗", "Remember that seeking help and support is a sign of strength."),
+            ("Take it one day at a time 🌱", "Growth happens gradually. Trust the process."),
+            ("Your feelings are valid 💜", "Whatever you're experiencing right now is okay. You're doing your best."),
+        ]
         
-        # Check if user already logged mood today
-        today = datetime.utcnow().date()
-        today_mood = db.query(MoodLog).filter(
-            MoodLog.user_id == user.id,
-            db.func.date(MoodLog.created_at) == today
-        ).first()
+        import random
+        return random.choice(messages)
+    
+    @staticmethod
+    def find_due_reminders(
+        db: Session,
+        now: datetime,
+        limit: int = CHUNK_SIZE,
+        user_id_range: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Up to `limit` reminders whose fire time has passed, oldest first, with
+        the owner's timezone and the preference fields that schedule them,
+        optionally only for users in [start, end) of `user_id_range`.
+        On Postgres the rows are locked, skipping any another scheduler holds.
+        """
+        query = db.query(
+            ReminderSchedule.id,
+            ReminderSchedule.user_id,
+            ReminderSchedule.kind,
+            ReminderSchedule.next_fire_at,
+            User.timezone,
+            *[getattr(NotificationPreferences, field) for field in SCHEDULE_FIELDS]
+        ).join(
+            NotificationPreferences, NotificationPreferences.user_id == ReminderSchedule.user_id
+        ).join(
+            User, User.id == ReminderSchedule.user_id
+        ).filter(ReminderSchedule.next_fire_at <= now)
+        if user_id_range is not None:
+            start, end = user_id_range
+            query = query.filter(ReminderSchedule.user_id >= start, ReminderSchedule.user_id < end)
         
-        # Only send if no mood logged today
-        return today_mood is None
+        return query.order_by(
+            ReminderSchedule.next_fire_at, ReminderSchedule.id
+        ).limit(limit).with_for_update(of=ReminderSchedule, skip_locked=True).all()
     
     @staticmethod
-    def should_send_mood_reminder(db: Session, user: User) -> bool:
-        """Check if mood reminder should be sent"""
-        prefs = db.query(NotificationPreferences).filter(
-            NotificationPreferences.user_id == user.id
-        ).first()
+    def claim_reminders(db: Session, advances: List[dict]) -> List[dict]:
+        """
+        Move each due reminder ({id, old, next, fired}) on to its next fire time, or
+        delete it if it has been disabled (next is None). Each update only
+        applies while next_fire_at still equals the occurrence we read, so a
+        reminder another scheduler already handled is left alone. Returns the
+        advances this transaction claimed.
+        """
+        def statements(advances):
+            match = and_(ReminderSchedule.id == bindparam("b_id"), ReminderSchedule.next_fire_at == bindparam("b_old"))
+            moved = [a for a in advances if a["next"] is not None]
+            dropped = [a for a in advances if a["next"] is None]
+            if moved:
+                yield moved, update(ReminderSchedule).where(match).values(
+                    next_fire_at=bindparam("b_next"),
+                    last_fired_at=bindparam("b_fired")
+                )
+            if dropped:
+                yield dropped, delete(ReminderSchedule).where(match)
+        
+        def execute(statement, batch):
+            params = [{"b_id": a["id"], "b_old": a["old"], "b_next": a["next"], "b_fired": a["fired"] or a["old"]} for a in batch]
+            connection = db.connection()
+            return connection.execute(statement, params).rowcount
         
-        if not prefs or prefs.mood_reminder_enabled != 'true':
-            return False
+        if db.get_bind().dialect.name == "postgresql":
+            # find_due_reminders locked these rows for this transaction
+            for batch, statement in statements(advances):
+                execute(statement, batch)
+            return advances
         
-        # Check if user already logged mood today
-        today = datetime.utcnow().date()
-        today_mood = db.query(MoodLog).filter(
-            MoodLog.user_id == user.id,
-            db.func.date(MoodLog.created_at) == today
-        ).first()
+        # Fast path: one executemany per statement; the summed rowcount says whether every row was still ours
+        claimed_all = all(execute(statement, batch) == len(batch) for batch, statement in statements(advances))
+        if claimed_all:
+            return advances
         
-        return today_mood is None
+        # Lost a race with another scheduler - redo row by row to find out which
+        db.rollback()
+        claimed = []
+        for advance in advances:
+            for batch, statement in statements([advance]):
+                if execute(statement, batch) == 1:
+                    claimed.append(advance)
+        return claimed
     
     @staticmethod
-    def should_send_goal_reminder(db: Session, user: User) -> bool:
-        """Check if goal reminder should be sent"""
-        prefs = db.query(NotificationPreferences).filter(
-            NotificationPreferences.user_id == user.id
-        ).first()
+    def build_notification(user_id: int, kind: str, active_goals: int = 0, key: Optional[str] = None) -> dict:
+        """The notification row for one reminder; `key` is its dedupe_key"""
+        if kind == 'daily_checkin':
+            title, message = ("Good morning! ☀️",
+                              "How are you feeling today? Take a moment to check in with yourself.")
+        elif kind == 'mood_reminder':
+            title, message = ("Time to log your mood 📊",
+                              "How was your day? Logging your mood helps track patterns and progress.")
+        elif kind == 'meditation':
+            title, message = ("Time for mindfulness 🧘",
+                              "Take a few minutes for yourself. A short meditation can make a big difference.")
+        elif kind == 'goal':
+            title, message = (f"You have {active_goals} active goal(s) 🎯",
+                              "Check in on your goals this week. Progress, no matter how small, is still progress!")
+        else:
+            title, message = NotificationService.get_motivational_message()
         
-        if not prefs or prefs.goal_reminder_enabled != 'true':
-            return False
+        return {"user_id": user_id, "type": kind, "title": title, "message": message, "read": 'false', "dedupe_key": key}
+    
+    @staticmethod
+    def build_notifications(db: Session, claimed: List[tuple]) -> List[dict]:
+        """
+        Notifications for a chunk of claimed (user_id, kind, occurrence, zone)
+        reminders. Check-ins and mood reminders are dropped for users who
+        already logged a mood that local day, goal reminders for users without
+        active goals - both looked up for the whole chunk at once.
+        """
+        mood_reminders = [r for r in claimed if r[1] in ('daily_checkin', 'mood_reminder')]
+        windows = {(user_id, occurrence): local_day_bounds(occurrence, zone) for user_id, _, occurrence, zone in mood_reminders}
+        mood_times = {}
+        if mood_reminders:
+            rows = db.query(MoodLog.user_id, MoodLog.created_at).filter(
+                MoodLog.user_id.in_({r[0] for r in mood_reminders}),
+                MoodLog.created_at >= timestamp_param(min(start for start, _ in windows.values())),
+                MoodLog.created_at < timestamp_param(max(end for _, end in windows.values()))
+            )
+            for user_id, created_at in rows:
+                mood_times.setdefault(user_id, []).append(to_naive_utc(created_at))
         
-        # Check if user has active goals
-        active_goals = db.query(Goal).filter(
-            Goal.user_id == user.id,
+        goal_users = {r[0] for r in claimed if r[1] == 'goal'}
+        active_goals = dict(db.query(Goal.user_id, func.count(Goal.id)).filter(
+            Goal.user_id.in_(goal_users),
             Goal.status == 'active'
-        ).count()
+        ).group_by(Goal.user_id).all()) if goal_users else {}
         
-        return active_goals > 0
+        notifications = []
+        for user_id, kind, occurrence, zone in claimed:
+            if kind in ('daily_checkin', 'mood_reminder'):
+                start, end = windows[(user_id, occurrence)]
+                if any(start <= logged < end for logged in mood_times.get(user_id, [])):
+                    continue
+            if kind == 'goal' and not active_goals.get(user_id):
+                continue
+            notifications.append(NotificationService.build_notification(
+                user_id, kind, active_goals.get(user_id, 0), dedupe_key(kind, user_id, occurrence, zone)
+            ))
+        return notifications
     
     @staticmethod
-    def get_motivational_message() -> tuple[str, str]:
-        """Get a random motivational message"""
-        messages = [
-            ("You're doing great! 🌟", "Take a moment to appreciate how far you've come. Every step forward matters."),
-            ("Keep going! 💪", "Progress isn't always linear, but you're moving in the right direction."),
-            ("You've got this! ✨", "Remember: small steps lead to big changes. You're stronger than you think."),
-            ("Be kind to yourself today 💙", "Self-compassion is a superpower. You deserve your own kindness."),
-            ("Celebrate your wins! 🎉", "No matter how small, every achievement is worth celebrating."),
-            ("You're not alone 🤗", "Remember that seeking help and support is a sign of strength."),
-            ("Take it one day at a time 🌱", "Growth happens gradually. Trust the process."),
-            ("Your feelings are valid 💜", "Whatever you're experiencing right now is okay. You're doing your best."),
-        ]
+    def insert_notifications(db: Session, notifications: List[dict]) -> List[dict]:
+        """
+        Bulk-insert notification rows, skipping any whose dedupe_key is already
+        stored - an occurrence another worker, an overlapping run or a retry
+        already delivered. Returns the rows actually inserted, with their ids.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            db.execute(insert(Notification), notifications)
+            return notifications
         
-        import random
-        return random.choice(messages)
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = dialect_insert(Notification).on_conflict_do_nothing(
+            index_elements=[Notification.dedupe_key]
+        ).returning(Notification.id, Notification.dedupe_key)
+        ids = {key: id for id, key in db.connection().execute(statement, notifications)}
+        return [{**row, "id": ids[row["dedupe_key"]]} for row in notifications if row["dedupe_key"] in ids]
     
     @staticmethod
-    def check_and_send_notifications(db: Session):
-        """Check all users and send notifications based on their preferences"""
-        users = db.query(User).all()
+    def check_and_send_notifications(
+        db: Session,
+        now: Optional[datetime] = None,
+        user_id_range: Optional[Tuple[int, int]] = None
+    ) -> dict:
+        """
+        Send every reminder that has come due by `now` (UTC), including ones a
+        stopped or slow scheduler missed. Missed occurrences collapse into the
+        latest one within REMINDER_CATCHUP_GRACE_MINUTES (or none, if all are
+        older), each reminder is claimed atomically so concurrent schedulers
+        never both send it, and it is then advanced past `now`.
+        Due reminders are processed in chunks of CHUNK_SIZE, each bulk-inserted
+        and committed in one transaction. Every notification carries a dedupe
+        key for its local slot, so a duplicate run inserts nothing twice and
+        workers can be sharded by `user_id_range` ([start, end)) without
+        coordinating.
+        """
+        now = now or datetime.utcnow()
+        grace = timedelta(minutes=settings.reminder_catchup_grace_minutes)
+        started = time.perf_counter()
+        users = set()
         notifications_sent = 0
+        reminders_skipped = 0
         
-        for user in users:
+        # Every row a chunk handles leaves the due set (advanced past now, deleted,
+        # or claimed by another scheduler), so each query returns the next chunk
+        while True:
+            rows = NotificationService.find_due_reminders(db, now, user_id_range=user_id_range)
+            if not rows:
+                break
+            
             try:
-                prefs = db.query(NotificationPreferences).filter(
-                    NotificationPreferences.user_id == user.id
-                ).first()
-                
-                if not prefs:
-                    continue
+                advances = []
+                for row in rows:
+                    zone = user_zone(row.timezone)
+                    advances.append({
+                        "id": row.id,
+                        "old": row.next_fire_at,
+                        "next": next_fire_for(row.kind, row, zone, now),
+                        # Missed occurrences collapse into the latest one still within the grace period
+                        "fired": latest_due(row.kind, row, zone, row.next_fire_at, now, grace),
+                        "user_id": row.user_id,
+                        "kind": row.kind,
+                        "zone": zone
+                    })
                 
-                current_time = datetime.utcnow().time()
-                current_hour = current_time.hour
-                current_minute = current_time.minute
+                claimed = []
+                for advance in NotificationService.claim_reminders(db, advances):
+                    users.add(advance["user_id"])
+                    if advance["next"] is None or advance["fired"] is None:
+                        # Disabled since it was scheduled, or too late to be useful
+                        reminders_skipped += 1
+                        continue
+                    claimed.append((advance["user_id"], advance["kind"], advance["fired"], advance["zone"]))
                 
-                # Daily check-in (morning)
-                if prefs.daily_checkin_enabled == 'true':
-                    checkin_time = datetime.strptime(prefs.daily_checkin_time, '%H:%M').time()
-                    if (current_hour == checkin_time.hour and 
-                        current_minute == checkin_time.minute and
-                        NotificationService.should_send_daily_checkin(db, user)):
-                        NotificationService.create_notification(
-                            db, user.id, 'daily_checkin',
-                            "Good morning! ☀️",
-                            "How are you feeling today? Take a moment to check in with yourself."
-                        )
-                        notifications_sent += 1
-                
-                # Mood reminder (evening)
-                if prefs.mood_reminder_enabled == 'true':
-                    mood_time = datetime.strptime(prefs.mood_reminder_time, '%H:%M').time()
-                    if (current_hour == mood_time.hour and 
-                        current_minute == mood_time.minute and
-                        NotificationService.should_send_mood_reminder(db, user)):
-                        NotificationService.create_notification(
-                            db, user.id, 'mood_reminder',
-                            "Time to log your mood 📊",
-                            "How was your day? Logging your mood helps track patterns and progress."
-                        )
-                        notifications_sent += 1
-                
-                # Meditation reminder
-                if prefs.meditation_reminder_enabled == 'true':
-                    meditation_time = datetime.strptime(prefs.meditation_reminder_time, '%H:%M').time()
-                    if (current_hour == meditation_time.hour and 
-                        current_minute == meditation_time.minute):
-                        NotificationService.create_notification(
-                            db, user.id, 'meditation',
-                            "Time for mindfulness 🧘",
-                            "Take a few minutes for yourself. A short meditation can make a big difference."
-                        )
-                        notifications_sent += 1
-                
-                # Goal reminder (weekly check)
-                if prefs.goal_reminder_enabled == 'true' and NotificationService.should_send_goal_reminder(db, user):
-                    # Check if it's the right day for goal reminder (weekly = Monday)
-                    if datetime.utcnow().weekday() == 0:  # Monday
-                        active_goals = db.query(Goal).filter(
-                            Goal.user_id == user.id,
-                            Goal.status == 'active'
-                        ).count()
-                        NotificationService.create_notification(
-                            db, user.id, 'goal',
-                            f"You have {active_goals} active goal(s) 🎯",
-                            "Check in on your goals this week. Progress, no matter how small, is still progress!"
-                        )
-                        notifications_sent += 1
-                
-                # Motivational messages (daily)
-                if prefs.motivational_messages_enabled == 'true':
-                    # Send once per day at 10:00 AM
-                    if current_hour == 10 and current_minute == 0:
-                        title, message = NotificationService.get_motivational_message()
-                        NotificationService.create_notification(
-                            db, user.id, 'motivational',
-                            title, message
-                        )
-                        notifications_sent += 1
-                        
+                notifications = NotificationService.build_notifications(db, claimed)
+                inserted = NotificationService.insert_notifications(db, notifications) if notifications else []
+                adjust_unread(db, Counter(row["user_id"] for row in inserted))
+                # Dropped as already handled by the user, or already delivered
+                reminders_skipped += len(claimed) - len(inserted)
+                db.commit()
+                notifications_sent += len(inserted)
+                publish_notifications(inserted)
             except Exception as e:
-                logger.error(f"Error sending notification to user {user.id}: {e}", exc_info=True)
-                continue
+                db.rollback()
+                # The chunk stays due; leave it to the next run rather than retrying in a loop
+                logger.error(f"Error sending reminders due up to {rows[-1].next_fire_at}: {e}", exc_info=True)
+                break
         
-        logger.info(f"Sent {notifications_sent} notifications")
-        return notifications_sent
+        elapsed = time.perf_counter() - started
+        users_per_second = len(users) / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Sent {notifications_sent} notifications ({reminders_skipped} skipped) to {len(users)} users "
+            f"in {elapsed:.2f}s ({users_per_second:.0f} users/s)"
+        )
+        return {
+            "notifications_sent": notifications_sent,
+            "reminders_skipped": reminders_skipped,
+            "users_checked": len(users),
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(users_per_second, 1)
+        }
 
 # Create singleton instance
 notification_service = NotificationService()
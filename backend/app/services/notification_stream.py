@@ -0,0 +1,149 @@
+"""
+Notification Stream
+Pushes new notifications to connected clients (GET /api/notifications/stream)
+so they don't have to poll the list and unread-count endpoints.
+Code that stores notifications calls publish_notifications() once they are
+committed. The event broker hands them to the NotificationHub of this worker
+and, with PUBSUB_URL set, of every other worker; each hub forwards a row to
+the open streams of its owner. An idle stream is one parked coroutine and a
+small queue - no DB session, no per-connection broker subscription, and a
+single hub-wide timer for heartbeats.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.pubsub import LocalBroker, broker as default_broker
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_CHANNEL = "notification-created"
+
+# Queued for every stream each heartbeat interval; the endpoint turns it into an SSE comment
+HEARTBEAT = object()
+
+class StreamLimitReached(Exception):
+    """This worker already holds max_connections streams"""
+
+def notification_payload(notification) -> dict:
+    """JSON-safe NotificationResponse fields of a Notification row or inserted dict"""
+    get = notification.get if isinstance(notification, dict) else lambda key: getattr(notification, key, None)
+    sent_at, read_at = get("sent_at") or datetime.utcnow(), get("read_at")
+    return {
+        "id": get("id"),
+        "user_id": get("user_id"),
+        "type": get("type"),
+        "title": get("title"),
+        "message": get("message"),
+        "read": get("read") or 'false',
+        "sent_at": sent_at.isoformat(),
+        "read_at": read_at.isoformat() if read_at else None,
+    }
+
+class NotificationHub:
+    """Per-worker registry of open streams, fed from the broker"""
+
+    def __init__(
+        self,
+        max_connections: int,
+        heartbeat_seconds: float,
+        queue_size: int,
+        broker: LocalBroker = default_broker
+    ):
+        self.max_connections = max_connections
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self._broker = broker
+        self._streams: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.connections = 0
+        self.delivered = 0
+        self.dropped = 0
+        broker.subscribe(NOTIFICATION_CHANNEL, self._on_published)
+
+    def connect(self, user_id: int) -> asyncio.Queue:
+        """Register a stream for the user; call on the event loop, and disconnect() when done"""
+        if self.connections >= self.max_connections:
+            raise StreamLimitReached()
+        self._loop = asyncio.get_running_loop()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = self._loop.create_task(self._beat())
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._streams[user_id].add(queue)
+        self.connections += 1
+        return queue
+
+    def disconnect(self, user_id: int, queue: asyncio.Queue):
+        queues = self._streams.get(user_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._streams[user_id]
+        self.connections -= 1
+
+    def close(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        self._broker.unsubscribe(NOTIFICATION_CHANNEL, self._on_published)
+
+    def _on_published(self, message: dict):
+        # Broker callbacks may arrive on any thread; the queues belong to the event loop
+        if self._loop is None or not self._streams:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._fan_out, message.get("notifications") or [])
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def _fan_out(self, notifications: List[dict]):
+        for notification in notifications:
+            for queue in self._streams.get(notification.get("user_id"), ()):
+                self._offer(queue, notification)
+
+    def _offer(self, queue: asyncio.Queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # The client isn't reading; it still finds the notification in the list endpoint
+            if item is not HEARTBEAT:
+                self.dropped += 1
+            return
+        if item is not HEARTBEAT:
+            self.delivered += 1
+
+    async def _beat(self):
+        while self.connections:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for queues in list(self._streams.values()):
+                for queue in queues:
+                    if queue.empty():
+                        self._offer(queue, HEARTBEAT)
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "users": len(self._streams),
+            "max_connections": self.max_connections,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+def publish_notifications(notifications: List) -> None:
+    """Announce committed notifications (rows or inserted dicts) to every worker's open streams"""
+    if not notifications:
+        return
+    default_broker.publish(NOTIFICATION_CHANNEL, {
+        "notifications": [notification_payload(notification) for notification in notifications]
+    })
+
+notification_hub = NotificationHub(
+    settings.notification_stream_max_connections,
+    settings.notification_stream_heartbeat_seconds,
+    settings.notification_stream_queue_size
+)
@@ -0,0 +1,99 @@
+"""
+Keyset Pagination
+Cursors are opaque, URL-safe tokens wrapping the sort key of the last row a
+client has seen. The next page filters past that key instead of using OFFSET,
+so page cost stays flat however deep the client scrolls.
+
+Every cursor-paginated endpoint uses the same transport: the client passes
+?cursor= (and ?limit=), and the cursor of the next page comes back in the
+X-Next-Cursor response header (set_next_cursor), absent on the last page.
+Bodies never carry a cursor, so a paginated endpoint returns the same JSON
+shape as an unpaginated one. Endpoints built on keyset_page() and
+page_rows() - the list endpoints, journal search, /chat/sessions/list - use
+encode_cursor() tokens; a chat session's messages page by message seq.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, String, and_, literal, or_
+from sqlalchemy.types import TypeDecorator
+
+class TimestampParam(TypeDecorator):
+    """
+    Binds a timestamp for comparison in the form the column stores it. SQLite
+    keeps datetimes as text and server defaults (CURRENT_TIMESTAMP) omit the
+    fractional seconds SQLAlchemy writes, so a stored "12:00:00" would
+    otherwise sort before the bound value "12:00:00.000000".
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S" if value.microsecond == 0 else "%Y-%m-%d %H:%M:%S.%f")
+        return value
+
+def timestamp_param(value: datetime):
+    return literal(value, TimestampParam())
+
+def encode_cursor(*values: Any) -> str:
+    """Pack a row's sort key (datetimes, ints, strings) into an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> Tuple:
+    """Unpack a cursor produced by encode_cursor, converting each value to the given type"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("wrong cursor length")
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for value, kind in zip(payload, types)
+        )
+    except (ValueError, TypeError, UnicodeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def after_cursor_desc(sort_column, id_column, sort_value, id_value):
+    """Filter for rows after (sort_value, id_value) when ordering by sort_column DESC, id DESC"""
+    if isinstance(sort_value, datetime):
+        sort_value = timestamp_param(sort_value)
+    # The leading <= bound lets a (..., sort_column) index seek straight to the cursor
+    return and_(
+        sort_column <= sort_value,
+        or_(sort_column < sort_value, id_column < id_value)
+    )
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def keyset_page(statement, sort_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Narrow a Query or select() to the page after `cursor`, newest first by
+    (sort_column, id). One extra row is fetched so page_rows can tell
+    whether another page follows.
+    """
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor, datetime, int)
+        statement = statement.where(after_cursor_desc(sort_column, id_column, sort_value, id_value))
+    return statement.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+def page_rows(rows: List, limit: int, sort_column) -> Tuple[List, Optional[str]]:
+    """The rows of a keyset_page result and the cursor of the next page (None on the last)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], sort_column.key), rows[-1].id)
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,120 @@
+"""
+Password Hashing Pool
+bcrypt is deliberately slow (~100-300ms of CPU per call), so running it
+inline in an async handler stalls every other request on the worker. Hashes
+and verifications run on a small bounded thread pool instead (bcrypt releases
+the GIL while it works), and sign-in bursts beyond what the pool can absorb
+are shed with 503 + Retry-After rather than queueing without limit.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.services.auth_service import get_password_hash, verify_password
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasher:
+    """Runs password hashing off the event loop; workers=0 hashes inline (legacy behaviour)"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
+        self._lock = threading.Lock()
+        self.queue_depth = 0  # Submitted jobs still waiting for a thread
+        self.running = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        if self._executor is None:
+            return fn(*args)
+
+        with self._lock:
+            self.queue_depth += 1
+
+        def job():
+            with self._lock:
+                self.queue_depth -= 1
+                self.running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "queue_depth": self.queue_depth, "running": self.running}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+class ConcurrencyLimiter:
+    """
+    Admits at most `limit` requests at a time. Up to `max_waiting` more may
+    wait up to `timeout` seconds for a slot; anything beyond that is rejected
+    immediately with 503 so clients back off instead of piling up.
+    """
+
+    def __init__(self, limit: int, max_waiting: int, timeout: float, retry_after: int = 2):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self._reject()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def _reject(self):
+        self.shed += 1
+        if self.shed % 100 == 1:
+            logger.warning(f"Shedding sign-in requests ({self.shed} so far): {self.active} active, {self.waiting} waiting")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests right now, please try again shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting, "shed": self.shed}
+
+password_hasher = PasswordHasher(settings.password_hash_workers)
+login_limiter = ConcurrencyLimiter(
+    limit=settings.login_max_concurrency,
+    max_waiting=settings.login_max_waiting,
+    timeout=settings.login_wait_timeout_seconds
+)
@@ -0,0 +1,138 @@
+"""
+Event Broker
+Publish/subscribe for events every worker process has to see, such as cache
+invalidations. The default LocalBroker delivers within the current process.
+With PUBSUB_URL pointing at Redis, RedisBroker also relays each event through
+Redis pub/sub so the other gunicorn workers receive it too. publish() never
+waits on Redis - it is called from async handlers - so the relay runs on a
+sender thread fed by a bounded queue.
+"""
+import json
+import logging
+import queue
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "mindalchemy:"
+
+Subscriber = Callable[[dict], None]
+
+class LocalBroker:
+    """In-process fan-out. Subscribers are called synchronously and must be quick."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        with self._lock:
+            self._subscribers[channel].append(callback)
+
+    def unsubscribe(self, channel: str, callback: Subscriber):
+        with self._lock:
+            if callback in self._subscribers.get(channel, []):
+                self._subscribers[channel].remove(callback)
+
+    def publish(self, channel: str, message: dict):
+        self._deliver(channel, message)
+
+    def _deliver(self, channel: str, message: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for callback in subscribers:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Subscriber for '{channel}' failed: {e}", exc_info=True)
+
+    def close(self):
+        pass
+
+class RedisBroker(LocalBroker):
+    """
+    Local fan-out plus Redis relay. Events are delivered locally right away
+    and queued for the sender thread, which publishes them to Redis; copies
+    coming back from Redis carry this process's origin id and are skipped, so
+    every subscriber sees each event once.
+    """
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency, only needed for cross-worker events
+
+        super().__init__()
+        self._origin = uuid.uuid4().hex
+        timeout = settings.pubsub_socket_timeout_seconds
+        self._redis = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._listener = None
+        self._outbox: queue.Queue = queue.Queue(maxsize=settings.pubsub_relay_queue_size)
+        self._dropped = 0
+        self._sender = threading.Thread(target=self._send_loop, name="pubsub-relay", daemon=True)
+        self._sender.start()
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        first = channel not in self._subscribers
+        super().subscribe(channel, callback)
+        if first:
+            self._pubsub.subscribe(**{CHANNEL_PREFIX + channel: self._on_redis_message})
+            if self._listener is None:
+                self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel: str, message: dict):
+        self._deliver(channel, message)
+        try:
+            self._outbox.put_nowait((CHANNEL_PREFIX + channel, json.dumps({"origin": self._origin, "message": message})))
+        except queue.Full:
+            # Redis is down or too slow to keep up; other workers fall back on their cache TTLs
+            self._dropped += 1
+            if self._dropped % 1000 == 1:
+                logger.warning(f"Redis relay queue full, dropped {self._dropped} events so far")
+
+    def _send_loop(self):
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            channel, payload = item
+            try:
+                self._redis.publish(channel, payload)
+            except Exception as e:
+                # Other workers fall back on their cache TTLs until Redis is back
+                logger.error(f"Failed to relay '{channel}' event through Redis: {e}")
+
+    def _on_redis_message(self, raw: dict):
+        try:
+            envelope = json.loads(raw["data"])
+        except (TypeError, ValueError):
+            return
+        if envelope.get("origin") == self._origin:
+            return
+        channel = raw["channel"].decode() if isinstance(raw["channel"], bytes) else raw["channel"]
+        self._deliver(channel[len(CHANNEL_PREFIX):], envelope.get("message") or {})
+
+    def close(self):
+        try:
+            self._outbox.put_nowait(None)
+        except queue.Full:
+            pass  # Daemon thread; exits with the process
+        if self._listener is not None:
+            self._listener.stop()
+        self._pubsub.close()
+
+def create_broker(url: Optional[str] = None) -> LocalBroker:
+    url = url or settings.pubsub_url
+    if url:
+        try:
+            return RedisBroker(url)
+        except ImportError:
+            logger.warning("PUBSUB_URL is set but the redis package is not installed - events stay in-process")
+    return LocalBroker()
+
+# Shared by every module in this process
+broker = create_broker()
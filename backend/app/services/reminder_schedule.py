@@ -0,0 +1,170 @@
+"""
+Reminder Schedule
+Turns a user's NotificationPreferences and timezone into one
+ReminderSchedule row per enabled reminder, holding its next fire time in
+UTC. The scheduler then only has to look at rows whose next_fire_at has
+passed (an indexed range read), however many users there are.
+Rows are re-synced whenever the preferences or the user's timezone change.
+"""
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy.orm import Session
+
+from app.models import NotificationPreferences, ReminderSchedule, User
+from app.services.pubsub import broker
+
+logger = logging.getLogger(__name__)
+
+# Published after a sync so running schedulers pick up fire times earlier than they expected
+SCHEDULE_CHANNEL = "reminder-schedule-changed"
+
+UTC = timezone.utc
+
+@dataclass(frozen=True)
+class ReminderKind:
+    enabled_field: str
+    time_field: Optional[str] = None  # Preference holding the local HH:MM; None = fixed_time
+    fixed_time: str = "09:00"
+    frequency_field: Optional[str] = None  # Preference holding 'daily'/'weekly'/'monthly'; None = daily
+
+REMINDER_KINDS: Dict[str, ReminderKind] = {
+    "daily_checkin": ReminderKind("daily_checkin_enabled", time_field="daily_checkin_time"),
+    "mood_reminder": ReminderKind("mood_reminder_enabled", time_field="mood_reminder_time"),
+    "meditation": ReminderKind("meditation_reminder_enabled", time_field="meditation_reminder_time"),
+    "goal": ReminderKind("goal_reminder_enabled", fixed_time="09:00", frequency_field="goal_reminder_frequency"),
+    "motivational": ReminderKind("motivational_messages_enabled", fixed_time="10:00", frequency_field="motivational_frequency"),
+}
+
+# Preference columns the schedule depends on
+SCHEDULE_FIELDS = sorted({
+    field
+    for spec in REMINDER_KINDS.values()
+    for field in (spec.enabled_field, spec.time_field, spec.frequency_field)
+    if field
+})
+
+@lru_cache(maxsize=1024)
+def user_zone(name: Optional[str]) -> ZoneInfo:
+    """The user's IANA timezone, falling back to UTC for empty or unknown names"""
+    if name:
+        try:
+            return ZoneInfo(name.strip())
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Unknown timezone '{name}', scheduling reminders in UTC")
+    return ZoneInfo("UTC")
+
+@lru_cache(maxsize=4096)
+def parse_clock(value: Optional[str]) -> Optional[dt_time]:
+    try:
+        return datetime.strptime((value or "").strip(), "%H:%M").time()
+    except ValueError:
+        return None
+
+def _occurs_on(day: date, frequency: str) -> bool:
+    if frequency == "weekly":
+        return day.weekday() == 0  # Mondays
+    if frequency == "monthly":
+        return day.day == 1
+    return True
+
+def next_fire_time(clock: dt_time, zone: ZoneInfo, after: datetime, frequency: str = "daily") -> datetime:
+    """
+    First occurrence of local `clock` strictly after `after` (naive UTC), as
+    naive UTC. A clock time skipped by a DST jump fires at the equivalent
+    instant just after it; one repeated by a DST fall-back fires once, on its
+    first occurrence.
+    """
+    local_day = after.replace(tzinfo=UTC).astimezone(zone).date()
+    for offset in range(0, 62):
+        day = local_day + timedelta(days=offset)
+        if not _occurs_on(day, frequency):
+            continue
+        fire_at = datetime.combine(day, clock, tzinfo=zone).astimezone(UTC).replace(tzinfo=None)
+        if fire_at > after:
+            return fire_at
+    raise ValueError(f"No {frequency} occurrence of {clock} found")
+
+def local_day_bounds(instant: datetime, zone: ZoneInfo):
+    """Naive UTC [start, end) of the local calendar day containing the naive UTC instant"""
+    day = instant.replace(tzinfo=UTC).astimezone(zone).date()
+    start = datetime.combine(day, dt_time.min, tzinfo=zone).astimezone(UTC).replace(tzinfo=None)
+    end = datetime.combine(day + timedelta(days=1), dt_time.min, tzinfo=zone).astimezone(UTC).replace(tzinfo=None)
+    return start, end
+
+def next_fire_for(kind: str, prefs, zone: ZoneInfo, after: datetime) -> Optional[datetime]:
+    """
+    When the reminder next fires for these preferences (a NotificationPreferences
+    or any row with the SCHEDULE_FIELDS), or None if it is disabled or misconfigured
+    """
+    spec = REMINDER_KINDS[kind]
+    if getattr(prefs, spec.enabled_field) != 'true':
+        return None
+    clock = parse_clock(getattr(prefs, spec.time_field) if spec.time_field else spec.fixed_time)
+    if clock is None:
+        return None
+    frequency = (getattr(prefs, spec.frequency_field) if spec.frequency_field else None) or "daily"
+    return next_fire_time(clock, zone, after, frequency)
+
+def dedupe_key(kind: str, user_id: int, occurrence: datetime, zone: ZoneInfo) -> str:
+    """Identifies one occurrence of a reminder by its local slot, whichever scheduler or retry sends it"""
+    local = occurrence.replace(tzinfo=UTC).astimezone(zone)
+    return f"{kind}:{user_id}:{local:%Y-%m-%dT%H:%M}"
+
+def latest_due(kind: str, prefs, zone: ZoneInfo, scheduled: datetime, now: datetime, window: timedelta) -> Optional[datetime]:
+    """
+    The most recent occurrence in [max(scheduled, now - window), now], or None.
+    After downtime this is the one occurrence still worth sending; anything
+    older is only marked as handled.
+    """
+    start = max(scheduled, now - window)
+    occurrence = scheduled if scheduled >= start else next_fire_for(kind, prefs, zone, start - timedelta(microseconds=1))
+    if occurrence is None or occurrence > now:
+        return None
+    while True:
+        following = next_fire_for(kind, prefs, zone, occurrence)
+        if following is None or following > now:
+            return occurrence
+        occurrence = following
+
+def sync_user_schedule(db: Session, user_id: int, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Bring the user's ReminderSchedule rows in line with their preferences and
+    timezone, returning the earliest fire time (None if no reminder is
+    enabled). Adds to the caller's transaction; the caller commits and then
+    hands the fire time to publish_schedule_change().
+    """
+    now = now or datetime.utcnow()
+    prefs = db.query(NotificationPreferences).filter(NotificationPreferences.user_id == user_id).first()
+    timezone_name = db.query(User.timezone).filter(User.id == user_id).scalar()
+    zone = user_zone(timezone_name)
+    existing = {row.kind: row for row in db.query(ReminderSchedule).filter(ReminderSchedule.user_id == user_id)}
+
+    earliest = None
+    for kind in REMINDER_KINDS:
+        fire_at = next_fire_for(kind, prefs, zone, now) if prefs else None
+        row = existing.get(kind)
+        if fire_at is None:
+            if row is not None:
+                db.delete(row)
+            continue
+        if row is None:
+            db.add(ReminderSchedule(user_id=user_id, kind=kind, next_fire_at=fire_at))
+        elif row.next_fire_at != fire_at:
+            row.next_fire_at = fire_at
+        earliest = fire_at if earliest is None else min(earliest, fire_at)
+
+    return earliest
+
+def publish_schedule_change(user_id: int, fire_at: Optional[datetime]):
+    """
+    Tell running schedulers about a synced fire time. Only call this after the
+    sync is committed - a scheduler woken earlier reloads before the rows
+    are visible and misses the reminder.
+    """
+    if fire_at is not None:
+        broker.publish(SCHEDULE_CHANNEL, {"user_id": user_id, "fire_at": fire_at.isoformat()})
@@ -0,0 +1,154 @@
+"""
+Reminder Scheduler
+Sends reminders as they come due instead of polling every user each minute.
+Fire times within the next `horizon` are loaded from the
+reminder_schedules index into a heap; the loop sleeps until the earliest
+one, then hands everything due to NotificationService, whose work is
+proportional to the reminders due. Overdue rows are picked up on the first
+load, so a restart or a slow tick catches up instead of dropping reminders.
+Preference changes are announced on the event broker and pushed onto the
+heap, so an earlier fire time isn't missed until the next reload.
+
+Runs inside the API process (REMINDER_SCHEDULER_ENABLED) or on its own
+(`python notification_scheduler.py --worker`). Several instances can run at
+once - each reminder is claimed atomically before it is sent, and each
+notification's dedupe key keeps a slot from being delivered twice. To spread
+the load, give each worker its own `user_id_range`.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ReminderSchedule
+from app.services.notification_service import notification_service
+from app.services.pubsub import broker
+from app.services.reminder_schedule import SCHEDULE_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+class ReminderScheduler:
+    """Heap of upcoming fire times, refilled from the database every `horizon_seconds`"""
+
+    def __init__(
+        self,
+        horizon_seconds: float,
+        session_factory: Callable = SessionLocal,
+        user_id_range: Optional[Tuple[int, int]] = None
+    ):
+        self.horizon = timedelta(seconds=horizon_seconds)
+        self.user_id_range = user_id_range  # [start, end) of the users this instance serves; None = all
+        self._session_factory = session_factory
+        self._heap: List[datetime] = []
+        self._queued: Set[datetime] = set()
+        self._loaded_until: Optional[datetime] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_result: Optional[dict] = None
+
+    def start(self):
+        """Start the loop as a task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        broker.subscribe(SCHEDULE_CHANNEL, self._on_schedule_changed)
+        logger.info(f"Reminder scheduler started (horizon {self.horizon.total_seconds():.0f}s)")
+        try:
+            while True:
+                now = datetime.utcnow()
+                if self._loaded_until is None or now >= self._loaded_until:
+                    await self._call(self._load, now)
+
+                if self._heap and self._heap[0] <= now:
+                    while self._heap and self._heap[0] <= now:
+                        self._queued.discard(heapq.heappop(self._heap))
+                    await self._call(self._send_due, now)
+                    continue
+
+                wake_at = min(self._heap[0], self._loaded_until) if self._heap else self._loaded_until
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), max((wake_at - datetime.utcnow()).total_seconds(), 0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            broker.unsubscribe(SCHEDULE_CHANNEL, self._on_schedule_changed)
+
+    async def _call(self, fn: Callable, now: datetime):
+        # Database work runs on a thread so the API's event loop stays free
+        try:
+            await asyncio.to_thread(fn, now)
+        except Exception as e:
+            logger.error(f"Reminder scheduler {fn.__name__} failed: {e}", exc_info=True)
+            self._loaded_until = now + timedelta(seconds=30)  # Retry shortly
+
+    def _load(self, now: datetime):
+        """Distinct fire times up to now + horizon, including any overdue ones"""
+        until = now + self.horizon
+        db = self._session_factory()
+        try:
+            query = db.query(ReminderSchedule.next_fire_at).filter(ReminderSchedule.next_fire_at <= until)
+            if self.user_id_range is not None:
+                start, end = self.user_id_range
+                query = query.filter(ReminderSchedule.user_id >= start, ReminderSchedule.user_id < end)
+            fire_times = [fire_at for (fire_at,) in query.distinct()]
+        finally:
+            db.close()
+        self._heap = sorted(set(fire_times))
+        self._queued = set(self._heap)
+        self._loaded_until = until
+
+    def _send_due(self, now: datetime):
+        db = self._session_factory()
+        try:
+            self.last_result = notification_service.check_and_send_notifications(db, now, self.user_id_range)
+            self.runs += 1
+        finally:
+            db.close()
+
+    def _push(self, fire_at: datetime):
+        if fire_at not in self._queued:
+            heapq.heappush(self._heap, fire_at)
+            self._queued.add(fire_at)
+            self._wake.set()
+
+    def _on_schedule_changed(self, message: dict):
+        # Broker callbacks may arrive on any thread
+        try:
+            fire_at = datetime.fromisoformat(message["fire_at"])
+        except (KeyError, TypeError, ValueError):
+            return
+        user_id = message.get("user_id")
+        if self.user_id_range is not None and user_id is not None and not self.user_id_range[0] <= user_id < self.user_id_range[1]:
+            return  # Another shard's user
+        if self._loop is not None and self._loaded_until is not None and fire_at <= self._loaded_until:
+            self._loop.call_soon_threadsafe(self._push, fire_at)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "user_id_range": list(self.user_id_range) if self.user_id_range else None,
+            "queued_fire_times": len(self._heap),
+            "next_fire_at": self._heap[0].isoformat() if self._heap else None,
+            "runs": self.runs,
+            "last_result": self.last_result,
+        }
+
+reminder_scheduler = ReminderScheduler(settings.reminder_scheduler_horizon_seconds)
@@ -0,0 +1,61 @@
+"""
+Local Sentiment Analysis
+Lexicon-based classifier that runs in-process, so chat turns don't need a
+second LLM round-trip. Returns the same labels as GroqService.analyze_sentiment.
+"""
+import re
+from typing import Dict, Set
+
+SENTIMENT_LEXICON: Dict[str, Set[str]] = {
+    "anxious": {
+        "anxious", "anxiety", "nervous", "worried", "worry", "worrying", "panic",
+        "panicking", "scared", "afraid", "fear", "fearful", "tense", "stressed",
+        "stress", "overwhelmed", "restless", "uneasy", "dread", "overthinking",
+    },
+    "depressed": {
+        "depressed", "depression", "hopeless", "empty", "numb", "worthless",
+        "lonely", "alone", "miserable", "exhausted", "tired", "crying", "cry",
+        "grief", "grieving", "despair", "unmotivated", "pointless", "sad", "down",
+    },
+    "angry": {
+        "angry", "anger", "mad", "furious", "irritated", "annoyed", "frustrated",
+        "frustrating", "rage", "hate", "resent", "resentful", "pissed", "livid",
+    },
+    "negative": {
+        "bad", "awful", "terrible", "horrible", "upset", "hurt", "painful",
+        "difficult", "hard", "struggling", "struggle", "unhappy", "disappointed",
+        "sick", "wrong", "worse", "worst", "failed", "failure", "ashamed", "guilty",
+    },
+    "positive": {
+        "happy", "good", "great", "better", "calm", "relaxed", "grateful",
+        "thankful", "excited", "hopeful", "proud", "glad", "peaceful", "love",
+        "loved", "content", "joy", "joyful", "wonderful", "amazing", "fine", "okay",
+    },
+}
+
+NEGATIONS = {"not", "no", "never", "don't", "dont", "isn't", "isnt", "wasn't", "wasnt", "can't", "cant", "hardly"}
+
+# Ties are broken towards the more clinically relevant label
+LABEL_PRIORITY = ["depressed", "anxious", "angry", "negative", "positive"]
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+def analyze_sentiment_local(text: str) -> str:
+    """
+    Classify text as positive, negative, neutral, anxious, depressed or angry.
+    A negated positive word ("not happy") counts as negative.
+    """
+    words = _WORD_RE.findall(text.lower())
+    scores = {label: 0 for label in LABEL_PRIORITY}
+
+    for i, word in enumerate(words):
+        negated = any(w in NEGATIONS for w in words[max(0, i - 2):i])
+        for label, lexicon in SENTIMENT_LEXICON.items():
+            if word in lexicon:
+                if negated and label == "positive":
+                    scores["negative"] += 1
+                elif not negated:
+                    scores[label] += 1
+
+    best = max(LABEL_PRIORITY, key=lambda label: (scores[label], -LABEL_PRIORITY.index(label)))
+    return best if scores[best] > 0 else "neutral"
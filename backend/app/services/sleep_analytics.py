@@ -0,0 +1,188 @@
+"""
+Sleep Analytics
+GET /api/sleep/analytics: weekly and monthly rollups, bedtime consistency and
+how sleep duration and quality relate to the next day's mood. A user's sleep
+and mood logs come back from one UNION ALL, are split into NumPy columns and
+every figure is computed on arrays. A night is dated by the local day the
+user woke up - the day whose mood it is paired with.
+Reports are cached per user. The sleep and mood write paths call
+invalidate_sleep_analytics() after committing; the event broker carries the
+invalidation to every other worker.
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import MoodLog, SleepLog, User
+from app.services.cache import TTLCache
+from app.services.mood_trends import SECONDS_PER_DAY, day_date, epoch_seconds, local_day, local_seconds
+from app.services.pubsub import broker
+from app.services.reminder_schedule import user_zone
+
+INVALIDATION_CHANNEL = "sleep-analytics-invalidate"
+
+MAX_WEEKS = 52  # Cached reports hold this many rollup periods; requests take the latest ones
+MAX_MONTHS = 24
+MIN_CORRELATION_PAIRS = 3  # Nights paired with a mood needed before reporting a correlation
+
+sleep_analytics_cache = TTLCache(maxsize=settings.sleep_analytics_cache_size, ttl=settings.sleep_analytics_cache_ttl_seconds)
+
+def history_query(user_id: int):
+    """The user's sleep logs and valued mood logs as (kind, at, until, hours, value) rows"""
+    sleep = select(
+        literal("sleep").label("kind"),
+        SleepLog.sleep_time.label("at"),
+        SleepLog.wake_time.label("until"),
+        SleepLog.duration_hours.label("hours"),
+        SleepLog.quality.label("value")
+    ).where(SleepLog.user_id == user_id)
+    moods = select(
+        literal("mood"),
+        MoodLog.created_at,
+        null(),
+        null(),
+        MoodLog.intensity
+    ).where(MoodLog.user_id == user_id, MoodLog.intensity.isnot(None))
+    return union_all(sleep, moods)
+
+def _float(value) -> float:
+    return np.nan if value is None else float(value)
+
+def _columns(rows) -> Tuple[dict, dict]:
+    """Split history_query() rows into sleep and mood arrays (missing values are NaN)"""
+    sleeps = [row for row in rows if row.kind == "sleep" and row.at is not None]
+    moods = [row for row in rows if row.kind == "mood" and row.at is not None]
+    count = len(sleeps)
+    sleep = {
+        "at": np.fromiter((epoch_seconds(row.at) for row in sleeps), dtype=np.int64, count=count),
+        "until": np.fromiter((epoch_seconds(row.until) if row.until else np.nan for row in sleeps), dtype=np.float64, count=count),
+        "hours": np.fromiter((_float(row.hours) for row in sleeps), dtype=np.float64, count=count),
+        "quality": np.fromiter((_float(row.value) for row in sleeps), dtype=np.float64, count=count),
+    }
+    mood = {
+        "at": np.fromiter((epoch_seconds(row.at) for row in moods), dtype=np.int64, count=len(moods)),
+        "value": np.fromiter((float(row.value) for row in moods), dtype=np.float64, count=len(moods)),
+    }
+    return sleep, mood
+
+def _value(x) -> Optional[float]:
+    return None if x is None or np.isnan(x) else round(float(x), 2)
+
+def _grouped(keys: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-key mean and population standard deviation of the non-NaN values (NaN for empty keys)"""
+    valid = ~np.isnan(values)
+    keys, values = keys[valid], values[valid]
+    counts = np.bincount(keys, minlength=size)
+    sums = np.bincount(keys, weights=values, minlength=size)
+    squares = np.bincount(keys, weights=values * values, minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(counts > 0, sums / counts, np.nan)
+        variance = np.where(counts > 0, squares / counts - mean * mean, np.nan)
+    return mean, np.sqrt(np.clip(variance, 0, None))
+
+def _rollup(keys: np.ndarray, size: int, hours: np.ndarray, quality: np.ndarray, bedtime: np.ndarray) -> list:
+    """Periods 0..size-1 (oldest first) of nights whose key falls in range"""
+    keep = (keys >= 0) & (keys < size)
+    keys = keys[keep]
+    nights = np.bincount(keys, minlength=size)
+    mean_hours, _ = _grouped(keys, hours[keep], size)
+    mean_quality, _ = _grouped(keys, quality[keep], size)
+    _, bedtime_std = _grouped(keys, bedtime[keep], size)
+    return [
+        {
+            "nights": int(nights[i]),
+            "average_hours": _value(mean_hours[i]),
+            "average_quality": _value(mean_quality[i]),
+            "bedtime_std_minutes": _value(bedtime_std[i]),
+        }
+        for i in range(size)
+    ]
+
+def _correlation(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+    """Pearson correlation over the pairs where both are known"""
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) < MIN_CORRELATION_PAIRS:
+        return None
+    x, y = x - x.mean(), y - y.mean()
+    spread = np.sqrt((x @ x) * (y @ y))
+    return float(x @ y / spread) if spread else None
+
+def compute_analytics(sleep: dict, mood: dict, zone, now: Optional[datetime] = None) -> dict:
+    """
+    Sleep report from _columns() arrays, with days in the user's timezone.
+    Duration falls back to wake minus bedtime, and the wake time to bedtime
+    plus duration. Bedtimes are measured in minutes after local noon, so a
+    23:30 and a 00:30 bedtime are an hour apart rather than 23 hours.
+    """
+    today = local_day(now or datetime.utcnow(), zone)
+    at, until = sleep["at"], sleep["until"]
+    hours = np.where(np.isnan(sleep["hours"]), (until - at) / 3600, sleep["hours"])
+    wake = np.where(np.isnan(until), at + np.nan_to_num(hours) * 3600, until).astype(np.int64)
+    wake_day = local_seconds(wake, zone) // SECONDS_PER_DAY
+    bedtime = (((local_seconds(at, zone) % SECONDS_PER_DAY) // 60 - 720) % 1440).astype(np.float64)
+    quality = sleep["quality"]
+
+    # Next-day mood: the mean intensity of the day each night ends on
+    mood_day = local_seconds(mood["at"], zone) // SECONDS_PER_DAY
+    mood_days, index = np.unique(mood_day, return_inverse=True)
+    next_mood = np.full(len(wake_day), np.nan)
+    if len(mood_days):
+        day_mood = np.bincount(index, weights=mood["value"]) / np.bincount(index)
+        position = np.minimum(np.searchsorted(mood_days, wake_day), len(mood_days) - 1)
+        paired = mood_days[position] == wake_day
+        next_mood[paired] = day_mood[position[paired]]
+
+    this_week = (today + 3) // 7
+    weeks = _rollup(this_week - (wake_day + 3) // 7, MAX_WEEKS, hours, quality, bedtime)
+    this_month = int(np.array(today, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64))
+    months = _rollup(this_month - wake_day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64), MAX_MONTHS, hours, quality, bedtime)
+    for age, week in enumerate(weeks):
+        week["period_start"] = day_date((this_week - age) * 7 - 3)
+    for age, month in enumerate(months):
+        month["period_start"] = np.datetime64(this_month - age, "M").astype("datetime64[D]").astype(object)
+
+    overall_hours, _ = _grouped(np.zeros(len(hours), dtype=np.int64), hours, 1)
+    overall_quality, _ = _grouped(np.zeros(len(quality), dtype=np.int64), quality, 1)
+    mean_bedtime, bedtime_std = _grouped(np.zeros(len(bedtime), dtype=np.int64), bedtime, 1)
+    average_bedtime = None
+    if not np.isnan(mean_bedtime[0]):
+        minutes = (int(round(mean_bedtime[0])) + 720) % 1440
+        average_bedtime = f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    return {
+        "total_nights": int(len(at)),
+        "average_hours": _value(overall_hours[0]),
+        "average_quality": _value(overall_quality[0]),
+        "average_bedtime": average_bedtime,
+        "bedtime_std_minutes": _value(bedtime_std[0]),
+        "weekly": weeks[::-1],
+        "monthly": months[::-1],
+        "mood_correlation": {
+            "pairs": int(np.count_nonzero(~np.isnan(next_mood))),
+            "duration": _value(_correlation(hours, next_mood)),
+            "quality": _value(_correlation(quality, next_mood)),
+        },
+    }
+
+def get_sleep_analytics(db: Session, user: User) -> dict:
+    analytics = sleep_analytics_cache.get(user.id)
+    if analytics is None:
+        sleep, mood = _columns(db.execute(history_query(user.id)).all())
+        analytics = compute_analytics(sleep, mood, user_zone(user.timezone))
+        sleep_analytics_cache.set(user.id, analytics)
+    return analytics
+
+def invalidate_sleep_analytics(user_id: int):
+    sleep_analytics_cache.delete(user_id)
+    broker.publish(INVALIDATION_CHANNEL, {"user_id": user_id})
+
+def _on_invalidate(message: dict):
+    if message.get("user_id") is not None:
+        sleep_analytics_cache.delete(message["user_id"])
+
+broker.subscribe(INVALIDATION_CHANNEL, _on_invalidate)
@@ -0,0 +1,57 @@
+"""
+Authenticated User Cache
+get_current_user (and get_current_user_async, for routers on get_async_db)
+resolves the token subject (the user's email) to a User row on every request.
+Rows are cached per worker as plain column values and re-attached to the
+request's DB session without a SELECT. Write paths that change or delete a
+user call invalidate_user(), which also evicts the entry in every other
+worker through the event broker.
+"""
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+from app.services.cache import TTLCache
+from app.services.pubsub import broker
+
+INVALIDATION_CHANNEL = "user-cache-invalidate"
+
+_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+user_cache = TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl_seconds)
+
+def _cached_detached(subject: str) -> Optional[User]:
+    values = user_cache.get(subject)
+    if values is None:
+        return None
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+def get_cached_user(db: Session, subject: str) -> Optional[User]:
+    """The cached user for a token subject, attached to db, or None on a miss"""
+    user = _cached_detached(subject)
+    # load=False trusts the cached state instead of re-reading the row
+    return db.merge(user, load=False) if user is not None else None
+
+async def get_cached_user_async(db: AsyncSession, subject: str) -> Optional[User]:
+    """get_cached_user for an AsyncSession"""
+    user = _cached_detached(subject)
+    return await db.merge(user, load=False) if user is not None else None
+
+def cache_user(subject: str, user: User):
+    user_cache.set(subject, {key: getattr(user, key) for key in _COLUMNS})
+
+def invalidate_user(subject: str):
+    user_cache.delete(subject)
+    broker.publish(INVALIDATION_CHANNEL, {"subject": subject})
+
+def _on_invalidate(message: dict):
+    if message.get("subject"):
+        user_cache.delete(message["subject"])
+
+broker.subscribe(INVALIDATION_CHANNEL, _on_invalidate)
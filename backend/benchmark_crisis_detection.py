@@ -0,0 +1,112 @@
+"""
+Benchmark: compiled crisis detector vs the original nested fuzzy loops
+
+Builds a corpus of short chat messages and 5,000-word pasted texts (benign,
+exact crisis phrases and misspelled ones), checks that both implementations
+return identical (is_crisis, risk_level) for every message and prints timings.
+
+Usage:
+    python benchmark_crisis_detection.py
+    python benchmark_crisis_detection.py --short 2000 --long 20
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rapidfuzz import fuzz
+from app.services.crisis_detector import CRISIS_KEYWORDS_HIGH, CRISIS_KEYWORDS_MEDIUM, crisis_detector
+
+VOCABULARY = (
+    "today work family friend tired sleep morning coffee walk talk feel think "
+    "really maybe little better week weekend plan meeting school class music "
+    "movie dinner lunch call mother father sister brother house car rain sun "
+    "busy quiet happy okay fine stress time people phone message home night"
+).split()
+
+def legacy_detect_crisis(message: str):
+    """Original GroqService.detect_crisis, kept here as the reference"""
+    crisis_keywords_high = list(CRISIS_KEYWORDS_HIGH)
+    crisis_keywords_medium = list(CRISIS_KEYWORDS_MEDIUM)
+    message_lower = message.lower()
+    for keyword in crisis_keywords_high:
+        if keyword in message_lower:
+            return True, "high"
+    for keyword in crisis_keywords_medium:
+        if keyword in message_lower:
+            return True, "medium"
+    words = message_lower.split()
+    for word in words:
+        for keyword in crisis_keywords_high:
+            if len(keyword.split()) == 1:
+                if fuzz.ratio(word, keyword) >= 80:
+                    return True, "high"
+    for i in range(len(words)):
+        for j in range(i + 1, min(i + 4, len(words) + 1)):
+            phrase = " ".join(words[i:j])
+            for keyword in crisis_keywords_high + crisis_keywords_medium:
+                if len(keyword.split()) > 1:
+                    if fuzz.ratio(phrase, keyword) >= 75:
+                        risk_level = "high" if keyword in crisis_keywords_high else "medium"
+                        return True, risk_level
+    return False, "none"
+
+def misspell(text: str, rng: random.Random) -> str:
+    chars = list(text)
+    i = rng.randrange(len(chars))
+    if chars[i] != " ":
+        chars[i] = rng.choice("aeiourstn")
+    return "".join(chars)
+
+def build_corpus(short_count: int, long_count: int, seed: int = 42):
+    rng = random.Random(seed)
+    keywords = CRISIS_KEYWORDS_HIGH + CRISIS_KEYWORDS_MEDIUM
+
+    def filler(n):
+        return " ".join(rng.choice(VOCABULARY) for _ in range(n))
+
+    def with_signal(text):
+        roll = rng.random()
+        if roll < 0.15:
+            return f"{text} {rng.choice(keywords)}"
+        if roll < 0.30:
+            return f"{text} {misspell(rng.choice(keywords), rng)}"
+        return text
+
+    short = [with_signal(filler(rng.randint(3, 40))) for _ in range(short_count)]
+    long = [with_signal(filler(5000)) for _ in range(long_count)]
+    return short, long
+
+def time_it(fn, messages):
+    start = time.perf_counter()
+    results = [fn(message) for message in messages]
+    return results, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--short", type=int, default=1000, help="Number of short messages")
+    parser.add_argument("--long", type=int, default=10, help="Number of 5,000-word messages")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    short, long = build_corpus(args.short, args.long)
+
+    print(f"{'corpus':<14} {'messages':>8} {'legacy ms':>11} {'compiled ms':>12} {'speedup':>8}")
+    for name, messages in (("short", short), ("5000-word", long)):
+        legacy_results, legacy_time = time_it(legacy_detect_crisis, messages)
+        new_results, new_time = time_it(crisis_detector.detect, messages)
+        mismatches = sum(1 for a, b in zip(legacy_results, new_results) if a != b)
+        if mismatches:
+            raise SystemExit(f"{mismatches} {name} messages differ between implementations")
+        print(
+            f"{name:<14} {len(messages):>8} {legacy_time * 1000:>11.1f} {new_time * 1000:>12.1f} "
+            f"{legacy_time / new_time:>7.1f}x"
+        )
+    print("All results identical.")
+
+if __name__ == "__main__":
+    main()
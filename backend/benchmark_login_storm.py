@@ -0,0 +1,134 @@
+"""
+Benchmark: login storms vs latency of unrelated endpoints
+
+Starts the API with uvicorn on a throwaway SQLite database, once with
+bcrypt hashed inline on the event loop (PASSWORD_HASH_WORKERS=0, the old
+behaviour) and once with the hashing pool. In each run a probe keeps calling
+GET /health while --concurrency clients hammer POST /api/auth/login, and the
+probe's latency percentiles are compared with an idle baseline.
+
+Usage:
+    python benchmark_login_storm.py
+    python benchmark_login_storm.py --logins 200 --concurrency 48
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+EMAIL = "storm@example.com"
+PASSWORD = "correct horse battery"
+
+def find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(db_path: str, port: int, extra_env: dict) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", **extra_env)
+    subprocess.run([sys.executable, "-c", "import init_db; init_db.init_db()"], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("API server did not start")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+async def storm(client: httpx.AsyncClient, logins: int, concurrency: int):
+    outcomes = {"ok": 0, "shed": 0, "other": 0}
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD})
+            key = "ok" if response.status_code == 200 else "shed" if response.status_code == 503 else "other"
+            outcomes[key] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return outcomes
+
+async def run_mode(label: str, extra_env: dict, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = find_free_port()
+        proc = start_server(os.path.join(tmp, "bench.db"), port, extra_env)
+        limits = httpx.Limits(max_connections=args.concurrency + 4)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300, limits=limits) as client:
+                await client.post("/api/auth/register", json={"email": EMAIL, "password": PASSWORD})
+
+                stop = asyncio.Event()
+                idle_task = asyncio.create_task(probe(client, stop, args.probe_interval))
+                await asyncio.sleep(2)
+                stop.set()
+                idle = await idle_task
+
+                stop = asyncio.Event()
+                probe_task = asyncio.create_task(probe(client, stop, args.probe_interval))
+                started = time.perf_counter()
+                outcomes = await storm(client, args.logins, args.concurrency)
+                elapsed = time.perf_counter() - started
+                stop.set()
+                loaded = await probe_task
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    return {
+        "label": label,
+        "idle_p50": statistics.median(idle),
+        "idle_p99": percentile(idle, 99),
+        "storm_p50": statistics.median(loaded),
+        "storm_p99": percentile(loaded, 99),
+        "logins_per_s": outcomes["ok"] / elapsed,
+        **outcomes,
+    }
+
+async def main_async(args):
+    results = [
+        await run_mode("inline bcrypt", {"PASSWORD_HASH_WORKERS": "0"}, args),
+        await run_mode("hashing pool", {}, args),
+    ]
+    print(f"\n{args.logins} logins, {args.concurrency} concurrent clients; /health latency in ms")
+    print(f"{'mode':<15} {'idle p50':>9} {'idle p99':>9} {'storm p50':>10} {'storm p99':>10} {'logins/s':>9} {'ok':>5} {'503':>5}")
+    for r in results:
+        print(
+            f"{r['label']:<15} {r['idle_p50']:>9.1f} {r['idle_p99']:>9.1f} {r['storm_p50']:>10.1f} "
+            f"{r['storm_p99']:>10.1f} {r['logins_per_s']:>9.1f} {r['ok']:>5} {r['shed']:>5}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=60, help="Total login attempts in the storm")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent login clients")
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="Seconds between /health probes")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark: NumPy mood trend engine vs a per-log Python reference
+
+Generates a synthetic mood history per user (default: 10 years, 1-4 logs a
+day with weekday/hour patterns and a slow drift, in a DST-observing
+timezone), checks that the engine and the reference agree on every figure
+and prints per-user timings for loading the rows into arrays and computing
+the full report.
+
+Usage:
+    python benchmark_mood_trends.py
+    python benchmark_mood_trends.py --users 20 --years 10 --timezone Europe/London
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import mood_trends
+from app.services.reminder_schedule import user_zone
+
+def synthetic_history(years: int, now: datetime, seed: int):
+    """(created_at naive UTC, intensity) rows, oldest first"""
+    rng = random.Random(seed)
+    rows = []
+    day = now - timedelta(days=365 * years)
+    while day < now:
+        drift = 2 * (day - now).days / (365 * years)  # From -2 back then to 0 now
+        for _ in range(rng.randint(1, 4)):
+            at = day.replace(hour=0, minute=0, second=0) + timedelta(seconds=rng.randrange(86400))
+            mood = 6 + drift + (1 if at.weekday() >= 5 else 0) - (1 if at.hour < 7 else 0) + rng.gauss(0, 1.5)
+            rows.append((at, float(min(10, max(1, round(mood))))))
+        day += timedelta(days=1)
+    return [row for row in rows if row[0] <= now]
+
+def reference_trends(rows, zone, now: datetime, days: int, weeks: int) -> dict:
+    """The same report computed log by log in plain Python"""
+    def local(at):
+        return at.replace(tzinfo=timezone.utc).astimezone(zone)
+
+    today = local(now).date()
+    by_day = defaultdict(list)
+    by_weekday = defaultdict(list)
+    by_hour = defaultdict(list)
+    for at, value in rows:
+        moment = local(at)
+        if moment.date() > today:
+            continue
+        by_day[moment.date()].append(value)
+        by_weekday[moment.weekday()].append(value)
+        by_hour[moment.hour].append(value)
+
+    def window_mean(end, width):
+        values = [v for offset in range(width) for v in by_day.get(end - timedelta(days=offset), [])]
+        return statistics.fmean(values) if values else None
+
+    rolling_7 = window_mean(today, 7)
+    previous_7 = window_mean(today - timedelta(days=7), 7)
+
+    daily_days = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    active = [(i, statistics.fmean(by_day[d])) for i, d in enumerate(daily_days) if d in by_day]
+    slope = None
+    if len(active) >= 2:
+        xs, ys = [float(i) for i, _ in active], [m for _, m in active]
+        x_mean, y_mean = statistics.fmean(xs), statistics.fmean(ys)
+        spread = sum((x - x_mean) ** 2 for x in xs)
+        slope = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / spread * 7 if spread else None
+
+    monday = today - timedelta(days=today.weekday())
+    week_means = []
+    for offset in range(weeks, -1, -1):
+        start = monday - timedelta(weeks=offset)
+        values = [v for d in range(7) for v in by_day.get(start + timedelta(days=d), [])]
+        week_means.append(statistics.fmean(values) if values else None)
+    week_deltas = [
+        None if a is None or b is None else b - a
+        for a, b in zip(week_means, week_means[1:])
+    ]
+
+    return {
+        "total_logs": sum(len(v) for v in by_day.values()),
+        "rolling_7d": rolling_7,
+        "rolling_30d": window_mean(today, 30),
+        "week_over_week": None if rolling_7 is None or previous_7 is None else rolling_7 - previous_7,
+        "slope_per_week": slope,
+        "daily_rolling_7d": [window_mean(d, 7) for d in daily_days],
+        "weekly_delta": week_deltas,
+        "day_of_week": [statistics.fmean(by_weekday[d]) if by_weekday[d] else None for d in range(7)],
+        "hour_of_day": [statistics.fmean(by_hour[h]) if by_hour[h] else None for h in range(24)],
+    }
+
+def close(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return abs(a - b) <= 0.006  # The engine rounds to 2 decimals
+
+def compare(engine: dict, reference: dict) -> list:
+    flat = {
+        "total_logs": engine["total_logs"],
+        "rolling_7d": engine["rolling_7d"],
+        "rolling_30d": engine["rolling_30d"],
+        "week_over_week": engine["week_over_week"],
+        "slope_per_week": engine["slope_per_week"],
+        "daily_rolling_7d": [day["rolling_7d"] for day in engine["daily"]],
+        "weekly_delta": [week["delta"] for week in engine["weekly"]],
+        "day_of_week": [day["average"] for day in engine["day_of_week"]],
+        "hour_of_day": [hour["average"] for hour in engine["hour_of_day"]],
+    }
+    mismatches = []
+    for key, expected in reference.items():
+        got = flat[key]
+        pairs = zip(got, expected) if isinstance(expected, list) else [(got, expected)]
+        if isinstance(expected, list) and len(got) != len(expected) or not all(close(a, b) for a, b in pairs):
+            mismatches.append(key)
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5, help="Synthetic users (histories)")
+    parser.add_argument("--years", type=int, default=10, help="Years of history per user")
+    parser.add_argument("--timezone", default="America/New_York")
+    parser.add_argument("--days", type=int, default=mood_trends.TREND_DAYS)
+    parser.add_argument("--weeks", type=int, default=mood_trends.TREND_WEEKS)
+    args = parser.parse_args()
+
+    zone = user_zone(args.timezone)
+    now = datetime.utcnow().replace(microsecond=0)
+    load_times, engine_times, reference_times, sizes = [], [], [], []
+    failures = 0
+
+    for user in range(args.users):
+        rows = synthetic_history(args.years, now, seed=user)
+        sizes.append(len(rows))
+
+        started = time.perf_counter()
+        epoch, values = mood_trends.to_arrays(rows)
+        load_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        engine = mood_trends.compute_trends(epoch, values, zone, now, days=args.days, weeks=args.weeks)
+        engine_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        reference = reference_trends(rows, zone, now, args.days, args.weeks)
+        reference_times.append(time.perf_counter() - started)
+
+        mismatches = compare(engine, reference)
+        if mismatches:
+            failures += 1
+            print(f"❌ user {user}: engine and reference disagree on {', '.join(mismatches)}")
+
+    def ms(samples):
+        return f"{statistics.median(samples) * 1000:8.1f} ms median, {max(samples) * 1000:8.1f} ms max"
+
+    print(f"{args.users} users x {args.years} years in {args.timezone}: {statistics.median(sizes):,.0f} logs per user (median)")
+    print(f"  rows -> arrays      {ms(load_times)}")
+    print(f"  NumPy engine        {ms(engine_times)}")
+    print(f"  Python reference    {ms(reference_times)}")
+    print(f"  speedup (engine)    {statistics.median(reference_times) / statistics.median(engine_times):8.1f}x")
+    if failures:
+        sys.exit(1)
+    print("✅ Engine matches the reference for every user")
+
+if __name__ == "__main__":
+    main()
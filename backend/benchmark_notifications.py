@@ -0,0 +1,156 @@
+"""
+Benchmark: reminder scheduler tick vs the per-user loop
+
+Builds a throwaway SQLite database with --users users, each with
+notification preferences and reminder schedules, some with a mood logged
+today and some with active goals. All reminder times are set to the
+benchmark's clock minute, so every user has something due. It then times:
+  per-user loop - the original check: per user, the preferences (twice),
+                  today's mood, the goal count, and one INSERT + COMMIT +
+                  refresh per notification (run on --legacy-users users)
+  all due       - NotificationService.check_and_send_notifications
+and prints users/second for each, followed by ticks where only 1% of
+users, then nobody, is due - the cost should follow the due count.
+
+Usage:
+    python benchmark_notifications.py
+    python benchmark_notifications.py --users 100000 --legacy-users 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Goal, MoodLog, Notification, NotificationPreferences, ReminderSchedule, User
+from app.services.notification_service import NotificationService
+
+# A Monday at 09:00 UTC, so the weekly goal reminder is due too
+NOW = datetime(2024, 1, 1, 9, 0)
+CLOCK = NOW.strftime("%H:%M")
+BATCH = 5000
+
+def build_database(url: str, users: int, seed: int = 7):
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        for start in range(0, users, BATCH):
+            size = min(BATCH, users - start)
+            conn.execute(insert(User), [
+                {"id": start + i + 1, "email": f"user{start + i}@example.com", "hashed_password": "x"}
+                for i in range(size)
+            ])
+            conn.execute(insert(NotificationPreferences), [
+                {
+                    "user_id": start + i + 1,
+                    "daily_checkin_time": CLOCK,
+                    "mood_reminder_time": CLOCK,
+                    "meditation_reminder_time": CLOCK,
+                    "meditation_reminder_enabled": rng.choice(["true", "false"]),
+                    "motivational_messages_enabled": "false",
+                }
+                for i in range(size)
+            ])
+            user_ids = range(start + 1, start + size + 1)
+            conn.execute(insert(ReminderSchedule), [
+                {"user_id": user_id, "kind": kind, "next_fire_at": NOW}
+                for user_id in user_ids for kind in ("daily_checkin", "mood_reminder", "meditation", "goal")
+            ])
+            conn.execute(insert(MoodLog), [
+                {"user_id": user_id, "mood_type": "calm", "intensity": 5,
+                 "created_at": NOW - timedelta(hours=rng.choice([2, 30]))}
+                for user_id in user_ids if rng.random() < 0.5
+            ])
+            conn.execute(insert(Goal), [
+                {"user_id": user_id, "title": "Walk daily", "status": "active", "progress": 0}
+                for user_id in user_ids if rng.random() < 0.3
+            ])
+    return engine
+
+def legacy_loop(db, now, limit):
+    """The original check's per-user query and commit pattern"""
+    sent = 0
+    day = now.date()
+    for user in db.query(User).order_by(User.id).limit(limit).all():
+        prefs = db.query(NotificationPreferences).filter(NotificationPreferences.user_id == user.id).first()
+        if not prefs:
+            continue
+        notifications = []
+        for enabled, reminder_time, notification_type, needs_no_mood in [
+            (prefs.daily_checkin_enabled, prefs.daily_checkin_time, "daily_checkin", True),
+            (prefs.mood_reminder_enabled, prefs.mood_reminder_time, "mood_reminder", True),
+            (prefs.meditation_reminder_enabled, prefs.meditation_reminder_time, "meditation", False),
+        ]:
+            if enabled != "true" or reminder_time != now.strftime("%H:%M"):
+                continue
+            if needs_no_mood:
+                db.query(NotificationPreferences).filter(NotificationPreferences.user_id == user.id).first()
+                if db.query(MoodLog).filter(MoodLog.user_id == user.id, func.date(MoodLog.created_at) == day).first():
+                    continue
+            notifications.append(notification_type)
+        if prefs.goal_reminder_enabled == "true":
+            db.query(NotificationPreferences).filter(NotificationPreferences.user_id == user.id).first()
+            if db.query(Goal).filter(Goal.user_id == user.id, Goal.status == "active").count():
+                db.query(Goal).filter(Goal.user_id == user.id, Goal.status == "active").count()
+                notifications.append("goal")
+        for notification_type in notifications:
+            notification = Notification(user_id=user.id, type=notification_type, title="t", message="m", read="false")
+            db.add(notification)
+            db.commit()
+            db.refresh(notification)
+            sent += 1
+    return sent
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000, help="Users with notification preferences")
+    parser.add_argument("--legacy-users", type=int, default=2000, help="Users to run the per-user loop over")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building database with {args.users} users...")
+        engine = build_database(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.users)
+        SessionLocal = sessionmaker(bind=engine)
+
+        db = SessionLocal()
+        started = time.perf_counter()
+        sent = legacy_loop(db, NOW, args.legacy_users)
+        elapsed = time.perf_counter() - started
+        db.query(Notification).delete()
+        db.commit()
+        db.close()
+        legacy_rate = args.legacy_users / elapsed
+        print(f"per-user loop: {args.legacy_users} users, {sent} sent in {elapsed:.2f}s -> {legacy_rate:,.0f} users/s")
+
+        db = SessionLocal()
+        result = NotificationService.check_and_send_notifications(db, now=NOW)
+        print(
+            f"all due:       {result['users_checked']} users, {result['notifications_sent']} sent in "
+            f"{result['elapsed_seconds']:.2f}s -> {result['users_per_second']:,.0f} users/s"
+        )
+        print(f"speedup: {result['users_per_second'] / legacy_rate:.1f}x")
+
+        # Everything is now scheduled for tomorrow; make 1% due again a minute later
+        later = NOW + timedelta(minutes=1)
+        db.query(ReminderSchedule).filter(ReminderSchedule.user_id % 100 == 0).update(
+            {"next_fire_at": later}, synchronize_session=False
+        )
+        db.commit()
+        for label in ("1% due", "none due"):
+            result = NotificationService.check_and_send_notifications(db, now=later)
+            print(f"{label + ':':<14} {result['users_checked']} users, {result['notifications_sent']} sent in {result['elapsed_seconds'] * 1000:.1f} ms")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
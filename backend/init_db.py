@@ -3,11 +3,14 @@ Initialize Database - Create all tables
 """
 from app.database import engine, Base
 from app.models import User, Session, MoodLog, JournalEntry, ThoughtRecord, Goal, SleepLog
+from app.services import chat_search, journal_search
 
 def init_db():
     """Create all database tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    chat_search.ensure_search_index(engine)
+    journal_search.ensure_search_index(engine)
     print("Database initialized successfully!")
 
 if __name__ == "__main__":
@@ -13,12 +13,15 @@ from app.models import (
     User, Session, MoodLog, JournalEntry, ThoughtRecord, 
     Goal, SleepLog, CrisisAlert, NotificationPreferences, Notification
 )
+from app.services import chat_search, journal_search
 
 def init_db():
     """Create all database tables"""
     print("Creating database tables on Vercel Postgres...")
     try:
         Base.metadata.create_all(bind=engine)
+        chat_search.ensure_search_index(engine)
+        journal_search.ensure_search_index(engine)
         print("✅ Database initialized successfully!")
         print("\nTables created:")
         for table in Base.metadata.tables:
@@ -0,0 +1,149 @@
+"""
+Load test for GroqService.chat against a local stub LLM server
+
+Starts an OpenAI-compatible stub on localhost that answers every completion
+(plain or streamed) after a fixed delay, points GroqService at it and measures throughput at
+increasing concurrency. With a non-blocking client throughput should grow
+roughly linearly with concurrency until the connection pool is saturated.
+
+Usage:
+    python load_test_groq.py
+    python load_test_groq.py --latency 0.5 --levels 1,10,50,100,200
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def create_stub_app(latency: float):
+    """OpenAI-compatible completion endpoint that sleeps before answering"""
+    import json
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    stub = FastAPI()
+    reply = "I hear you. Tell me more."
+
+    async def stream_chunks(model: str):
+        # Spread the latency across tokens like a real model would
+        tokens = reply.split(" ")
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(latency / len(tokens))
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": token if i == 0 else " " + token},
+                    "finish_reason": None,
+                }],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @stub.post("/openai/v1/chat/completions")
+    async def completions(payload: dict):
+        if payload.get("stream"):
+            return StreamingResponse(stream_chunks(payload.get("model", "stub")), media_type="text/event-stream")
+        await asyncio.sleep(latency)
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 8, "total_tokens": 18},
+        }
+
+    return stub
+
+def run_stub_server(latency: float, port: int):
+    import uvicorn
+
+    uvicorn.run(create_stub_app(latency), host="127.0.0.1", port=port, log_level="warning")
+
+def start_stub_server(latency: float, port: int) -> multiprocessing.Process:
+    """Run the stub in its own process so it doesn't compete with the client for the GIL"""
+    process = multiprocessing.Process(target=run_stub_server, args=(latency, port), daemon=True)
+    process.start()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Stub LLM server did not start")
+
+async def run_level(service, concurrency: int, requests_per_worker: int) -> dict:
+    latencies = []
+
+    async def worker():
+        for _ in range(requests_per_worker):
+            start = time.perf_counter()
+            result = await service.chat(messages=[], user_message="I had a long day at work")
+            latencies.append(time.perf_counter() - start)
+            if result.get("error"):
+                raise RuntimeError(result["error"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+async def main(args):
+    from app.services.groq_service import groq_service
+
+    print(f"{'concurrency':>11} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    try:
+        for level in args.levels:
+            stats = await run_level(groq_service, level, args.requests_per_worker)
+            print(
+                f"{stats['concurrency']:>11} {stats['requests']:>9} {stats['throughput']:>9.1f} "
+                f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f}"
+            )
+    finally:
+        await groq_service.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.25, help="Stub completion latency in seconds")
+    parser.add_argument("--levels", default="1,10,50,100,200", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests-per-worker", type=int, default=5)
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(",")]
+
+    port = find_free_port()
+    stub_process = start_stub_server(args.latency, port)
+
+    # Settings are read when the service module is imported, so configure first
+    os.environ["GROQ_API_KEY"] = "stub-key"
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{port}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    try:
+        asyncio.run(main(args))
+    finally:
+        stub_process.terminate()
@@ -0,0 +1,104 @@
+"""
+Database migration script to move chat history into the chat_messages table
+Creates the table, adds sessions.message_count and copies every session's
+legacy messages JSON into one row per message. The JSON column is left in
+place. Safe to rerun: sessions that already have rows are skipped.
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import inspect, insert, text
+from app.database import engine, SessionLocal
+from app.models import ChatMessage, Session as ChatSession
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BATCH_SIZE = 500
+
+def parse_timestamp(value, fallback):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return fallback
+
+def add_schema():
+    inspector = inspect(engine)
+
+    if "chat_messages" in inspector.get_table_names():
+        print("ℹ️ chat_messages table already exists.")
+    else:
+        print("Creating chat_messages table...")
+        ChatMessage.__table__.create(bind=engine)
+        print("✅ Successfully created chat_messages table!")
+
+    existing_columns = {col["name"] for col in inspector.get_columns("sessions")}
+    if "message_count" in existing_columns:
+        print("ℹ️ message_count column already exists.")
+    else:
+        print("Adding message_count column to sessions table...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sessions ADD COLUMN message_count INTEGER DEFAULT 0"))
+        print("✅ Successfully added message_count column!")
+
+def backfill_messages():
+    db = SessionLocal()
+    last_id = 0
+    migrated_sessions = 0
+    migrated_messages = 0
+    try:
+        while True:
+            sessions = db.query(ChatSession.id, ChatSession.user_id, ChatSession.messages, ChatSession.created_at).filter(
+                ChatSession.id > last_id
+            ).order_by(ChatSession.id).limit(BATCH_SIZE).all()
+            if not sessions:
+                break
+            last_id = sessions[-1].id
+
+            session_ids = [session.id for session in sessions]
+            already_migrated = {
+                session_id for (session_id,) in db.query(ChatMessage.session_id).filter(
+                    ChatMessage.session_id.in_(session_ids)
+                ).distinct()
+            }
+
+            rows = []
+            for session in sessions:
+                if session.id in already_migrated:
+                    continue
+                history = [m for m in (session.messages or []) if isinstance(m, dict)]
+                for seq, message in enumerate(history):
+                    rows.append({
+                        "session_id": session.id,
+                        "user_id": session.user_id,
+                        "seq": seq,
+                        "role": message.get("role", "user"),
+                        "content": message.get("content", ""),
+                        "timestamp": parse_timestamp(message.get("timestamp"), session.created_at),
+                    })
+                db.query(ChatSession).filter(ChatSession.id == session.id).update(
+                    {"message_count": len(history)}, synchronize_session=False
+                )
+                migrated_sessions += 1
+                migrated_messages += len(history)
+
+            if rows:
+                db.execute(insert(ChatMessage), rows)
+            db.commit()
+            print(f"  ...processed sessions up to id {last_id}")
+    finally:
+        db.close()
+
+    print(f"✅ Migrated {migrated_messages} messages from {migrated_sessions} sessions.")
+
+def migrate_database():
+    add_schema()
+    print("\nCopying chat history into chat_messages...")
+    backfill_messages()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,49 @@
+"""
+Database migration script to add full-text search over chat messages
+Adds chat_messages.user_id (a copy of the session's owner) and fills it in
+for existing messages.
+SQLite: creates the chat_messages_fts FTS5 table and its sync triggers, then
+indexes existing messages. PostgreSQL: adds the generated search_vector column
+and the composite (user_id, search_vector) GIN index, which needs the
+btree_gin extension (existing rows are filled in by the database).
+Run after migrate_chat_messages.py. Safe to re-run.
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.services.chat_search import backfill_message_owners, ensure_search_index, rebuild_search_index
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+def add_schema():
+    columns = {column["name"] for column in inspect(engine).get_columns("chat_messages")}
+    if "user_id" in columns:
+        print("ℹ️ user_id column already exists.")
+    else:
+        print("Adding user_id column to chat_messages table...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE chat_messages ADD COLUMN user_id INTEGER REFERENCES users (id)"))
+        print("✅ Successfully added user_id column!")
+
+def migrate_database():
+    add_schema()
+    print("Copying session owners onto existing messages...")
+    print(f"✅ Updated {backfill_message_owners(engine)} messages.")
+
+    print(f"Creating chat search index ({engine.dialect.name})...")
+    needs_backfill = ensure_search_index(engine)
+    print("✅ Search index is in place!")
+
+    if needs_backfill or "--rebuild" in sys.argv:
+        print("Indexing existing chat messages...")
+        indexed = rebuild_search_index(engine)
+        print(f"✅ Indexed {indexed} messages.")
+    else:
+        print("ℹ️ Index already existed - pass --rebuild to reindex every message.")
+
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
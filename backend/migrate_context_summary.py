@@ -0,0 +1,33 @@
+"""
+Database migration script to add rolling context summary columns to sessions
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+NEW_COLUMNS = {
+    "context_summary": "TEXT",
+    "context_summary_count": "INTEGER DEFAULT 0",
+}
+
+def migrate_database():
+    existing_columns = {col["name"] for col in inspect(engine).get_columns("sessions")}
+    
+    with engine.begin() as conn:
+        for column, ddl in NEW_COLUMNS.items():
+            if column in existing_columns:
+                print(f"ℹ️ {column} column already exists.")
+                continue
+            print(f"Adding {column} column to sessions table...")
+            conn.execute(text(f"ALTER TABLE sessions ADD COLUMN {column} {ddl}"))
+            print(f"✅ Successfully added {column} column!")
+    
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,102 @@
+"""
+Database migration script for idempotent crisis screening backfills
+Adds source/source_id to crisis_alerts and the unique index on them that lets
+screen_crisis_backlog.py insert with ON CONFLICT DO NOTHING. Alerts raised
+live keep NULLs, which never conflict.
+Backfill alerts written before this migration are matched back to the row
+they came from by user and text (one alert per match, the earliest), so a
+rerun of the screening job doesn't alert those rows again.
+On PostgreSQL the index is built with CREATE UNIQUE INDEX CONCURRENTLY so
+the table stays writable while it builds; an invalid index left behind by
+an interrupted build is dropped and rebuilt. Safe to re-run.
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+INDEX_NAME = "ix_crisis_alerts_source_source_id"
+
+# source -> (table, SELECT of (id, user_id, text) for the rows screen_crisis_backlog.py scans)
+SOURCE_ROWS = {
+    "chat": ("chat_messages", "SELECT m.id, s.user_id, m.content AS text FROM chat_messages m "
+                              "JOIN sessions s ON s.id = m.session_id WHERE m.role = 'user'"),
+    "journal": ("journal_entries", "SELECT id, user_id, content AS text FROM journal_entries"),
+    "thought_record": ("thought_records", "SELECT id, user_id, automatic_thought AS text FROM thought_records"),
+}
+
+def add_columns():
+    columns = [col["name"] for col in inspect(engine).get_columns("crisis_alerts")]
+    with engine.begin() as conn:
+        for name, sql_type in (("source", "VARCHAR"), ("source_id", "INTEGER")):
+            if name in columns:
+                print(f"ℹ️ {name} column already exists.")
+                continue
+            print(f"Adding {name} column to crisis_alerts table...")
+            conn.execute(text(f"ALTER TABLE crisis_alerts ADD COLUMN {name} {sql_type}"))
+            print(f"✅ Successfully added {name} column!")
+
+def tag_legacy_alerts():
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for source, (table, rows) in SOURCE_ROWS.items():
+            if table not in existing_tables:
+                continue
+            tagged = conn.execute(text(f"""
+                UPDATE crisis_alerts SET source = :source, source_id = (
+                    SELECT min(r.id) FROM ({rows}) r
+                    WHERE r.user_id = crisis_alerts.user_id AND r.text = crisis_alerts.user_message
+                )
+                WHERE status = 'backfill' AND source IS NULL
+                AND id = (
+                    SELECT min(a.id) FROM crisis_alerts a
+                    WHERE a.status = 'backfill' AND a.user_id = crisis_alerts.user_id
+                    AND a.user_message = crisis_alerts.user_message
+                )
+                AND EXISTS (
+                    SELECT 1 FROM ({rows}) r
+                    WHERE r.user_id = crisis_alerts.user_id AND r.text = crisis_alerts.user_message
+                )
+            """), {"source": source}).rowcount
+            if tagged:
+                print(f"✅ Linked {tagged} earlier backfill alerts to their {source} rows.")
+
+def add_index():
+    is_postgres = engine.dialect.name == "postgresql"
+    existing = {ix["name"] for ix in inspect(engine).get_indexes("crisis_alerts")}
+
+    # CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if is_postgres:
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": INDEX_NAME}).first()
+            if invalid:
+                print(f"Dropping invalid index {INDEX_NAME} left by an interrupted build...")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+                existing.discard(INDEX_NAME)
+
+        if INDEX_NAME in existing:
+            print(f"ℹ️ {INDEX_NAME} already exists.")
+            return
+
+        print(f"Creating {INDEX_NAME}...")
+        keyword = "CONCURRENTLY " if is_postgres else ""
+        conn.execute(text(f"CREATE UNIQUE INDEX {keyword}IF NOT EXISTS {INDEX_NAME} ON crisis_alerts (source, source_id)"))
+    print(f"✅ Successfully created {INDEX_NAME}!")
+
+def migrate_database():
+    if "crisis_alerts" not in inspect(engine).get_table_names():
+        print("⚠️ crisis_alerts table does not exist yet - run init_db.py first.")
+        return
+    add_columns()
+    tag_legacy_alerts()
+    add_index()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
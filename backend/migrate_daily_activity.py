@@ -0,0 +1,52 @@
+"""
+Database migration script for the daily activity rollup
+Creates the daily_activity and user_streaks tables and builds them from the
+existing mood logs, journal entries, chat messages, sleep logs and thought
+records, a batch of users per transaction. Safe to re-run: each batch is
+recounted from history and overwritten.
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import argparse
+import sys
+from sqlalchemy import inspect
+from app.database import engine, SessionLocal
+from app.models import DailyActivity, UserStreak
+from app.services.activity import BACKFILL_BATCH_SIZE, backfill_activity
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+def add_schema():
+    existing = inspect(engine).get_table_names()
+    for model in (DailyActivity, UserStreak):
+        table = model.__tablename__
+        if table in existing:
+            print(f"ℹ️ {table} table already exists.")
+        else:
+            print(f"Creating {table} table...")
+            model.__table__.create(bind=engine)
+            print(f"✅ Successfully created {table} table!")
+
+def backfill(batch_size: int):
+    db = SessionLocal()
+    try:
+        report = backfill_activity(db, batch_size=batch_size)
+    finally:
+        db.close()
+    print(
+        f"✅ Rebuilt activity for {report['users']} users "
+        f"({report['active_days']} active days, {report['elapsed_seconds']}s)."
+    )
+
+def migrate_database(batch_size: int = BACKFILL_BATCH_SIZE):
+    add_schema()
+    print("\nBuilding daily activity from history...")
+    backfill(batch_size)
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Users per transaction")
+    args = parser.parse_args()
+    migrate_database(args.batch_size)
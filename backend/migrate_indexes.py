@@ -0,0 +1,72 @@
+"""
+Database migration script for the per-user composite indexes
+Creates every index declared on the models that the database doesn't have
+yet - mainly (user_id, created_at) on the per-user tables and
+(user_id, read, sent_at) on notifications.
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY so the
+tables stay writable while they build; an invalid index left behind by an
+interrupted build is dropped and rebuilt. On SQLite they are created inline.
+Safe to re-run.
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import Base, engine
+import app.models  # noqa: F401 - registers the tables on Base.metadata
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+def declared_indexes():
+    """Non-unique indexes declared on the models; unique ones are owned by their feature migrations"""
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if not index.unique:
+                yield table.name, index
+
+def index_sql(table_name, index, concurrently=False):
+    columns = ", ".join(column.name for column in index.columns)
+    keyword = "CONCURRENTLY " if concurrently else ""
+    return f"CREATE INDEX {keyword}IF NOT EXISTS {index.name} ON {table_name} ({columns})"
+
+def invalid_postgres_indexes(conn):
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+    ))
+    return {name for (name,) in rows}
+
+def migrate_database():
+    is_postgres = engine.dialect.name == "postgresql"
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    # CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        invalid = invalid_postgres_indexes(conn) if is_postgres else set()
+        created = 0
+
+        for table_name, index in declared_indexes():
+            if table_name not in existing_tables:
+                print(f"⚠️ Table {table_name} does not exist yet - run init_db.py first. Skipping {index.name}.")
+                continue
+
+            existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+            if index.name in invalid:
+                print(f"Dropping invalid index {index.name} left by an interrupted build...")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+            elif index.name in existing:
+                continue
+
+            print(f"Creating {index.name}...")
+            conn.execute(text(index_sql(table_name, index, concurrently=is_postgres)))
+            created += 1
+
+        if created:
+            # Fresh statistics so the planner picks the new indexes up right away
+            conn.execute(text("ANALYZE"))
+
+    print(f"✅ Created {created} indexes." if created else "ℹ️ All indexes already exist.")
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,70 @@
+"""
+Database migration script for journal search
+Creates the journal_tags table and fills it from each entry's tags JSON,
+adds the (user_id, created_at) index and the full-text index over title and
+content (FTS5 + triggers on SQLite, generated tsvector + GIN on PostgreSQL).
+Safe to rerun.
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine, SessionLocal
+from app.models import JournalEntry, JournalTag
+from app.services.journal_search import ensure_search_index, rebuild_search_index, sync_tags
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BATCH_SIZE = 500
+
+def add_schema():
+    if "journal_tags" in inspect(engine).get_table_names():
+        print("ℹ️ journal_tags table already exists.")
+    else:
+        print("Creating journal_tags table...")
+        JournalTag.__table__.create(bind=engine)
+        print("✅ Successfully created journal_tags table!")
+
+    with engine.begin() as conn:
+        print("Creating ix_journal_entries_user_id_created_at index...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_journal_entries_user_id_created_at ON journal_entries (user_id, created_at)"
+        ))
+
+    print(f"Creating journal full-text index ({engine.dialect.name})...")
+    if ensure_search_index(engine) or "--rebuild" in sys.argv:
+        print(f"✅ Indexed {rebuild_search_index(engine)} journal entries.")
+    else:
+        print("ℹ️ Full-text index already existed - pass --rebuild to reindex every entry.")
+
+def backfill_tags():
+    db = SessionLocal()
+    last_id = 0
+    tagged = 0
+    try:
+        while True:
+            entries = db.query(JournalEntry).filter(
+                JournalEntry.id > last_id
+            ).order_by(JournalEntry.id).limit(BATCH_SIZE).all()
+            if not entries:
+                break
+            last_id = entries[-1].id
+            for entry in entries:
+                if entry.tags:
+                    sync_tags(entry)
+                    tagged += 1
+            db.commit()
+            db.expunge_all()
+    finally:
+        db.close()
+
+    print(f"✅ Indexed tags for {tagged} journal entries.")
+
+def migrate_database():
+    add_schema()
+    print("\nBackfilling journal tags...")
+    backfill_tags()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,41 @@
+"""
+Database migration script for the unread notification counters
+Creates the notification_counters table and fills it with each user's
+current unread notification count. Safe to re-run: existing counters are
+recounted and corrected.
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import sys
+from sqlalchemy import inspect
+from app.database import engine, SessionLocal
+from app.models import NotificationCounter
+from app.services.notification_counters import repair_counters
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+def add_schema():
+    if "notification_counters" in inspect(engine).get_table_names():
+        print("ℹ️ notification_counters table already exists.")
+    else:
+        print("Creating notification_counters table...")
+        NotificationCounter.__table__.create(bind=engine)
+        print("✅ Successfully created notification_counters table!")
+
+def backfill_counters():
+    db = SessionLocal()
+    try:
+        report = repair_counters(db)
+    finally:
+        db.close()
+    print(f"✅ Counted unread notifications for {report['users_checked']} users ({report['users_drifted']} counters written).")
+
+def migrate_database():
+    add_schema()
+    print("\nCounting unread notifications...")
+    backfill_counters()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
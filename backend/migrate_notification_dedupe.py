@@ -0,0 +1,64 @@
+"""
+Database migration script for idempotent notification delivery
+Adds the dedupe_key column to notifications and the unique index on it that
+lets the reminder scheduler insert with ON CONFLICT DO NOTHING. Existing
+notifications keep a NULL key, which never conflicts.
+On PostgreSQL the index is built with CREATE UNIQUE INDEX CONCURRENTLY so
+the table stays writable while it builds; an invalid index left behind by
+an interrupted build is dropped and rebuilt. Safe to re-run.
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+INDEX_NAME = "ix_notifications_dedupe_key"
+
+def add_column():
+    columns = [col["name"] for col in inspect(engine).get_columns("notifications")]
+    if "dedupe_key" in columns:
+        print("ℹ️ dedupe_key column already exists.")
+        return
+    print("Adding dedupe_key column to notifications table...")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE notifications ADD COLUMN dedupe_key VARCHAR"))
+    print("✅ Successfully added dedupe_key column!")
+
+def add_index():
+    is_postgres = engine.dialect.name == "postgresql"
+    existing = {ix["name"] for ix in inspect(engine).get_indexes("notifications")}
+
+    # CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if is_postgres:
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": INDEX_NAME}).first()
+            if invalid:
+                print(f"Dropping invalid index {INDEX_NAME} left by an interrupted build...")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+                existing.discard(INDEX_NAME)
+
+        if INDEX_NAME in existing:
+            print(f"ℹ️ {INDEX_NAME} already exists.")
+            return
+
+        print(f"Creating {INDEX_NAME}...")
+        keyword = "CONCURRENTLY " if is_postgres else ""
+        conn.execute(text(f"CREATE UNIQUE INDEX {keyword}IF NOT EXISTS {INDEX_NAME} ON notifications (dedupe_key)"))
+    print(f"✅ Successfully created {INDEX_NAME}!")
+
+def migrate_database():
+    if "notifications" not in inspect(engine).get_table_names():
+        print("⚠️ notifications table does not exist yet - run init_db.py first.")
+        return
+    add_column()
+    add_index()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,60 @@
+"""
+Database migration script for the reminder scheduler
+Creates the reminder_schedules table and computes the next fire time of
+every enabled reminder for every user with notification preferences, in
+their own timezone. Safe to re-run: existing rows are re-synced.
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import inspect
+from app.database import engine, SessionLocal
+from app.models import NotificationPreferences, ReminderSchedule
+from app.services.reminder_schedule import sync_user_schedule
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BATCH_SIZE = 1000
+
+def add_schema():
+    if "reminder_schedules" in inspect(engine).get_table_names():
+        print("ℹ️ reminder_schedules table already exists.")
+    else:
+        print("Creating reminder_schedules table...")
+        ReminderSchedule.__table__.create(bind=engine)
+        print("✅ Successfully created reminder_schedules table!")
+
+def backfill_schedules():
+    db = SessionLocal()
+    now = datetime.utcnow()
+    last_user_id = 0
+    synced = 0
+    try:
+        while True:
+            user_ids = [user_id for (user_id,) in db.query(NotificationPreferences.user_id).filter(
+                NotificationPreferences.user_id > last_user_id
+            ).order_by(NotificationPreferences.user_id).limit(BATCH_SIZE)]
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            for user_id in user_ids:
+                sync_user_schedule(db, user_id, now=now)
+            db.commit()
+            synced += len(user_ids)
+            print(f"  ...{synced} users")
+    finally:
+        db.close()
+
+    print(f"✅ Scheduled reminders for {synced} users.")
+
+def migrate_database():
+    add_schema()
+    print("\nComputing next fire times...")
+    backfill_schedules()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,77 @@
+"""
+Database migration script for the lightweight session list
+Adds sessions.title (backfilled from each session's first user message),
+fills in missing updated_at values and indexes (user_id, updated_at) for
+keyset pagination. Run after migrate_chat_messages.py.
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine, SessionLocal
+from app.models import ChatMessage, Session as ChatSession
+from app.services.chat_store import make_title
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BATCH_SIZE = 500
+
+def add_schema():
+    existing_columns = {col["name"] for col in inspect(engine).get_columns("sessions")}
+
+    with engine.begin() as conn:
+        if "title" in existing_columns:
+            print("ℹ️ title column already exists.")
+        else:
+            print("Adding title column to sessions table...")
+            conn.execute(text("ALTER TABLE sessions ADD COLUMN title VARCHAR"))
+            print("✅ Successfully added title column!")
+
+        print("Filling in missing updated_at values...")
+        conn.execute(text("UPDATE sessions SET updated_at = created_at WHERE updated_at IS NULL"))
+
+        print("Creating ix_sessions_user_id_updated_at index...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_sessions_user_id_updated_at ON sessions (user_id, updated_at)"
+        ))
+    print("✅ Schema is up to date!")
+
+def backfill_titles():
+    db = SessionLocal()
+    last_id = 0
+    titled = 0
+    try:
+        while True:
+            session_ids = [session_id for (session_id,) in db.query(ChatSession.id).filter(
+                ChatSession.id > last_id,
+                ChatSession.title.is_(None)
+            ).order_by(ChatSession.id).limit(BATCH_SIZE)]
+            if not session_ids:
+                break
+            last_id = session_ids[-1]
+
+            first_messages = db.query(ChatMessage.session_id, ChatMessage.content).filter(
+                ChatMessage.session_id.in_(session_ids),
+                ChatMessage.seq == 0
+            ).all()
+            for session_id, content in first_messages:
+                db.query(ChatSession).filter(ChatSession.id == session_id).update(
+                    {"title": make_title(content or ""), "updated_at": ChatSession.updated_at},
+                    synchronize_session=False
+                )
+                titled += 1
+            db.commit()
+    finally:
+        db.close()
+
+    print(f"✅ Set titles for {titled} sessions.")
+
+def migrate_database():
+    add_schema()
+    print("\nBackfilling session titles...")
+    backfill_titles()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,29 @@
+"""
+Database migration script for stored AI insights
+Creates the user_insights table. Rows are created on first use and filled
+by the background refresh, so there is nothing to backfill. Safe to re-run.
+Works on both SQLite (local) and PostgreSQL (production).
+"""
+import sys
+from sqlalchemy import inspect
+from app.database import engine
+from app.models import UserInsight
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+def add_schema():
+    if "user_insights" in inspect(engine).get_table_names():
+        print("ℹ️ user_insights table already exists.")
+    else:
+        print("Creating user_insights table...")
+        UserInsight.__table__.create(bind=engine)
+        print("✅ Successfully created user_insights table!")
+
+def migrate_database():
+    add_schema()
+    print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_database()
@@ -1,17 +1,32 @@
 """
 Notification Scheduler Script
-Run this periodically (e.g., via cron job) to check and send notifications
+Sends reminders as they come due. Three ways to run it:
+
+    python notification_scheduler.py --worker
+        Long-running reminder scheduler (app.services.reminder_scheduler)
+        working directly on the database. Use this, or
+        REMINDER_SCHEDULER_ENABLED=true in the API, instead of cron.
+
+    python notification_scheduler.py --once
+        Send everything due right now (including missed reminders) and exit.
 
-Usage:
     python notification_scheduler.py
+        Ask the API to do the same via POST /api/notifications/check-and-send.
+
+--worker and --once take --user-ids START:END to serve only users with
+START <= id < END (END may be left empty). Run one process per range to
+shard the work; notifications carry a dedupe key, so overlapping ranges or
+runs never deliver a reminder twice.
 
-Or set up a cron job:
+Any of the one-shot forms can run from cron:
     # Run every minute
     * * * * * cd /path/to/backend && python notification_scheduler.py
+A skipped or late run is caught up by the next one.
 """
+import argparse
+import asyncio
 import sys
 import os
-import requests
 import logging
 
 # Setup logging
@@ -26,6 +41,8 @@ API_URL = os.getenv('API_URL', 'http://localhost:8000')
 
 def check_and_send_notifications():
     """Call the notification check endpoint"""
+    import requests  # Only this HTTP mode needs it
+    
     try:
         url = f"{API_URL}/api/notifications/check-and-send"
         response = requests.post(url, timeout=30)
@@ -41,8 +58,57 @@ def check_and_send_notifications():
         logger.error(f"Error checking notifications: {e}", exc_info=True)
         return False
 
+def parse_user_ids(value):
+    """'START:END' -> (start, end), an empty END meaning no upper bound"""
+    start, sep, end = value.partition(":")
+    try:
+        if not sep:
+            raise ValueError
+        return int(start or 0), int(end) if end else sys.maxsize
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START:END, got '{value}'")
+
+def send_due_reminders(user_id_range=None):
+    """Send everything due now directly against the database"""
+    from app.database import SessionLocal
+    from app.services.notification_service import notification_service
+    
+    db = SessionLocal()
+    try:
+        result = notification_service.check_and_send_notifications(db, user_id_range=user_id_range)
+        logger.info(f"Sent {result['notifications_sent']} notifications to {result['users_checked']} users")
+        return True
+    except Exception as e:
+        logger.error(f"Error sending reminders: {e}", exc_info=True)
+        return False
+    finally:
+        db.close()
+
+def run_worker(user_id_range=None):
+    from app.services.reminder_scheduler import reminder_scheduler
+    
+    reminder_scheduler.user_id_range = user_id_range
+    try:
+        asyncio.run(reminder_scheduler.run())
+    except KeyboardInterrupt:
+        logger.info("Reminder scheduler stopped")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send due notification reminders")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--worker", action="store_true", help="Run the reminder scheduler until interrupted")
+    mode.add_argument("--once", action="store_true", help="Send due reminders from the database and exit")
+    parser.add_argument("--user-ids", type=parse_user_ids, metavar="START:END",
+                        help="With --worker/--once: only users with START <= id < END")
+    args = parser.parse_args()
+    if args.user_ids and not (args.worker or args.once):
+        parser.error("--user-ids needs --worker or --once")
+    
+    if args.worker:
+        run_worker(args.user_ids)
+        sys.exit(0)
+    
     logger.info("Starting notification scheduler check...")
-    success = check_and_send_notifications()
+    success = send_due_reminders(args.user_ids) if args.once else check_and_send_notifications()
     sys.exit(0 if success else 1)
 
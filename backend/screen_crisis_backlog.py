@@ -0,0 +1,70 @@
+"""
+Rescan stored user text for crisis language
+
+Screens chat messages, journal entries and thought records with the current
+crisis keyword list and bulk-inserts a crisis alert (status 'backfill') for
+every flagged text. Safe to rerun: rows flagged by an earlier backfill are
+not alerted twice. Run migrate_crisis_alert_sources.py first.
+
+Usage:
+    python screen_crisis_backlog.py
+    python screen_crisis_backlog.py --sources journal,thought_record --workers 8
+    python screen_crisis_backlog.py --dry-run
+"""
+import argparse
+import logging
+import sys
+
+from app.database import SessionLocal
+from app.services.crisis_screening import SCREENING_SOURCES, screen_database
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", default=",".join(SCREENING_SOURCES),
+                        help=f"Comma-separated subset of: {', '.join(SCREENING_SOURCES)}")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Screening processes (default: CPU count, 0 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Texts per DB fetch / worker task")
+    parser.add_argument("--dry-run", action="store_true", help="Report matches without writing alerts")
+    args = parser.parse_args()
+
+    sources = [source.strip() for source in args.sources.split(",") if source.strip()]
+    unknown = set(sources) - set(SCREENING_SOURCES)
+    if unknown:
+        parser.error(f"Unknown sources: {', '.join(sorted(unknown))}")
+
+    def report(stats):
+        logger.info(
+            f"{stats.texts} texts screened, {stats.flagged} flagged "
+            f"({stats.texts_per_second:.0f} texts/s)"
+        )
+
+    db = SessionLocal()
+    try:
+        stats = screen_database(
+            db,
+            sources=sources,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run,
+            progress=report
+        )
+    finally:
+        db.close()
+
+    logger.info(f"Flagged by source: {stats.by_source}")
+    logger.info(
+        f"Done: {stats.texts} texts in {stats.elapsed_seconds:.1f}s "
+        f"({stats.texts_per_second:.0f} texts/s), {stats.alerts_written} alerts written"
+        + (" (dry run)" if args.dry_run else "")
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
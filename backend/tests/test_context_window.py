@@ -0,0 +1,64 @@
+"""
+Every chat message must reach the model either verbatim or through the
+rolling summary - never fall between the two.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.chat import context_for
+from app.config import settings
+from app.database import Base
+from app.models import Session as ChatSession, User
+from app.services.chat_store import append_turn
+from app.services.context_window import fit_history, messages_to_fold
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+def test_every_message_is_verbatim_or_summarized(db):
+    user = User(email="context@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    chat = ChatSession(user_id=user.id)
+    db.add(chat)
+    db.commit()
+
+    summarized = []  # Contents folded into the summary so far, in order
+    turns = settings.context_keep_turns + settings.context_summary_batch_turns * 3 + 1
+    for turn in range(turns):
+        append_turn(db, chat, f"user {turn}", f"assistant {turn}")
+        db.commit()
+        db.refresh(chat)
+
+        # Fold exactly as refresh_context_summary() does, without the LLM call
+        start = chat.context_summary_count or 0
+        fold = messages_to_fold(chat.message_count, start)
+        if fold:
+            messages, _ = context_for(db, chat)
+            summarized.extend(message["content"] for message in messages[:fold])
+            chat.context_summary_count = start + fold
+            chat.context_summary = f"{len(summarized)} messages"
+            db.commit()
+
+        messages, context_summary = context_for(db, chat)
+        history = fit_history(messages, context_summary, reserved_tokens=0, token_budget=100000)
+        verbatim = [message["content"] for message in history if message["role"] != "system"]
+
+        expected = [f"{role} {i}" for i in range(turn + 1) for role in ("user", "assistant")]
+        assert summarized + verbatim == expected, f"turn {turn}"
+        assert len(verbatim) >= min(len(expected), settings.context_keep_turns * 2)
+
+def test_token_budget_keeps_the_newest_messages():
+    messages = [{"role": "user", "content": f"message number {i} " * 20} for i in range(10)]
+    history = fit_history(messages, None, reserved_tokens=0, token_budget=300)
+    assert history
+    assert history == messages[-len(history):]
@@ -4,6 +4,18 @@ import { format } from 'date-fns'
 import { Search, X, FileText, Sparkles, Trash2, Loader2 } from 'lucide-react'
 import { SkeletonList } from './SkeletonLoader'
 
+// Search snippets wrap matched terms in <mark>; render those as highlights without using innerHTML
+const renderSnippet = (snippet) =>
+  snippet.split(/(<mark>.*?<\/mark>)/g).map((part, i) =>
+    part.startsWith('<mark>') ? (
+      <mark key={i} className="bg-yellow-200 dark:bg-yellow-700/60 rounded px-0.5">
+        {part.slice(6, -7)}
+      </mark>
+    ) : (
+      part
+    )
+  )
+
 export default function ChatHistory({ isOpen, onClose, onSelectSession }) {
   const [sessions, setSessions] = useState([])
   const [loading, setLoading] = useState(false)
@@ -124,9 +136,9 @@ export default function ChatHistory({ isOpen, onClose, onSelectSession }) {
             </div>
           ) : (
             sessions.map((session) => {
-              const messageCount = session.messages?.length || 0
+              const messageCount = session.message_count ?? session.messages?.length ?? 0
               const lastMessage = session.messages?.[session.messages.length - 1]
-              const preview = lastMessage?.content?.substring(0, 100) || 'No messages'
+              const preview = lastMessage?.content?.substring(0, 100) || session.title || 'No messages'
 
               return (
                 <div
@@ -149,7 +161,11 @@ export default function ChatHistory({ isOpen, onClose, onSelectSession }) {
                         </span>
                       </div>
                       
-                      {session.summary ? (
+                      {session.snippet ? (
+                        <p className="text-sm text-gray-700 dark:text-gray-300 mb-2 line-clamp-2">
+                          {renderSnippet(session.snippet)}
+                        </p>
+                      ) : session.summary ? (
                         <p className="text-sm text-gray-700 dark:text-gray-300 mb-2 line-clamp-2">
                           {session.summary}
                         </p>
@@ -30,7 +30,9 @@ export default function Chat() {
 
   const handleSelectSession = async (session) => {
     setSessionId(session.id)
-    setMessages(session.messages || [])
+    // Search results carry only a snippet, so load the conversation itself
+    const fullSession = session.messages ? session : await chatService.getSession(session.id)
+    setMessages(fullSession.messages || [])
   }
 
   useEffect(() => {
@@ -17,18 +17,27 @@ export default function Journal() {
   }, [])
 
   useEffect(() => {
-    if (searchQuery.trim()) {
-      const filtered = entries.filter(entry => {
-        const searchLower = searchQuery.toLowerCase()
-        return (
-          (entry.title && entry.title.toLowerCase().includes(searchLower)) ||
-          entry.content.toLowerCase().includes(searchLower) ||
-          (entry.tags && entry.tags.some(tag => tag.toLowerCase().includes(searchLower)))
-        )
-      })
-      setFilteredEntries(filtered)
-    } else {
+    if (!searchQuery.trim()) {
       setFilteredEntries(entries)
+      return
+    }
+
+    // Search runs on the server; wait for a pause in typing before querying
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const query = searchQuery.trim()
+        const tag = query.startsWith('#') ? query.slice(1) : null
+        const result = await journalService.searchEntries(tag ? { tags: [tag] } : { q: query })
+        if (!cancelled) setFilteredEntries(result.entries)
+      } catch (error) {
+        console.error('Search failed:', error)
+      }
+    }, 250)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
     }
   }, [searchQuery, entries])
 
@@ -110,7 +119,7 @@ export default function Journal() {
             type="text"
             value={searchQuery}
             onChange={(e) => setSearchQuery(e.target.value)}
-            placeholder="Search journal entries..."
+            placeholder="Search journal entries... (#tag to filter by tag)"
             className="w-full pl-12 pr-4 py-3 border-2 border-gray-200 dark:border-gray-700 rounded-xl focus:ring-2 focus:ring-indigo-500 focus:border-indigo-500 transition-all bg-white dark:bg-gray-900 text-gray-900 dark:text-white"
           />
         </div>
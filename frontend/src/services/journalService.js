@@ -11,6 +11,15 @@ export const journalService = {
     return response.data
   },
 
+  searchEntries: async ({ q, tags, startDate, endDate, cursor, limit = 50 } = {}) => {
+    const response = await api.get('/journal/search', {
+      params: { q, tags, start_date: startDate, end_date: endDate, cursor, limit },
+      paramsSerializer: { indexes: null }
+    })
+    // Matching entries; pass nextCursor back as `cursor` for the next page
+    return { entries: response.data, nextCursor: response.headers['x-next-cursor'] || null }
+  },
+
   getEntry: async (entryId) => {
     const response = await api.get(`/journal/${entryId}`)
     return response.data